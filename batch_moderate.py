@@ -0,0 +1,52 @@
+"""
+Batch transcribe-and-moderate runner for backfills and offline evaluation.
+
+    python batch_moderate.py <audio_dir|manifest.jsonl> -o results.jsonl --workers 8 --provider groq_whisper_turbo
+
+Results are appended to the output JSONL, which is also the checkpoint:
+re-running the same command after a crash skips items already written.
+
+    python batch_moderate.py results.jsonl -o rescored.jsonl --reapply-policy
+
+re-evaluates the current moderation policy over earlier results without
+calling any provider (--tenant applies to records without their own tenant).
+"""
+import argparse
+import logging
+
+from com.mhire.app.services.batch import load_manifest, reapply_policy, run_batch
+from com.mhire.app.services.multi_provider_transcribe import PROVIDERS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch transcribe and moderate audio files")
+    parser.add_argument("source", help="Directory of audio files or JSONL manifest")
+    parser.add_argument("-o", "--output", required=True, help="Output JSONL (also used to resume)")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="Parallel workers")
+    parser.add_argument("-p", "--provider", default="openai_whisper", choices=PROVIDERS)
+    parser.add_argument("--timeout", type=float, default=None, help="Per provider call timeout in seconds")
+    parser.add_argument("--retry-errors", action="store_true", help="Reprocess items that previously failed, replacing their error lines")
+    parser.add_argument("--progress-interval", type=float, default=10.0, help="Seconds between progress lines")
+    parser.add_argument("--tenant", default=None, help="Tenant whose policy overrides apply")
+    parser.add_argument("--reapply-policy", action="store_true",
+                        help="Treat source as a results JSONL and only re-evaluate the policy")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.reapply_policy:
+        try:
+            count = reapply_policy(args.source, args.output, tenant=args.tenant)
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"{count} records rescored")
+        return 0
+    items = load_manifest(args.source)
+    summary = run_batch(
+        items, args.output, provider=args.provider, workers=args.workers, timeout=args.timeout,
+        retry_errors=args.retry_errors, progress_interval=args.progress_interval, tenant=args.tenant,
+    )
+    return 1 if summary["processed"] and summary["error_rate"] == 1.0 else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,122 @@
+"""
+Capacity planning from recorded request traces (see request_trace_path).
+
+    python capacity_sim.py models traces.jsonl
+
+prints per-provider latency models fitted from the traces, as JSON for the
+standin_latency_models setting.
+
+    python capacity_sim.py simulate traces.jsonl --workers 1,2,4 --scheduler-capacity 8,16 --rate-scale 1,2,3
+
+predicts throughput, rejections, queueing delay and p99 latency for every
+combination of the comma separated values, in a discrete-event model of the
+pipeline (admission, scheduler, bulkheads, provider rate limits, deadlines).
+--provider-mix groq_whisper_turbo=0.7,deepgram_nova_2=0.3 reroutes requests.
+
+    python capacity_sim.py replay traces.jsonl --url http://localhost:8000 --rate-scale 2
+
+replays the traces open-loop against a running service, normally one started
+with enable_standin_providers=true and the fitted standin_latency_models.
+Requests go to /internal/moderate-audio, so --url must reach the app
+directly (not through nginx) and internal_api_token must be set.
+"""
+import argparse
+import json
+import os
+
+from com.mhire.app.services.capacity_sim import ROUTING_POLICIES, fit_latency_models, sweep
+from com.mhire.app.services.request_traces import load_traces
+
+
+def _values(text, cast):
+    return [cast(value) for value in text.split(",") if value.strip()]
+
+
+def _mapping(text, cast=float):
+    """"name=value,name=value" as a dict"""
+    if not text:
+        return None
+    mapping = {}
+    for part in text.split(","):
+        name, _, value = part.partition("=")
+        mapping[name.strip()] = cast(value or 1)
+    return mapping
+
+
+def _row(summary):
+    settings, latency, queueing = summary["settings"], summary["latency"], summary["queueing"]
+    mix = ",".join(f"{p}={w:g}" for p, w in (settings["provider_mix"] or {}).items()) or "recorded"
+    return (
+        f"{settings['replicas']:>3} {settings['workers']:>3} {settings['scheduler_capacity']:>4} "
+        f"{settings['routing']:<11} {settings['rate_scale']:>5g} {mix:<42} "
+        f"{summary['served']:>7} {summary['rejected']:>6} {summary['degraded']:>6} "
+        f"{summary['throughput_rps'] or 0:>8.2f} {latency['p50'] or 0:>7.2f} {latency['p99'] or 0:>7.2f} "
+        f"{queueing['scheduler_p99'] or 0:>7.2f} {summary['utilization'].get('scheduler', 0):>6.0%}"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate or replay recorded request traces")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    models = commands.add_parser("models", help="Fit provider latency models")
+    models.add_argument("traces")
+
+    simulate = commands.add_parser("simulate", help="Discrete-event simulation over a grid of settings")
+    simulate.add_argument("traces")
+    simulate.add_argument("--replicas", default="1", help="Replica counts, comma separated")
+    simulate.add_argument("--workers", default="1", help="Worker processes per replica, comma separated")
+    simulate.add_argument("--scheduler-capacity", default=None, help="Pipeline slots per replica, comma separated")
+    simulate.add_argument("--routing", default="round_robin", help=f"Any of {', '.join(ROUTING_POLICIES)}")
+    simulate.add_argument("--rate-scale", default="1", help="Arrival rate multipliers, comma separated")
+    simulate.add_argument("--provider-mix", action="append", default=None,
+                          help="provider=weight,... (repeat to compare mixes)")
+    simulate.add_argument("--pool", default=None, help="Bulkhead sizes as name=size,... e.g. moderation=32")
+    simulate.add_argument("--json", action="store_true", help="Print full summaries as JSON lines")
+
+    replay = commands.add_parser("replay", help="Replay traces against a running service")
+    replay.add_argument("traces")
+    replay.add_argument("--url", default="http://localhost:8000")
+    replay.add_argument("--rate-scale", type=float, default=1.0)
+    replay.add_argument("--provider-mix", default=None, help="provider=weight,...")
+    replay.add_argument("--max-in-flight", type=int, default=256)
+    replay.add_argument("--internal-token", default=os.getenv("internal_api_token"),
+                        help="X-Internal-Token for /internal (default: internal_api_token)")
+    args = parser.parse_args(argv)
+
+    traces = load_traces(args.traces)
+    if args.command == "models":
+        print(json.dumps(fit_latency_models(traces)))
+        return 0
+
+    if args.command == "replay":
+        # Only the replay needs the HTTP client
+        from com.mhire.app.services.trace_replay import replay_traces
+        summary = replay_traces(traces, args.url, rate_scale=args.rate_scale,
+                                provider_mix=_mapping(args.provider_mix), max_in_flight=args.max_in_flight,
+                                internal_token=args.internal_token)
+        print(json.dumps(summary, indent=2))
+        return 0
+
+    grid = {
+        "replicas": _values(args.replicas, int),
+        "workers": _values(args.workers, int),
+        "routing": _values(args.routing, str),
+        "rate_scale": _values(args.rate_scale, float),
+        "provider_mix": [_mapping(mix) for mix in args.provider_mix] if args.provider_mix else [None],
+    }
+    if args.scheduler_capacity:
+        grid["scheduler_capacity"] = _values(args.scheduler_capacity, int)
+    pool_sizes = _mapping(args.pool, int)
+
+    print(f"{len(traces)} traces")
+    if not args.json:
+        print(f"{'rep':>3} {'wrk':>3} {'cap':>4} {'routing':<11} {'scale':>5} {'provider mix':<42} "
+              f"{'served':>7} {'reject':>6} {'degr':>6} {'req/s':>8} {'p50':>7} {'p99':>7} {'sch p99':>7} {'slots':>6}")
+    for summary in sweep(traces, grid, pool_sizes=pool_sizes):
+        print(json.dumps(summary) if args.json else _row(summary))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,13 +1,223 @@
+import json
 import os
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Relative data paths (audit_db_path, shared_cache_path) resolve against the
+# application root rather than the working directory, so every worker and
+# tool started from elsewhere opens the same files.
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+
+def _app_path(path):
+    return os.path.join(APP_ROOT, path) if path and not os.path.isabs(path) else path
+
+
 OPENAI_API_KEY = os.getenv("openai_api_key")
 DEEPGRAM_API_KEY = os.getenv("deepgram_api_key")
 GROQ_API_KEY = os.getenv("groq_api_key")
 # MONGODB_CONN_STRING = os.getenv("mongodb_conn_string")
 # DB_NAME = os.getenv("db_name")
 # COLLECTION_NAME = os.getenv("collection_name")
-# INDEX_NAME = os.getenv("index_name")
\ No newline at end of file
+# INDEX_NAME = os.getenv("index_name")
+
+# Admission control: per-endpoint concurrency limits with a bounded wait queue.
+# Requests beyond max_concurrency + max_queue are rejected with 503 immediately.
+MAX_UPLOAD_BYTES = int(os.getenv("max_upload_bytes", str(25 * 1024 * 1024)))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("admission_queue_timeout_seconds", "10"))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("admission_retry_after_seconds", "2"))
+ADMISSION_LIMITS = {
+    # path: (max_concurrency, max_queue)
+    "/transcribe": (
+        int(os.getenv("transcribe_max_concurrency", "8")),
+        int(os.getenv("transcribe_max_queue", "16")),
+    ),
+    "/transcribe-and-moderate": (
+        # Kept above scheduler_capacity so the priority scheduler, not this
+        # FIFO limiter, decides the order in which pipeline work runs
+        int(os.getenv("transcribe_and_moderate_max_concurrency", "32")),
+        int(os.getenv("transcribe_and_moderate_max_queue", "32")),
+    ),
+    "/moderate": (
+        int(os.getenv("moderate_max_concurrency", "32")),
+        int(os.getenv("moderate_max_queue", "64")),
+    ),
+    "/transcribe-and-moderate/stream": (
+        int(os.getenv("stream_max_concurrency", "8")),
+        int(os.getenv("stream_max_queue", "8")),
+    ),
+    "/benchmark": (1, 0),
+    "/internal/moderate-audio": (
+        int(os.getenv("internal_max_concurrency", "32")),
+        int(os.getenv("internal_max_queue", "32")),
+    ),
+}
+
+# Bulkheads: each pipeline stage gets its own executor so a slow provider
+# cannot starve cheap stages such as text moderation or health checks.
+DEFAULT_BULKHEAD_POOL_SIZE = int(os.getenv("default_bulkhead_pool_size", "4"))
+BULKHEAD_POOL_SIZES = {
+    "upload": int(os.getenv("upload_pool_size", "4")),
+    "preprocess": int(os.getenv("preprocess_pool_size", "2")),
+    "transcription:openai_whisper": int(os.getenv("openai_whisper_pool_size", "8")),
+    "transcription:deepgram_nova_2": int(os.getenv("deepgram_nova_2_pool_size", "8")),
+    "transcription:groq_whisper_turbo": int(os.getenv("groq_whisper_turbo_pool_size", "8")),
+    "moderation": int(os.getenv("moderation_pool_size", "16")),
+    "benchmark": int(os.getenv("benchmark_pool_size", "1")),
+}
+
+# Deadlines: every provider call gets a timeout. Requests may carry their own
+# budget (X-Deadline-Ms header or deadline_ms form field); otherwise the
+# default below applies. Set to 0 to only use the per-call timeout.
+DEFAULT_REQUEST_DEADLINE_MS = int(os.getenv("default_request_deadline_ms", "0"))
+PROVIDER_TIMEOUT_SECONDS = float(os.getenv("provider_timeout_seconds", "30"))
+
+# Tracing: finished spans are written as OTLP-JSON lines to a local file
+# and/or posted to an OTLP/HTTP collector (e.g. http://localhost:4318/v1/traces).
+TRACE_EXPORT_PATH = os.getenv("trace_export_path")
+TRACE_OTLP_ENDPOINT = os.getenv("trace_otlp_endpoint")
+
+# Diagnostics: /admin endpoints are disabled unless admin_token is set.
+ADMIN_TOKEN = os.getenv("admin_token")
+# Service-to-service /internal endpoints require this shared secret in the
+# X-Internal-Token header and are disabled unless it is set.
+INTERNAL_API_TOKEN = os.getenv("internal_api_token")
+MAX_PROFILE_SECONDS = int(os.getenv("max_profile_seconds", "60"))
+# Fraction of requests profiled in the background (0 disables) and the
+# duration above which a profiled request's hottest stacks are logged.
+PROFILE_REQUEST_SAMPLE_RATE = float(os.getenv("profile_request_sample_rate", "0"))
+PROFILE_SLOW_REQUEST_MS = float(os.getenv("profile_slow_request_ms", "2000"))
+
+# Local provider stand-ins: simulated latency = base + seconds per MB, used by
+# benchmarks and offline replays instead of calling the real APIs.
+ENABLE_STANDIN_PROVIDERS = os.getenv("enable_standin_providers", "false").lower() == "true"
+STANDIN_LATENCY_MODELS = {
+    # provider: (base_seconds, seconds_per_mb)
+    "openai_whisper": (1.2, 0.8),
+    "deepgram_nova_2": (0.3, 0.25),
+    "groq_whisper_turbo": (0.25, 0.15),
+}
+# JSON overrides, e.g. the models fitted from recorded traces by capacity_sim.py
+STANDIN_LATENCY_MODELS.update({
+    provider: tuple(model) for provider, model in json.loads(os.getenv("standin_latency_models", "{}")).items()
+})
+STANDIN_MODERATION_LATENCY_SECONDS = float(os.getenv("standin_moderation_latency_seconds", "0.2"))
+
+# Streaming Deepgram: interim results are moderated as they arrive once at
+# least stream_min_new_words new words have been heard in a segment.
+DEEPGRAM_STREAM_URL = os.getenv("deepgram_stream_url", "wss://api.deepgram.com/v1/listen")
+DEEPGRAM_STREAM_CHUNK_BYTES = int(os.getenv("deepgram_stream_chunk_bytes", "8000"))
+STREAM_MIN_NEW_WORDS = int(os.getenv("stream_min_new_words", "3"))
+
+# Audit store: moderation decisions are queued in memory and written in
+# batches to SQLite off the request path. When the queue is full, records
+# spill to a JSONL file next to the database and are loaded once the writer
+# catches up. Empty audit_db_path disables it.
+AUDIT_DB_PATH = _app_path(os.getenv("audit_db_path", "var/audit.sqlite3"))
+AUDIT_MAX_BUFFER = int(os.getenv("audit_max_buffer", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("audit_batch_size", "200"))
+AUDIT_FLUSH_INTERVAL_SECONDS = float(os.getenv("audit_flush_interval_seconds", "1"))
+
+# Pipeline scheduler: priority classes share slots by weight (stride
+# scheduling), tenants within a class by weighted fair queueing, and jobs
+# within a tenant shortest-estimated-audio first. Aging credits waiting jobs
+# with `scheduler_aging_rate` seconds of audio per second waited.
+SCHEDULER_CAPACITY = int(os.getenv("scheduler_capacity", "8"))
+SCHEDULER_MAX_WAITING = int(os.getenv("scheduler_max_waiting", "64"))
+SCHEDULER_AGING_RATE = float(os.getenv("scheduler_aging_rate", "1.0"))
+PRIORITY_CLASS_WEIGHTS = {
+    "realtime": float(os.getenv("realtime_weight", "8")),
+    "reported": float(os.getenv("reported_weight", "4")),
+    "bulk": float(os.getenv("bulk_weight", "1")),
+}
+TENANT_WEIGHTS = json.loads(os.getenv("tenant_weights", "{}"))
+
+# Near-duplicate transcripts: flagged transcripts are MinHash/LSH indexed and
+# a new transcript within near_dup_threshold (estimated Jaccard over word
+# 3-grams) of one is blocked without calling the moderation API.
+NEAR_DUP_ENABLED = os.getenv("near_dup_enabled", "true").lower() == "true"
+NEAR_DUP_THRESHOLD = float(os.getenv("near_dup_threshold", "0.7"))
+NEAR_DUP_NUM_PERM = int(os.getenv("near_dup_num_perm", "128"))
+NEAR_DUP_BANDS = int(os.getenv("near_dup_bands", "32"))
+NEAR_DUP_TTL_SECONDS = float(os.getenv("near_dup_ttl_seconds", str(24 * 3600)))
+NEAR_DUP_MAX_ENTRIES = int(os.getenv("near_dup_max_entries", "200000"))
+
+# Audio fingerprints: spectral-peak landmarks of decoded PCM identify the same
+# recording after re-encoding, trimming or forwarding. A match reuses the
+# earlier transcript (and verdict) instead of calling a provider. Non-WAV
+# input is decoded with ffmpeg when it is on PATH.
+AUDIO_FINGERPRINT_ENABLED = os.getenv("audio_fingerprint_enabled", "true").lower() == "true"
+AUDIO_FINGERPRINT_MAX_SECONDS = float(os.getenv("audio_fingerprint_max_seconds", "120"))
+AUDIO_FINGERPRINT_MIN_MATCHES = int(os.getenv("audio_fingerprint_min_matches", "20"))
+AUDIO_FINGERPRINT_MIN_RATIO = float(os.getenv("audio_fingerprint_min_ratio", "0.05"))
+AUDIO_FINGERPRINT_TTL_SECONDS = float(os.getenv("audio_fingerprint_ttl_seconds", str(24 * 3600)))
+# The index holds about 12 bytes per landmark hash and about 150 hashes per
+# second of audio, per worker (measured: 212 KB per 120 s entry).
+# The entry cap defaults to what fits audio_fingerprint_max_mb at full
+# length; shorter clips are bounded by the byte budget instead.
+AUDIO_FINGERPRINT_MAX_BYTES = int(float(os.getenv("audio_fingerprint_max_mb", "64")) * 1024 * 1024)
+AUDIO_FINGERPRINT_MAX_ENTRIES = int(os.getenv(
+    "audio_fingerprint_max_entries",
+    str(max(int(AUDIO_FINGERPRINT_MAX_BYTES // (AUDIO_FINGERPRINT_MAX_SECONDS * 150 * 12)), 1)),
+))
+
+# Sampling mode: audio longer than sampling_min_audio_seconds is first
+# moderated from a clip of its start, end and loudest windows, giving a
+# provisional verdict; the full file can follow as a background job.
+SAMPLING_ENABLED = os.getenv("sampling_enabled", "true").lower() == "true"
+SAMPLING_MIN_AUDIO_SECONDS = float(os.getenv("sampling_min_audio_seconds", "300"))
+SAMPLING_WINDOW_SECONDS = float(os.getenv("sampling_window_seconds", "20"))
+SAMPLING_ENERGY_WINDOWS = int(os.getenv("sampling_energy_windows", "3"))
+# Background jobs (the full pass) run in the worker that accepted the request
+# and keep their status in the shared cache. A worker shutting down waits up
+# to job_drain_seconds (under gunicorn's graceful_timeout) for its jobs.
+JOB_TTL_SECONDS = float(os.getenv("job_ttl_seconds", "3600"))
+JOB_MAX_ENTRIES = int(os.getenv("job_max_entries", "10000"))
+JOB_DRAIN_SECONDS = float(os.getenv("job_drain_seconds", "25"))
+
+# Conversation sessions: each message is moderated on its own and folded into
+# decayed per-category scores for its conversation; a conversation whose
+# rolling score reaches session_escalation_threshold is escalated to review.
+SESSION_WINDOW_MESSAGES = int(os.getenv("session_window_messages", "10"))
+SESSION_MAX_TRANSCRIPT_CHARS = int(os.getenv("session_max_transcript_chars", "500"))
+SESSION_DECAY = float(os.getenv("session_decay", "0.7"))
+SESSION_SCORE_FLOOR = float(os.getenv("session_score_floor", "0.1"))
+SESSION_ESCALATION_THRESHOLD = float(os.getenv("session_escalation_threshold", "1.0"))
+SESSION_IDLE_TTL_SECONDS = float(os.getenv("session_idle_ttl_seconds", "1800"))
+SESSION_MAX_SESSIONS = int(os.getenv("session_max_sessions", "100000"))
+
+# Multi-worker serving: worker_count is the number of processes sharing this
+# host's limits (gunicorn.conf.py sets it). Admission and scheduler limits
+# above are totals and are split across workers. Transcripts and moderation
+# verdicts are cached in a SQLite (WAL) file shared by all workers and
+# replicas on the host, which also holds the provider token buckets.
+WORKER_COUNT = max(int(os.getenv("worker_count", "1")), 1)
+SHARED_CACHE_PATH = _app_path(os.getenv("shared_cache_path", "var/shared_cache.sqlite3"))
+TRANSCRIPT_CACHE_TTL_SECONDS = float(os.getenv("transcript_cache_ttl_seconds", str(24 * 3600)))
+MODERATION_CACHE_TTL_SECONDS = float(os.getenv("moderation_cache_ttl_seconds", str(24 * 3600)))
+PROVIDER_RATE_LIMITS = {
+    # provider: requests per second across all workers, 0 for no limit
+    "openai_whisper": float(os.getenv("openai_whisper_rate_limit", "0")),
+    "deepgram_nova_2": float(os.getenv("deepgram_nova_2_rate_limit", "0")),
+    "groq_whisper_turbo": float(os.getenv("groq_whisper_turbo_rate_limit", "0")),
+    "openai_moderation": float(os.getenv("openai_moderation_rate_limit", "0")),
+}
+RATE_LIMIT_BURST_SECONDS = float(os.getenv("rate_limit_burst_seconds", "1"))
+
+# Moderation policy: per-category review/block thresholds with per-tenant
+# overrides, as JSON (see services/policy.py for the format and the built-in
+# default used when policy_path is empty).
+POLICY_PATH = os.getenv("policy_path", "")
+
+# Request traces: one anonymized JSON line per pipeline request (arrival time,
+# audio size and duration, provider, priority, hashed tenant, stage latencies)
+# for offline replay and capacity simulation (capacity_sim.py). Written off
+# the request path; empty request_trace_path disables recording. Tenant ids are
+# hashed with request_trace_salt; when it is empty a random salt is generated
+# once and kept next to the trace file (<request_trace_path>.salt).
+REQUEST_TRACE_PATH = os.getenv("request_trace_path", "")
+REQUEST_TRACE_SAMPLE_RATE = float(os.getenv("request_trace_sample_rate", "1.0"))
+REQUEST_TRACE_SALT = os.getenv("request_trace_salt", "")
+REQUEST_TRACE_MAX_BUFFER = int(os.getenv("request_trace_max_buffer", "10000"))
@@ -1,16 +1,38 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Header
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from com.mhire.app.services.transcribe import transcribe_audio
 from com.mhire.app.services.detection import moderate_text
-import shutil
-import tempfile
-import os
+from com.mhire.app.middleware.admission import AdmissionControlMiddleware, build_limiters, Overloaded
+from com.mhire.app.config.config import ADMISSION_RETRY_AFTER_SECONDS
+from com.mhire.app.services.near_duplicate import near_duplicate_index
+from com.mhire.app.services.audio_fingerprint import audio_fingerprint_index
+from com.mhire.app.services.scheduler import pipeline_scheduler
+from com.mhire.app.services.bulkheads import get_bulkhead, bulkhead_stats
+from com.mhire.app.services.uploads import spool_upload, spool_upload_hashed, remove_quietly
+from com.mhire.app.services.deadline import deadline_from_request
+from com.mhire.app.services.jobs import job_store
+from com.mhire.app.services.pipeline import transcribe_and_moderate, submit_full_pass
+from com.mhire.app.services.conversations import conversation_sessions
+from com.mhire.app.services.shared_cache import get_shared_cache
+from com.mhire.app.services.request_traces import get_request_recorder
+from com.mhire.app.services.tracing import TracingMiddleware, configure_tracing, install_log_correlation, span
+from com.mhire.app.middleware.profiling import RequestProfilerMiddleware
+from com.mhire.app.routers.diagnostics import router as diagnostics_router
+from com.mhire.app.routers.audit import router as audit_router
+from com.mhire.app.routers.jobs import router as jobs_router
+from com.mhire.app.routers.internal import router as internal_router
+from com.mhire.app.routers.conversations import router as conversations_router
+from com.mhire.app.services.audit import audit_decision, get_audit_sink
+from typing import Optional
+import asyncio
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
+install_log_correlation()
 logger = logging.getLogger(__name__)
+configure_tracing("voice-moderation")
 
 app = FastAPI(
     title="Voice Content Moderation API",
@@ -18,6 +40,11 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Shed load with fast 503s instead of queueing behind the threadpool. Added
+# before CORS so CORS wraps it: browsers can read the 413/503 and Retry-After
+admission_limiters = build_limiters()
+app.add_middleware(AdmissionControlMiddleware, limiters=admission_limiters)
+
 # Add CORS middleware for frontend integration
 app.add_middleware(
     CORSMiddleware,
@@ -25,76 +52,188 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
+# Background profiling of a sampled fraction of requests (off by default)
+app.add_middleware(RequestProfilerMiddleware)
+
+# Outermost: one root span per request, trace id returned in X-Trace-Id
+app.add_middleware(TracingMiddleware)
+
+# Guarded /admin profiling and memory diagnostics
+app.include_router(diagnostics_router)
+app.include_router(audit_router)
+app.include_router(jobs_router)
+app.include_router(internal_router)
+app.include_router(conversations_router)
+
+@app.on_event("startup")
+async def open_audit_sink():
+    # Creates the audit schema before the first request, off the event loop
+    await asyncio.to_thread(get_audit_sink)
+
+@app.on_event("shutdown")
+async def drain_background_jobs():
+    # Recycled or stopped workers finish (or fail) their jobs before exiting
+    await job_store.drain()
+
 @app.post("/transcribe")
-def transcribe_endpoint(file: UploadFile = File(...)):
+async def transcribe_endpoint(file: UploadFile = File(...)):
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file.filename) as tmp:
-            shutil.copyfileobj(file.file, tmp)
-            tmp_path = tmp.name
-        transcript = transcribe_audio(tmp_path)
+        tmp_path = await get_bulkhead("upload").run(spool_upload, file, file.filename)
+        transcript = await get_bulkhead("transcription:openai_whisper").run(transcribe_audio, tmp_path)
         return {"transcription": transcript}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/moderate")
-def moderate_endpoint(text: str):
+async def moderate_endpoint(text: str):
     try:
-        result = moderate_text(text)
+        result = await get_bulkhead("moderation").run(moderate_text, text)
         return JSONResponse(content=result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/transcribe-and-moderate")
-def transcribe_and_moderate_endpoint(file: UploadFile = File(...)):
+async def transcribe_and_moderate_endpoint(
+    file: UploadFile = File(...),
+    deadline_ms: Optional[int] = Form(None),
+    x_deadline_ms: Optional[int] = Header(None),
+    priority: Optional[str] = Form(None),
+    x_priority: Optional[str] = Header(None),
+    tenant_id: Optional[str] = Form(None),
+    x_tenant_id: Optional[str] = Header(None),
+    sampling: Optional[bool] = Form(None),
+    full_pass: bool = Form(True),
+    conversation_id: Optional[str] = Form(None),
+    x_conversation_id: Optional[str] = Header(None),
+):
     """
     Main endpoint for voice dating app content moderation.
     Returns transcription and moderation results for backend decision making.
+    A deadline (X-Deadline-Ms header or deadline_ms field) bounds the whole call;
+    past it the response carries a degraded verdict instead of hanging.
+    Priority class (realtime, reported, bulk) and tenant come from the
+    X-Priority / X-Tenant-Id headers or the priority / tenant_id fields.
+    Long audio gets a provisional verdict from sampled windows (sampling=false
+    disables this); unless full_pass=false the whole file is then moderated in
+    the background, pollable at /jobs/{job_id}.
+    With a conversation id (X-Conversation-Id or conversation_id) the verdict
+    also accounts for the recent messages of that conversation.
     """
     try:
+        deadline = deadline_from_request(x_deadline_ms, deadline_ms)
         logger.info(f"Processing audio file: {file.filename}")
         
         # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f"_{file.filename}") as tmp:
-            shutil.copyfileobj(file.file, tmp)
-            tmp_path = tmp.name
+        with span("upload.spool", filename=file.filename) as upload_span:
+            tmp_path, audio_hash = await get_bulkhead("upload").run(spool_upload_hashed, file, f"_{file.filename}")
         
-        # Transcribe audio
-        transcript = transcribe_audio(tmp_path)
-        logger.info(f"Transcription completed: {len(transcript)} characters")
+        # Transcribe and moderate within the request deadline
+        result = await transcribe_and_moderate(
+            tmp_path, "openai_whisper", deadline,
+            priority=x_priority or priority, tenant=x_tenant_id or tenant_id, sampling=sampling,
+            conversation_id=x_conversation_id or conversation_id, audio_hash=audio_hash
+        )
         
-        # Moderate content
-        moderation_result = moderate_text(transcript)
+        # Moderate the whole file in the background after a provisional verdict
+        full_pass_job = None
+        if result.get("provisional") and full_pass:
+            full_pass_job = await submit_full_pass(
+                tmp_path, "openai_whisper", tenant=x_tenant_id or tenant_id,
+                on_result=lambda full: audit_decision(full, audio_hash, "openai_whisper", trace_id=upload_span.trace_id),
+                audio_hash=audio_hash,
+            )
         
         # Clean up temporary file
-        os.unlink(tmp_path)
+        remove_quietly(tmp_path)
+        
+        # Record the decision off the request path
+        audit_decision(result, audio_hash, "openai_whisper", trace_id=upload_span.trace_id)
         
         # Structure response for backend decision making
         response = {
-            "transcription": transcript,
-            "moderation": {
-                "flagged": moderation_result.flagged,
-                "categories": dict(moderation_result.categories),
-                "category_scores": dict(moderation_result.category_scores)
-            },
-            "recommendation": "block" if moderation_result.flagged else "allow"
+            "transcription": result["transcription"],
+            "moderation": result["moderation"],
+            "recommendation": result["recommendation"],
+            "degraded": result["degraded"]
         }
+        if result["degraded"]:
+            response["degraded_reason"] = result["degraded_reason"]
+        for key in ("policy_categories", "provisional", "sampled_windows", "near_duplicate", "audio_duplicate",
+                    "conversation"):
+            if key in result:
+                response[key] = result[key]
+        if full_pass_job:
+            response["full_pass_job"] = {"job_id": full_pass_job, "status_url": f"/jobs/{full_pass_job}"}
         
-        logger.info(f"Moderation result: {'FLAGGED' if moderation_result.flagged else 'CLEAN'}")
-        return response
+        logger.info(f"Moderation result: {response['recommendation'].upper()}{' (degraded)' if result['degraded'] else ''}")
+        with span("response.serialize"):
+            return JSONResponse(content=response)
         
+    except Overloaded as e:
+        logger.warning(f"Rejecting audio, pipeline saturated: {str(e)}")
+        if 'tmp_path' in locals():
+            remove_quietly(tmp_path)
+        raise HTTPException(status_code=503, detail="Service overloaded, retry later",
+                            headers={"Retry-After": str(ADMISSION_RETRY_AFTER_SECONDS)})
     except Exception as e:
         logger.error(f"Error processing audio: {str(e)}")
         # Clean up temp file if it exists
         if 'tmp_path' in locals():
-            try:
-                os.unlink(tmp_path)
-            except:
-                pass
+            remove_quietly(tmp_path)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/health")
-def health_check():
+async def health_check():
     """Health check endpoint for monitoring"""
     return {"status": "healthy", "service": "voice-moderation"}
+
+@app.get("/metrics/admission")
+async def admission_metrics():
+    """Per-endpoint admission counters (active, waiting, rejected)"""
+    return {path: limiter.stats() for path, limiter in admission_limiters.items()}
+
+@app.get("/metrics/scheduler")
+async def scheduler_metrics():
+    """Pipeline scheduler occupancy and per-class waits"""
+    return pipeline_scheduler.stats()
+
+
+@app.get("/metrics/near-duplicates")
+async def near_duplicate_metrics():
+    """Size of the flagged-transcript index and its most matched clusters"""
+    return near_duplicate_index.stats()
+
+
+@app.get("/metrics/audio-fingerprints")
+async def audio_fingerprint_metrics():
+    """Size and hit rate of the audio fingerprint index"""
+    return audio_fingerprint_index.stats()
+
+@app.get("/metrics/conversations")
+async def conversation_metrics():
+    """Live conversation sessions and evictions"""
+    return conversation_sessions.stats()
+
+@app.get("/metrics/shared-cache")
+async def shared_cache_metrics():
+    """Entries in the cross-worker cache and this worker's hit counts"""
+    cache = get_shared_cache()
+    if cache is None:
+        raise HTTPException(status_code=404, detail="Shared cache is disabled")
+    return await asyncio.to_thread(cache.stats)
+
+@app.get("/metrics/request-traces")
+async def request_trace_metrics():
+    """Request traces recorded for capacity planning by this worker"""
+    recorder = get_request_recorder()
+    if recorder is None:
+        raise HTTPException(status_code=404, detail="Request tracing is disabled")
+    return recorder.stats()
+
+@app.get("/metrics/pools")
+async def pool_metrics():
+    """Per-stage executor utilization"""
+    return bulkhead_stats()
@@ -0,0 +1,186 @@
+import asyncio
+import json
+import logging
+import math
+from contextlib import asynccontextmanager
+
+from com.mhire.app.config.config import (
+    ADMISSION_LIMITS,
+    ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    ADMISSION_RETRY_AFTER_SECONDS,
+    MAX_UPLOAD_BYTES,
+    WORKER_COUNT,
+)
+from com.mhire.app.services.request_traces import TRACED_PATHS, get_request_recorder, rejected_request_trace
+
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    """Raised when an endpoint has no free slot and its wait queue is full"""
+
+
+class EndpointLimiter:
+    """
+    Concurrency limiter with a bounded wait queue for a single endpoint.
+
+    At most `max_concurrency` requests run at once, at most `max_queue` wait
+    for a slot; anything beyond that is rejected immediately so accepted
+    requests keep their latency instead of everyone timing out together.
+    """
+
+    def __init__(self, name, max_concurrency, max_queue, queue_timeout=ADMISSION_QUEUE_TIMEOUT_SECONDS):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        if not self._semaphore.locked():
+            # Free slot: acquire() returns without yielding to the loop
+            await self._semaphore.acquire()
+        elif self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(f"{self.name}: queue full")
+        else:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise Overloaded(f"{self.name}: timed out waiting for a slot")
+            finally:
+                self.waiting -= 1
+
+        self.active += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def stats(self):
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware enforcing per-endpoint admission and the upload size cap.
+
+    Runs before FastAPI parses the multipart body, so rejected requests never
+    spool their upload to disk or occupy a threadpool worker.
+    """
+
+    def __init__(self, app, limiters=None, max_upload_bytes=MAX_UPLOAD_BYTES,
+                 retry_after=ADMISSION_RETRY_AFTER_SECONDS):
+        self.app = app
+        self.limiters = limiters if limiters is not None else build_limiters()
+        self.max_upload_bytes = max_upload_bytes
+        self.retry_after = retry_after
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = _content_length(scope)
+        if content_length is not None and content_length > self.max_upload_bytes:
+            await self._reject(send, 413, f"Upload exceeds {self.max_upload_bytes} bytes")
+            return
+
+        limiter = self.limiters.get(scope["path"])
+        if limiter is None:
+            await self._guarded(scope, receive, send)
+            return
+
+        try:
+            async with limiter.slot():
+                await self._guarded(scope, receive, send)
+        except Overloaded as e:
+            logger.warning(f"Shedding request: {str(e)}")
+            recorder = get_request_recorder()
+            if recorder is not None and scope["path"] in TRACED_PATHS:
+                headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+                recorder.record(rejected_request_trace(headers, content_length))
+            await self._reject(send, 503, "Service overloaded, retry later",
+                               headers=[(b"retry-after", str(self.retry_after).encode())])
+
+    async def _guarded(self, scope, receive, send):
+        """Run the app while counting streamed body bytes against the upload cap"""
+        received = 0
+        too_large = False
+
+        async def limited_receive():
+            nonlocal received, too_large
+            if too_large:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_upload_bytes:
+                    # Stop feeding the body parser; whatever error the app
+                    # produces is replaced with a 413 below
+                    too_large = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            if not too_large:
+                await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not too_large:
+                raise
+        if too_large:
+            await self._reject(send, 413, f"Upload exceeds {self.max_upload_bytes} bytes")
+
+    async def _reject(self, send, status_code, detail, headers=None):
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ] + (headers or []),
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def per_worker(total, minimum=1):
+    """This worker's share of a host-wide limit split across WORKER_COUNT processes"""
+    return max(math.ceil(total / WORKER_COUNT), minimum)
+
+
+def build_limiters(limits=None):
+    """Create one EndpointLimiter per configured path, sized for this worker"""
+    return {
+        path: EndpointLimiter(path, per_worker(concurrency), per_worker(queue, 0))
+        for path, (concurrency, queue) in (limits or ADMISSION_LIMITS).items()
+    }
+
+
+def _content_length(scope):
+    for name, value in scope.get("headers", []):
+        if name == b"content-length":
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
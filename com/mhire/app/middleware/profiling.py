@@ -0,0 +1,73 @@
+import heapq
+import logging
+import random
+import threading
+import time
+
+from com.mhire.app.config.config import PROFILE_REQUEST_SAMPLE_RATE, PROFILE_SLOW_REQUEST_MS
+from com.mhire.app.services.diagnostics import StackSampler
+
+logger = logging.getLogger(__name__)
+
+
+class SlowRequestLog:
+    """Keeps the N slowest profiled requests with their hottest stacks"""
+
+    def __init__(self, capacity=20):
+        self.capacity = capacity
+        self._heap = []
+        self._lock = threading.Lock()
+
+    def record(self, duration_ms, path, top_stacks):
+        entry = (duration_ms, time.time(), path, top_stacks)
+        with self._lock:
+            if len(self._heap) < self.capacity:
+                heapq.heappush(self._heap, entry)
+            elif duration_ms > self._heap[0][0]:
+                heapq.heapreplace(self._heap, entry)
+
+    def slowest(self):
+        with self._lock:
+            entries = sorted(self._heap, reverse=True)
+        return [
+            {"duration_ms": round(duration_ms, 1), "timestamp": ts, "path": path, "top_stacks": stacks}
+            for duration_ms, ts, path, stacks in entries
+        ]
+
+
+slow_requests = SlowRequestLog()
+
+
+class RequestProfilerMiddleware:
+    """
+    Profiles a random fraction of requests with the stack sampler and logs
+    the hottest stacks of those slower than PROFILE_SLOW_REQUEST_MS. Only one
+    request is sampled at a time since the sampler sees every thread.
+    """
+
+    def __init__(self, app, sample_rate=PROFILE_REQUEST_SAMPLE_RATE, slow_ms=PROFILE_SLOW_REQUEST_MS):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self._busy = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or self.sample_rate <= 0
+                or random.random() >= self.sample_rate or not self._busy.acquire(blocking=False)):
+            await self.app(scope, receive, send)
+            return
+
+        sampler = StackSampler(interval=0.01).start()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            sampler.stop()
+            self._busy.release()
+            duration_ms = (time.perf_counter() - start) * 1000
+            if duration_ms >= self.slow_ms:
+                top_stacks = sampler.top(5)
+                slow_requests.record(duration_ms, scope["path"], top_stacks)
+                logger.warning(f"Slow request {scope['path']} took {duration_ms:.0f}ms; hottest stacks:\n"
+                               + "\n".join(f"  {s['samples']} samples: {' <- '.join(reversed(s['stack'][-6:]))}"
+                                           for s in top_stacks))
@@ -0,0 +1,34 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from com.mhire.app.routers.diagnostics import require_admin
+from com.mhire.app.services.audit import get_audit_sink
+
+router = APIRouter(prefix="/audit", tags=["audit"], dependencies=[Depends(require_admin)])
+
+
+@router.get("")
+async def query_audit(
+    start: Optional[float] = Query(None, description="Unix timestamp, inclusive"),
+    end: Optional[float] = Query(None, description="Unix timestamp, exclusive"),
+    category: Optional[str] = None,
+    audio_hash: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Moderation decisions by time range, flagged category and audio hash"""
+    sink = get_audit_sink()
+    if sink is None:
+        raise HTTPException(status_code=404, detail="Audit store is disabled")
+    records = await asyncio.to_thread(sink.query, start, end, category, audio_hash, limit)
+    return {"records": records, "count": len(records)}
+
+
+@router.get("/stats")
+async def audit_stats():
+    """Write-behind queue depth, records written and records dropped"""
+    sink = get_audit_sink()
+    if sink is None:
+        raise HTTPException(status_code=404, detail="Audit store is disabled")
+    return sink.stats()
@@ -0,0 +1,17 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from com.mhire.app.routers.diagnostics import require_admin
+from com.mhire.app.services.conversations import conversation_sessions
+
+router = APIRouter(prefix="/conversations", tags=["conversations"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/{conversation_id}")
+async def conversation_context(conversation_id: str):
+    """Recent message excerpts of a live conversation session, for reviewers"""
+    recent = await asyncio.to_thread(conversation_sessions.recent, conversation_id)
+    if recent is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired conversation")
+    return {"conversation_id": conversation_id, "recent": recent}
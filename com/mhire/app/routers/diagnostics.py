@@ -0,0 +1,60 @@
+import asyncio
+import hmac
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from com.mhire.app.config.config import ADMIN_TOKEN, MAX_PROFILE_SECONDS
+from com.mhire.app.middleware.profiling import slow_requests
+from com.mhire.app.services.diagnostics import StackSampler, memory_tracker
+
+
+def require_admin(x_admin_token: str = Header(None)):
+    """Admin endpoints are hidden unless admin_token is configured"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+router = APIRouter(prefix="/admin", tags=["diagnostics"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/profile/cpu", response_class=PlainTextResponse)
+async def profile_cpu(
+    seconds: float = Query(10, gt=0, le=MAX_PROFILE_SECONDS),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    include_idle: bool = False,
+):
+    """
+    Sample every thread for `seconds` and return folded stacks
+    (load into speedscope or pipe through flamegraph.pl).
+    """
+    sampler = StackSampler(interval=interval_ms / 1000.0, include_idle=include_idle).start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        sampler.stop()
+    return PlainTextResponse(sampler.folded())
+
+
+@router.post("/memory/snapshot")
+async def memory_snapshot(limit: int = Query(20, ge=1, le=200), group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$")):
+    """
+    Take a tracemalloc snapshot (starting tracing on first call) and return top
+    allocators plus growth since the previous snapshot.
+    """
+    return await asyncio.to_thread(memory_tracker.snapshot, limit, 10, group_by)
+
+
+@router.post("/memory/stop")
+async def memory_stop():
+    """Stop tracemalloc and drop the baseline snapshot"""
+    memory_tracker.stop()
+    return {"tracing": False}
+
+
+@router.get("/profile/slow-requests")
+async def slow_request_profiles():
+    """Slowest requests captured by the sampled request profiler"""
+    return {"requests": slow_requests.slowest()}
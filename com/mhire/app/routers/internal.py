@@ -0,0 +1,136 @@
+import hmac
+import logging
+from typing import Optional
+
+import msgpack
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+
+from com.mhire.app.config.config import ADMISSION_RETRY_AFTER_SECONDS, INTERNAL_API_TOKEN
+from com.mhire.app.middleware.admission import Overloaded
+from com.mhire.app.services.audit import audit_decision
+from com.mhire.app.services.deadline import deadline_from_request
+from com.mhire.app.services.multi_provider_transcribe import normalize_provider
+from com.mhire.app.services.pipeline import submit_full_pass, transcribe_and_moderate
+from com.mhire.app.services.tracing import current_span, span
+from com.mhire.app.services.uploads import remove_quietly, spool_stream
+
+logger = logging.getLogger(__name__)
+
+
+def require_internal_token(x_internal_token: str = Header(None)):
+    """Internal endpoints are hidden unless internal_api_token is configured"""
+    if not INTERNAL_API_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_internal_token or not hmac.compare_digest(x_internal_token, INTERNAL_API_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid internal token")
+
+
+router = APIRouter(prefix="/internal", tags=["internal"], dependencies=[Depends(require_internal_token)])
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+TOP_CATEGORIES = 3
+
+# Providers pick the decoder from the file extension
+_SUFFIXES = {
+    "audio/wav": ".wav", "audio/x-wav": ".wav", "audio/wave": ".wav",
+    "audio/mpeg": ".mp3", "audio/mp3": ".mp3",
+    "audio/mp4": ".m4a", "audio/x-m4a": ".m4a",
+    "audio/ogg": ".ogg", "audio/webm": ".webm", "audio/flac": ".flac",
+}
+
+
+def _suffix(content_type, audio_format):
+    if audio_format:
+        return "." + audio_format.lower().lstrip(".")
+    return _SUFFIXES.get((content_type or "").split(";")[0].strip().lower(), ".wav")
+
+
+def slim_payload(result, include_scores=False, include_transcript=False):
+    """Verdict, top scoring categories and flags only, for service-to-service replies"""
+    moderation = result["moderation"] or {}
+    scores = moderation.get("category_scores") or {}
+    top = sorted(((name, score) for name, score in scores.items() if score is not None),
+                 key=lambda item: -item[1])[:TOP_CATEGORIES]
+    payload = {
+        "recommendation": result["recommendation"],
+        "flagged": moderation.get("flagged", False),
+        "top_categories": [[name, round(score, 4)] for name, score in top],
+        "degraded": result["degraded"],
+    }
+    if result.get("policy_categories"):
+        payload["policy_categories"] = result["policy_categories"]
+    if result["degraded"]:
+        payload["degraded_reason"] = result["degraded_reason"]
+    if result.get("provisional"):
+        payload["provisional"] = True
+    if "conversation" in result:
+        payload["conversation_escalated"] = result["conversation"]["escalated_categories"]
+    if include_scores:
+        payload["category_scores"] = scores
+    if include_transcript:
+        payload["transcription"] = result["transcription"]
+    return payload
+
+
+@router.post("/moderate-audio")
+async def moderate_audio_raw(
+    request: Request,
+    x_provider: Optional[str] = Header(None),
+    x_audio_format: Optional[str] = Header(None),
+    x_deadline_ms: Optional[int] = Header(None),
+    x_priority: Optional[str] = Header(None),
+    x_tenant_id: Optional[str] = Header(None),
+    x_conversation_id: Optional[str] = Header(None),
+    x_include_scores: bool = Header(False),
+    x_include_transcript: bool = Header(False),
+    x_full_pass: bool = Header(True),
+    accept: Optional[str] = Header(None),
+):
+    """
+    Service-to-service transcribe-and-moderate. The request body is the raw
+    audio (format from X-Audio-Format or Content-Type) and all options come
+    from headers, so no multipart parsing is needed. The reply is a slim
+    verdict, msgpack-encoded when Accept is application/msgpack. Callers
+    authenticate with the shared X-Internal-Token.
+    """
+    provider = normalize_provider(x_provider)
+    tmp_path = None
+    try:
+        deadline = deadline_from_request(x_deadline_ms)
+        with span("upload.spool"):
+            tmp_path, audio_hash = await spool_stream(
+                request.stream(), _suffix(request.headers.get("content-type"), x_audio_format)
+            )
+
+        result = await transcribe_and_moderate(tmp_path, provider, deadline, priority=x_priority, tenant=x_tenant_id,
+                                               conversation_id=x_conversation_id, audio_hash=audio_hash)
+
+        trace_id = current_span().trace_id
+        full_pass_job = None
+        if result.get("provisional") and x_full_pass:
+            full_pass_job = await submit_full_pass(
+                tmp_path, provider, tenant=x_tenant_id,
+                on_result=lambda full: audit_decision(full, audio_hash, provider, trace_id=trace_id),
+                audio_hash=audio_hash,
+            )
+        remove_quietly(tmp_path)
+        audit_decision(result, audio_hash, provider, trace_id=trace_id)
+
+        with span("response.serialize"):
+            payload = slim_payload(result, x_include_scores, x_include_transcript)
+            if full_pass_job:
+                payload["full_pass_job"] = full_pass_job
+            if accept and MSGPACK_MEDIA_TYPE in accept:
+                return Response(content=msgpack.packb(payload), media_type=MSGPACK_MEDIA_TYPE)
+            return JSONResponse(content=payload)
+
+    except Overloaded as e:
+        logger.warning(f"Rejecting internal audio, pipeline saturated: {str(e)}")
+        remove_quietly(tmp_path)
+        raise HTTPException(status_code=503, detail="Service overloaded, retry later",
+                            headers={"Retry-After": str(ADMISSION_RETRY_AFTER_SECONDS)})
+    except Exception as e:
+        logger.error(f"Error processing internal audio with {provider}: {str(e)}")
+        remove_quietly(tmp_path)
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,16 @@
+import asyncio
+
+from fastapi import APIRouter, HTTPException
+
+from com.mhire.app.services.jobs import job_store
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """Status of a background job, with its result once done, from any worker"""
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job
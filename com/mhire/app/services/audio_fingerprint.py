@@ -0,0 +1,403 @@
+import logging
+import shutil
+import subprocess
+import threading
+import time
+import wave
+from collections import OrderedDict
+
+import numpy as np
+
+from com.mhire.app.config.config import (
+    AUDIO_FINGERPRINT_MAX_BYTES,
+    AUDIO_FINGERPRINT_MAX_ENTRIES,
+    AUDIO_FINGERPRINT_MAX_SECONDS,
+    AUDIO_FINGERPRINT_MIN_MATCHES,
+    AUDIO_FINGERPRINT_MIN_RATIO,
+    AUDIO_FINGERPRINT_TTL_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 8000
+_FRAME = 512          # 64 ms window
+_HOP = 256            # 32 ms hop
+_PEAK_TIME = 7        # peak neighbourhood half-widths (frames, bins)
+_PEAK_FREQ = 7
+_PEAKS_PER_SECOND = 30
+_FAN_OUT = 5
+_MAX_DT = 63          # target zone: up to ~2 s after the anchor
+_T_BITS = 20
+_POSTING_BYTES = 12   # int64 packed (entry, anchor), plus at most a uint32 key and int64 start per hash
+
+
+def decode_pcm(audio_file_path, max_seconds=AUDIO_FINGERPRINT_MAX_SECONDS, sample_rate=SAMPLE_RATE, offset=0.0):
+    """
+    Mono float32 PCM at `sample_rate` for `max_seconds` of the file from
+    `offset` seconds (all the rest when None). WAV is read directly; other
+    formats need ffmpeg. Returns None when the file cannot be decoded.
+    """
+    try:
+        return _decode_wav(audio_file_path, max_seconds, sample_rate, offset)
+    except (wave.Error, EOFError, ValueError):
+        pass
+    if shutil.which("ffmpeg") is None:
+        return None
+    seek = ["-ss", str(offset)] if offset else []
+    limit = [] if max_seconds is None else ["-t", str(max_seconds)]
+    try:
+        completed = subprocess.run(
+            ["ffmpeg", "-v", "quiet", *seek, *limit, "-i", audio_file_path,
+             "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "-"],
+            capture_output=True, timeout=300, check=True,
+        )
+    except (subprocess.SubprocessError, OSError) as e:
+        logger.debug(f"ffmpeg could not decode {audio_file_path}: {str(e)}")
+        return None
+    samples = np.frombuffer(completed.stdout, dtype="<i2").astype(np.float32) / 32768.0
+    return samples if samples.size else None
+
+
+def stream_pcm(audio_file_path, chunk_seconds=30.0, sample_rate=SAMPLE_RATE):
+    """
+    Decode the whole file a chunk at a time, so memory stays bounded by the
+    chunk size. Returns (rate, iterator of mono float32 chunks), or None when
+    the file cannot be decoded. WAV is read at its own rate; other formats
+    are decoded by ffmpeg at `sample_rate`.
+    """
+    try:
+        wav = wave.open(audio_file_path, "rb")
+    except (wave.Error, EOFError):
+        wav = None
+    if wav is not None:
+        return wav.getframerate(), _wav_chunks(wav, chunk_seconds)
+    if shutil.which("ffmpeg") is None:
+        return None
+    try:
+        process = subprocess.Popen(
+            ["ffmpeg", "-v", "quiet", "-i", audio_file_path, "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "-"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+    except OSError as e:
+        logger.debug(f"ffmpeg could not decode {audio_file_path}: {str(e)}")
+        return None
+    return sample_rate, _ffmpeg_chunks(process, int(sample_rate * chunk_seconds) * 2)
+
+
+def _wav_chunks(wav, chunk_seconds):
+    with wav:
+        channels, width = wav.getnchannels(), wav.getsampwidth()
+        frames = int(wav.getframerate() * chunk_seconds)
+        while True:
+            raw = wav.readframes(frames)
+            if not raw:
+                return
+            yield _pcm_from_bytes(raw, width, channels)
+
+
+def _ffmpeg_chunks(process, chunk_bytes):
+    try:
+        while True:
+            raw = process.stdout.read(chunk_bytes)
+            if len(raw) < 2:
+                return
+            yield np.frombuffer(raw[:len(raw) - len(raw) % 2], dtype="<i2").astype(np.float32) / 32768.0
+    finally:
+        process.stdout.close()
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+
+
+def _decode_wav(audio_file_path, max_seconds, sample_rate, offset=0.0):
+    with wave.open(audio_file_path, "rb") as wav:
+        channels, width, rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+        first = min(int(rate * offset), wav.getnframes())
+        wav.setpos(first)
+        raw = wav.readframes(wav.getnframes() - first if max_seconds is None else int(rate * max_seconds))
+    samples = _pcm_from_bytes(raw, width, channels)
+    if rate != sample_rate and samples.size:
+        positions = np.arange(0, samples.size * sample_rate / rate) * rate / sample_rate
+        samples = np.interp(positions, np.arange(samples.size), samples).astype(np.float32)
+    return samples
+
+
+def _pcm_from_bytes(raw, width, channels):
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"unsupported sample width {width}")
+    return samples[:samples.size - samples.size % channels].reshape(-1, channels).mean(axis=1)
+
+
+def _spectrogram(samples):
+    frames = 1 + (samples.size - _FRAME) // _HOP
+    index = np.arange(_FRAME)[None, :] + _HOP * np.arange(frames)[:, None]
+    spectrum = np.abs(np.fft.rfft(samples[index] * np.hanning(_FRAME).astype(np.float32), axis=1))
+    return np.log1p(spectrum * 100.0)
+
+
+def _sliding_max(values, half_width, axis):
+    padded = np.pad(values, [(half_width, half_width) if a == axis else (0, 0) for a in range(values.ndim)],
+                    constant_values=-np.inf)
+    window = np.lib.stride_tricks.sliding_window_view(padded, 2 * half_width + 1, axis=axis)
+    return window.max(axis=-1)
+
+
+def _peaks(spectrogram):
+    """(frame, bin) of local spectral maxima, strongest first, capped per second"""
+    local_max = _sliding_max(_sliding_max(spectrogram, _PEAK_FREQ, 1), _PEAK_TIME, 0)
+    floor = spectrogram.mean() + spectrogram.std()
+    frames, bins = np.nonzero((spectrogram == local_max) & (spectrogram > floor))
+    limit = int(_PEAKS_PER_SECOND * spectrogram.shape[0] * _HOP / SAMPLE_RATE) + 1
+    order = np.argsort(-spectrogram[frames, bins], kind="stable")[:limit]
+    keep = np.sort(order)
+    return frames[keep], bins[keep]
+
+
+def fingerprint_samples(samples):
+    """
+    Landmark fingerprint: each spectral peak is paired with the next few peaks
+    in its target zone and the pair (f1, f2, dt) packed into a 24-bit hash.
+    Returns (hashes, anchor frames) as uint32 arrays sorted by frame.
+    """
+    if samples is None or samples.size < _FRAME * 4:
+        return None
+    frames, bins = _peaks(_spectrogram(samples))
+    hashes, anchors = [], []
+    for i in range(frames.size):
+        targets = 0
+        for j in range(i + 1, frames.size):
+            dt = frames[j] - frames[i]
+            if dt > _MAX_DT:
+                break
+            if dt == 0:
+                continue
+            hashes.append((int(bins[i]) << 15) | (int(bins[j]) << 6) | int(dt))
+            anchors.append(int(frames[i]))
+            targets += 1
+            if targets == _FAN_OUT:
+                break
+    if not hashes:
+        return None
+    return np.asarray(hashes, dtype=np.uint32), np.asarray(anchors, dtype=np.uint32)
+
+
+def fingerprint_audio(audio_file_path):
+    """Fingerprint of an audio file, or None when it cannot be decoded"""
+    return fingerprint_samples(decode_pcm(audio_file_path))
+
+
+class FingerprintMatch:
+    def __init__(self, entry_id, score, transcript, verdict):
+        self.entry_id = entry_id
+        self.score = score
+        self.transcript = transcript
+        self.verdict = verdict
+
+
+class _Entry:
+    __slots__ = ("transcript", "verdict", "inserted_at", "hash_count")
+
+    def __init__(self, transcript, verdict, hash_count):
+        self.transcript = transcript
+        self.verdict = verdict
+        self.inserted_at = time.monotonic()
+        self.hash_count = hash_count
+
+
+class _Segment:
+    """
+    Postings in compressed sparse row form: sorted unique hashes in `keys`,
+    and the postings of keys[i] in values[starts[i]:starts[i + 1]], each
+    packing (entry id << _T_BITS) | anchor frame.
+    """
+    __slots__ = ("keys", "starts", "values")
+
+    def __init__(self, hashes, values, presorted=False):
+        if not presorted:
+            order = np.argsort(hashes, kind="stable")
+            hashes, values = hashes[order], values[order]
+        self.keys, first = np.unique(hashes, return_index=True)
+        self.starts = np.append(first, hashes.size).astype(np.int64)
+        self.values = values
+
+    @property
+    def size(self):
+        return self.values.size
+
+    @property
+    def nbytes(self):
+        return self.keys.nbytes + self.starts.nbytes + self.values.nbytes
+
+    def hashes(self):
+        return np.repeat(self.keys, np.diff(self.starts))
+
+    def find(self, hashes, anchors):
+        """(entry ids, anchor offsets) of every posting matching a query hash; `hashes` must be sorted"""
+        position = np.searchsorted(self.keys, hashes)
+        found = self.keys[np.minimum(position, self.keys.size - 1)] == hashes
+        lo = self.starts[position]
+        counts = np.where(found, self.starts[np.minimum(position + 1, self.keys.size)] - lo, 0)
+        total = int(counts.sum())
+        if total == 0:
+            return None
+        ends = np.cumsum(counts)
+        index = np.repeat(lo - ends + counts, counts) + np.arange(total)
+        values = self.values[index]
+        offsets = (values & ((1 << _T_BITS) - 1)) - np.repeat(anchors.astype(np.int64), counts)
+        return values >> _T_BITS, offsets
+
+
+class AudioFingerprintIndex:
+    """
+    Inverted index from landmark hash to (entry, anchor frame).
+
+    A lookup votes for (entry, time offset) pairs; the same recording, however
+    trimmed, lines up at one offset, so a match needs `min_matches` hashes
+    (and `min_ratio` of the query's hashes) agreeing on a single offset.
+
+    Postings live in a few segments of sorted NumPy arrays (12 bytes per
+    hash) searched with searchsorted. Each new entry adds a segment, and
+    segments of similar size are merged, so there are O(log n) of them.
+    Entries expire after `ttl` seconds or in insertion order past
+    `max_entries` or `max_bytes`; their postings are dropped when the index
+    is compacted.
+    """
+
+    def __init__(self, min_matches=AUDIO_FINGERPRINT_MIN_MATCHES, min_ratio=AUDIO_FINGERPRINT_MIN_RATIO,
+                 ttl=AUDIO_FINGERPRINT_TTL_SECONDS, max_entries=AUDIO_FINGERPRINT_MAX_ENTRIES,
+                 max_bytes=AUDIO_FINGERPRINT_MAX_BYTES):
+        self.min_matches = min_matches
+        self.min_ratio = min_ratio
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._segments = []
+        self._live_postings = 0
+        self._stale_postings = 0
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+
+    def lookup(self, fingerprint):
+        """Best matching earlier recording as a FingerprintMatch, or None"""
+        if fingerprint is None:
+            return None
+        with self._lock:
+            self.lookups += 1
+            self._expire()
+            match = self._best_match(fingerprint)
+            if match is not None:
+                self.hits += 1
+            return match
+
+    def remember(self, fingerprint, transcript, verdict=None):
+        """
+        Record a transcript (and, once known, its verdict). A fingerprint that
+        matches an existing entry updates it instead of adding a new one.
+        """
+        if fingerprint is None:
+            return None
+        with self._lock:
+            self._expire()
+            match = self._best_match(fingerprint)
+            if match is not None:
+                entry = self._entries[match.entry_id]
+                entry.transcript = transcript
+                if verdict is not None:
+                    entry.verdict = verdict
+                return match.entry_id
+
+            hashes, anchors = fingerprint
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _Entry(transcript, verdict, hashes.size)
+            packed = (entry_id << _T_BITS) | np.minimum(anchors, (1 << _T_BITS) - 1).astype(np.int64)
+            self._add_segment(_Segment(hashes.astype(np.uint32), packed))
+            self._live_postings += hashes.size
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries
+                                              or self._live_postings * _POSTING_BYTES > self.max_bytes):
+                self._evict_oldest()
+            return entry_id
+
+    def _add_segment(self, segment):
+        segments = self._segments
+        segments.append(segment)
+        # Merge while the newest segment is at least half the size of the one
+        # before it: segment sizes then roughly double towards the oldest
+        while len(segments) > 1 and segments[-1].size * 2 >= segments[-2].size:
+            newest, older = segments.pop(), segments.pop()
+            segments.append(_Segment(np.concatenate((older.hashes(), newest.hashes())),
+                                     np.concatenate((older.values, newest.values))))
+
+    def _best_match(self, fingerprint):
+        hashes, anchors = fingerprint
+        # Sorted query hashes let searchsorted resume each search from the last
+        order = np.argsort(hashes, kind="stable")
+        sorted_hashes, sorted_anchors = hashes[order], anchors[order]
+        found = [m for m in (segment.find(sorted_hashes, sorted_anchors) for segment in self._segments)
+                 if m is not None]
+        if not found:
+            return None
+        entries = np.concatenate([entry_ids for entry_ids, _ in found])
+        if entries.size < self.min_matches:
+            return None
+        # Trimming by a fraction of a hop can shift peaks by one frame; bin offsets in pairs
+        offsets = np.floor_divide(np.concatenate([offsets for _, offsets in found]), 2) + (1 << _T_BITS)
+        votes_key, votes = np.unique((entries << (_T_BITS + 2)) | offsets, return_counts=True)
+        required = max(self.min_matches, self.min_ratio * hashes.size)
+        for best in np.argsort(-votes, kind="stable"):
+            score = int(votes[best])
+            if score < required:
+                return None
+            entry_id = int(votes_key[best] >> (_T_BITS + 2))
+            entry = self._entries.get(entry_id)
+            if entry is not None:  # otherwise expired, still in the postings
+                return FingerprintMatch(entry_id, round(score / hashes.size, 4), entry.transcript, entry.verdict)
+        return None
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        while self._entries and next(iter(self._entries.values())).inserted_at < cutoff:
+            self._evict_oldest()
+
+    def _evict_oldest(self):
+        _, entry = self._entries.popitem(last=False)
+        self._live_postings -= entry.hash_count
+        self._stale_postings += entry.hash_count
+        if self._stale_postings > self._live_postings:
+            self._compact()
+
+    def _compact(self):
+        live = np.fromiter(self._entries, dtype=np.int64, count=len(self._entries))
+        segments = []
+        for segment in self._segments:
+            keep = np.isin(segment.values >> _T_BITS, live)
+            if keep.any():
+                # Filtering keeps the hash order, so no re-sort is needed
+                segments.append(_Segment(segment.hashes()[keep], segment.values[keep], presorted=True))
+        self._segments = segments
+        self._stale_postings = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "postings": self._live_postings,
+                "segments": len(self._segments),
+                "bytes": sum(segment.nbytes for segment in self._segments),
+                "max_bytes": self.max_bytes,
+                "lookups": self.lookups,
+                "hits": self.hits,
+            }
+
+
+audio_fingerprint_index = AudioFingerprintIndex()
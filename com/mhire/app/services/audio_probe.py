@@ -0,0 +1,99 @@
+import os
+import struct
+
+# Fallback when the container header gives nothing usable: 128 kbit/s
+DEFAULT_BYTES_PER_SECOND = 16000
+
+_MP3_BITRATES = {
+    # (mpeg version bits, layer bits) -> kbit/s table indexed by bitrate bits
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0],  # MPEG-1 layer III
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0],      # MPEG-2/2.5 layer III
+}
+_MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def estimate_duration(audio_file_path):
+    """
+    Estimate audio duration in seconds from the file header only (WAV, FLAC,
+    MP3), without decoding. Falls back to a size-based guess.
+    """
+    size = os.path.getsize(audio_file_path)
+    with open(audio_file_path, "rb") as f:
+        header = f.read(64 * 1024)
+
+    for probe in (_wav_duration, _flac_duration, _mp3_duration):
+        try:
+            duration = probe(header, size)
+        except (struct.error, IndexError, ValueError, ZeroDivisionError):
+            duration = None
+        if duration:
+            return duration
+    return size / DEFAULT_BYTES_PER_SECOND
+
+
+def _wav_duration(header, size):
+    if header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        return None
+    offset, byte_rate = 12, None
+    while offset + 8 <= len(header):
+        chunk_id, chunk_size = struct.unpack_from("<4sI", header, offset)
+        if chunk_id == b"fmt ":
+            byte_rate = struct.unpack_from("<I", header, offset + 16)[0]
+        elif chunk_id == b"data" and byte_rate:
+            # Streamed WAVs may carry a placeholder size; trust the file size then
+            data_size = min(chunk_size, size - offset - 8)
+            return data_size / byte_rate
+        offset += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+
+def _flac_duration(header, size):
+    if header[:4] != b"fLaC":
+        return None
+    # STREAMINFO is always the first metadata block
+    info = header[8:8 + 34]
+    packed = int.from_bytes(info[10:18], "big")
+    sample_rate = packed >> 44
+    total_samples = packed & ((1 << 36) - 1)
+    return total_samples / sample_rate if sample_rate and total_samples else None
+
+
+def _mp3_duration(header, size):
+    offset = 0
+    if header[:3] == b"ID3":
+        tag_size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+        offset = 10 + tag_size
+        if offset + 4 > len(header):
+            return None
+
+    # Find the first frame sync
+    while offset + 4 <= len(header):
+        if header[offset] == 0xFF and (header[offset + 1] & 0xE0) == 0xE0:
+            break
+        offset += 1
+    else:
+        return None
+
+    b1, b2, b3 = header[offset + 1], header[offset + 2], header[offset + 3]
+    version = (b1 >> 3) & 0x03      # 3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5
+    bitrate_index = (b2 >> 4) & 0x0F
+    sample_rate_index = (b2 >> 2) & 0x03
+    if version == 1 or sample_rate_index == 3:
+        return None
+    sample_rate = _MP3_SAMPLE_RATES[version][sample_rate_index]
+    samples_per_frame = 1152 if version == 3 else 576
+
+    # VBR files carry a Xing/Info header with the total frame count
+    mono = ((b3 >> 6) & 0x03) == 3
+    side_info = (17 if mono else 32) if version == 3 else (9 if mono else 17)
+    xing = offset + 4 + side_info
+    if header[xing:xing + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack_from(">I", header, xing + 4)[0]
+        if flags & 0x1:
+            frames = struct.unpack_from(">I", header, xing + 8)[0]
+            return frames * samples_per_frame / sample_rate
+
+    bitrate = _MP3_BITRATES[1 if version == 3 else 2][bitrate_index] * 1000
+    if not bitrate:
+        return None
+    return (size - offset) * 8 / bitrate
@@ -0,0 +1,97 @@
+import tempfile
+import wave
+
+import numpy as np
+
+from com.mhire.app.config.config import SAMPLING_ENERGY_WINDOWS, SAMPLING_WINDOW_SECONDS
+from com.mhire.app.services.audio_fingerprint import decode_pcm, stream_pcm
+
+SAMPLE_RATE = 16000
+_BLOCK_SECONDS = 0.5
+_GAP_SECONDS = 0.3
+
+
+def energy_profile(audio_file_path):
+    """
+    Mean energy of every _BLOCK_SECONDS block and the duration in seconds,
+    from a chunked decode so long files never sit in memory whole. Returns
+    None when the audio cannot be decoded.
+    """
+    stream = stream_pcm(audio_file_path)
+    if stream is None:
+        return None
+    rate, chunks = stream
+    block = int(rate * _BLOCK_SECONDS)
+    energies, carry, total = [], np.zeros(0, dtype=np.float32), 0
+    try:
+        for chunk in chunks:
+            total += chunk.size
+            samples = np.concatenate((carry, chunk))
+            usable = samples.size - samples.size % block
+            if usable:
+                energies.append(np.square(samples[:usable].reshape(-1, block), dtype=np.float64).mean(axis=1))
+            carry = samples[usable:]
+    except ValueError:
+        return None
+    if total == 0:
+        return None
+    return (np.concatenate(energies) if energies else np.zeros(0)), total / rate
+
+
+def select_windows(energy, duration, window_seconds=SAMPLING_WINDOW_SECONDS, energy_windows=SAMPLING_ENERGY_WINDOWS):
+    """
+    (start, end) seconds of the windows worth transcribing first: the start,
+    the end, and the `energy_windows` loudest non-overlapping windows between,
+    from the per-block `energy` profile. Short audio yields a single window
+    covering all of it.
+    """
+    if duration <= window_seconds * (2 + energy_windows):
+        return [(0.0, duration)]
+
+    span = int(window_seconds / _BLOCK_SECONDS)
+    cumulative = np.concatenate(([0.0], np.cumsum(energy)))
+    window_energy = cumulative[span:] - cumulative[:-span]   # window starting at each block
+
+    chosen = [0, window_energy.size - 1]
+    taken = np.zeros(window_energy.size, dtype=bool)
+    for start in chosen:
+        taken[max(start - span + 1, 0):start + span] = True
+    for _ in range(energy_windows):
+        candidates = np.where(taken, -np.inf, window_energy)
+        best = int(candidates.argmax())
+        if not np.isfinite(candidates[best]):
+            break
+        chosen.append(best)
+        taken[max(best - span + 1, 0):best + span] = True
+
+    return [(start * _BLOCK_SECONDS, (start + span) * _BLOCK_SECONDS) for start in sorted(chosen)]
+
+
+def build_sample_clip(audio_file_path):
+    """
+    Write the selected windows, separated by short silences, to a temporary
+    16 kHz mono WAV. Only the windows are decoded at full rate; they are
+    chosen from a streamed energy profile. Returns (clip path, windows, clip
+    seconds), or None when the audio cannot be decoded.
+    """
+    profile = energy_profile(audio_file_path)
+    if profile is None:
+        return None
+    windows = select_windows(*profile)
+    gap = np.zeros(int(SAMPLE_RATE * _GAP_SECONDS), dtype=np.float32)
+    pieces = []
+    for start, end in windows:
+        samples = decode_pcm(audio_file_path, max_seconds=end - start, sample_rate=SAMPLE_RATE, offset=start)
+        if samples is None:
+            return None
+        pieces.extend((samples, gap))
+    clip = np.concatenate(pieces[:-1])
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix="_sample.wav") as tmp_file:
+        clip_path = tmp_file.name
+    with wave.open(clip_path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes((np.clip(clip, -1.0, 1.0) * 32767).astype("<i2").tobytes())
+    return clip_path, windows, clip.size / SAMPLE_RATE
@@ -0,0 +1,359 @@
+import atexit
+import fcntl
+import glob
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from com.mhire.app.config.config import (
+    AUDIT_BATCH_SIZE,
+    AUDIT_DB_PATH,
+    AUDIT_FLUSH_INTERVAL_SECONDS,
+    AUDIT_MAX_BUFFER,
+)
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS moderation_audit (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    audio_hash TEXT,
+    provider TEXT,
+    transcript TEXT,
+    flagged INTEGER NOT NULL,
+    recommendation TEXT,
+    degraded INTEGER NOT NULL DEFAULT 0,
+    category_scores TEXT,
+    timings TEXT,
+    trace_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_audit_ts ON moderation_audit(ts);
+CREATE INDEX IF NOT EXISTS idx_audit_hash ON moderation_audit(audio_hash, ts);
+CREATE TABLE IF NOT EXISTS moderation_audit_category (
+    audit_id INTEGER NOT NULL REFERENCES moderation_audit(id),
+    category TEXT NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_audit_category ON moderation_audit_category(category, ts);
+CREATE TABLE IF NOT EXISTS audit_spill_progress (
+    path TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL
+);
+"""
+
+# After a failed spill load, wait this long before retrying
+_SPILL_RETRY_SECONDS = 30.0
+
+
+class AuditSink:
+    """
+    Write-behind audit log. emit() only enqueues and never blocks the request;
+    a writer thread drains the queue in batches, one transaction per batch.
+    The queue is bounded: when it is full, records go to a second queue that
+    a spill thread appends to a spill file (`<db_path>.spill.jsonl`). Records
+    are only dropped, and logged as errors, if that queue is full too or the
+    spill write fails.
+
+    Whenever its queue is empty the writer claims the spill file (renaming
+    it to `<spill>.<pid>.<ns>`) and loads it in batches of `batch_size`. The
+    offset reached is committed with each batch, and a claimed file is
+    locked while it is loaded, so a load that failed or whose process died
+    is resumed later, by any worker, without writing records twice.
+    """
+
+    def __init__(self, db_path, max_buffer=AUDIT_MAX_BUFFER, batch_size=AUDIT_BATCH_SIZE,
+                 flush_interval=AUDIT_FLUSH_INTERVAL_SECONDS):
+        self.db_path = db_path
+        self.spill_path = db_path + ".spill.jsonl"
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_buffer)
+        self._spill_queue = queue.Queue(maxsize=max_buffer)
+        self.written = 0
+        self.spilled = 0
+        self.dropped = 0
+        self._last_spill_log = 0.0
+        self._last_drop_log = 0.0
+        self._next_spill_load = 0.0
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+        self._writer = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._writer.start()
+        self._spiller = threading.Thread(target=self._run_spill, name="audit-spill", daemon=True)
+        self._spiller.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def emit(self, record):
+        """Queue a record without blocking, for the spill file when the buffer is full; False if dropped"""
+        record.setdefault("ts", time.time())
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            pass
+        try:
+            self._spill_queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            now = time.monotonic()
+            if now - self._last_drop_log > 10:
+                self._last_drop_log = now
+                logger.error(f"Audit buffer and spill queue full, {self.dropped} records dropped so far")
+            return False
+
+    def _run_spill(self):
+        while True:
+            batch = [self._spill_queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._spill_queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._spill("".join(json.dumps(record) + "\n" for record in batch).encode("utf-8"))
+                self.spilled += len(batch)
+                now = time.monotonic()
+                if now - self._last_spill_log > 10:
+                    self._last_spill_log = now
+                    logger.error(f"Audit buffer full, {self.spilled} records spilled to {self.spill_path} so far")
+            except Exception as e:
+                self.dropped += len(batch)
+                logger.error(f"Audit spill failed, {self.dropped} records dropped so far: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._spill_queue.task_done()
+
+    def _spill(self, data):
+        # One O_APPEND write per batch keeps lines from several worker
+        # processes sharing the spill file from interleaving. The lock and
+        # the inode check keep appends out of a file the writer has just
+        # claimed (renamed) for loading.
+        while True:
+            fd = os.open(self.spill_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                if _is_current(fd, self.spill_path):
+                    os.write(fd, data)
+                    return
+            finally:
+                os.close(fd)
+
+    def _claim_spill(self):
+        """Rename the spill file to a name of this process's own, once no append is in progress"""
+        try:
+            fd = os.open(self.spill_path, os.O_RDONLY)
+        except FileNotFoundError:
+            return
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if _is_current(fd, self.spill_path):
+                os.rename(self.spill_path, f"{self.spill_path}.{os.getpid()}.{time.time_ns()}")
+        finally:
+            os.close(fd)
+
+    def _load_spill(self, conn):
+        """
+        Move spilled records into the database: the current spill file and
+        any claimed file whose load failed or whose process died.
+        """
+        if time.monotonic() < self._next_spill_load:
+            return
+        try:
+            self._claim_spill()
+            for path in sorted(glob.glob(glob.escape(self.spill_path) + ".*")):
+                self._load_claimed(conn, path)
+        except Exception as e:
+            self._next_spill_load = time.monotonic() + _SPILL_RETRY_SECONDS
+            logger.error(f"Failed to load spilled audit records, retrying in {_SPILL_RETRY_SECONDS:.0f}s: {str(e)}")
+
+    def _load_claimed(self, conn, path):
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return   # another worker is loading it
+            if not _is_current(f.fileno(), path):
+                return   # loaded and removed while we waited
+            row = conn.execute("SELECT offset FROM audit_spill_progress WHERE path = ?", (path,)).fetchone()
+            f.seek(row[0] if row else 0)
+            loaded, batch = 0, []
+            while True:
+                line = f.readline()
+                if line.strip():
+                    try:
+                        batch.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        logger.warning(f"Skipping malformed spilled audit record in {path}")
+                if batch and (len(batch) >= self.batch_size or not line):
+                    self._write(conn, batch, progress=(path, f.tell()))
+                    loaded += len(batch)
+                    batch = []
+                if not line:
+                    break
+            os.remove(path)
+            with conn:
+                conn.execute("DELETE FROM audit_spill_progress WHERE path = ?", (path,))
+        logger.info(f"Loaded {loaded} spilled audit records from {path}")
+
+    def _run(self):
+        conn = self._connect()
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                self._load_spill(conn)
+                continue
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._write(conn, batch)
+            except Exception as e:
+                logger.error(f"Failed to write {len(batch)} audit records: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, conn, batch, progress=None):
+        with conn:
+            if progress is not None:
+                # Spill file offset, committed with the records it covers
+                conn.execute("INSERT OR REPLACE INTO audit_spill_progress (path, offset) VALUES (?, ?)", progress)
+            for record in batch:
+                scores = record.get("category_scores") or {}
+                cursor = conn.execute(
+                    "INSERT INTO moderation_audit (ts, audio_hash, provider, transcript, flagged, recommendation,"
+                    " degraded, category_scores, timings, trace_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        record["ts"], record.get("audio_hash"), record.get("provider"), record.get("transcript"),
+                        int(bool(record.get("flagged"))), record.get("recommendation"),
+                        int(bool(record.get("degraded"))), json.dumps(scores),
+                        json.dumps(record.get("timings") or {}), record.get("trace_id"),
+                    ),
+                )
+                flagged_categories = [c for c, value in (record.get("categories") or {}).items() if value]
+                conn.executemany(
+                    "INSERT INTO moderation_audit_category (audit_id, category, ts) VALUES (?, ?, ?)",
+                    [(cursor.lastrowid, category, record["ts"]) for category in flagged_categories],
+                )
+        self.written += len(batch)
+
+    def flush(self):
+        """Block until every queued record has been written to the database or the spill file"""
+        self._spill_queue.join()
+        self._queue.join()
+
+    def query(self, start=None, end=None, category=None, audio_hash=None, limit=100):
+        """Audit records filtered by time range, flagged category and audio hash, newest first"""
+        sql = "SELECT a.* FROM moderation_audit a"
+        clauses, params = [], []
+        if category:
+            sql += " JOIN moderation_audit_category c ON c.audit_id = a.id"
+            clauses.append("c.category = ?")
+            params.append(category)
+        if start is not None:
+            clauses.append("a.ts >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("a.ts < ?")
+            params.append(end)
+        if audio_hash:
+            clauses.append("a.audio_hash = ?")
+            params.append(audio_hash)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY a.ts DESC LIMIT ?"
+        params.append(limit)
+
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+        records = []
+        for row in rows:
+            record = dict(row)
+            record["flagged"] = bool(record["flagged"])
+            record["degraded"] = bool(record["degraded"])
+            record["category_scores"] = json.loads(record["category_scores"] or "{}")
+            record["timings"] = json.loads(record["timings"] or "{}")
+            records.append(record)
+        return records
+
+    def stats(self):
+        return {"queued": self._queue.qsize(), "spill_queued": self._spill_queue.qsize(), "written": self.written,
+                "spilled": self.spilled, "dropped": self.dropped}
+
+
+def _is_current(fd, path):
+    """Whether the open file `fd` is still the file at `path`"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return False
+    fst = os.fstat(fd)
+    return (st.st_dev, st.st_ino) == (fst.st_dev, fst.st_ino)
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_audit_sink():
+    """
+    Process-wide sink, created on first use; None when auditing is disabled.
+    Creating it sets up the schema, so the apps call this once at startup
+    from a thread.
+    """
+    global _sink
+    if _sink is None and AUDIT_DB_PATH:
+        with _sink_lock:
+            if _sink is None:
+                _sink = AuditSink(AUDIT_DB_PATH)
+                atexit.register(_sink.flush)
+    return _sink
+
+
+def audit_decision(result, audio_hash, provider, trace_id=None):
+    """Emit a pipeline result to the audit sink without blocking"""
+    sink = get_audit_sink()
+    if sink is None:
+        return False
+    moderation = result.get("moderation") or {}
+    return sink.emit({
+        "audio_hash": audio_hash,
+        "provider": provider,
+        "transcript": result.get("transcription"),
+        "flagged": moderation.get("flagged", False),
+        "categories": moderation.get("categories"),
+        "category_scores": moderation.get("category_scores"),
+        "recommendation": result.get("recommendation"),
+        "degraded": result.get("degraded", False),
+        "timings": result.get("timings"),
+        "trace_id": trace_id,
+    })
@@ -0,0 +1,247 @@
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from com.mhire.app.services.audio_probe import estimate_duration
+from com.mhire.app.services.pipeline import moderate_audio_file
+from com.mhire.app.services.policy import moderation_policy
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = {".mp3", ".wav", ".m4a", ".ogg", ".flac", ".webm", ".mp4"}
+
+
+def load_manifest(source):
+    """
+    Work items from a directory (every audio file, recursively) or a JSONL
+    manifest with one {"path": ..., "id": ...} object per line. Relative
+    manifest paths are resolved against the manifest's directory.
+    """
+    items = []
+    if os.path.isdir(source):
+        for root, _, files in os.walk(source):
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS:
+                    path = os.path.join(root, name)
+                    items.append({"id": os.path.relpath(path, source), "path": path})
+        items.sort(key=lambda item: item["id"])
+        return items
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            path = entry.get("path") or entry.get("audio_path")
+            if not path:
+                logger.warning(f"{source}:{line_number}: no path, skipping")
+                continue
+            if not os.path.isabs(path):
+                path = os.path.join(base, path)
+            items.append({**entry, "id": str(entry.get("id", path)), "path": path})
+    return items
+
+
+def load_completed(output_path, retry_errors=False):
+    """
+    Ids already present in the output JSONL, which doubles as the checkpoint.
+    A torn last line from a crash is truncated away.
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    valid_bytes = 0
+    with open(output_path, "rb") as f:
+        for raw in f:
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                break
+            valid_bytes += len(raw)
+            if retry_errors and record.get("status") == "error":
+                continue
+            completed.add(record["id"])
+    if valid_bytes < os.path.getsize(output_path):
+        with open(output_path, "r+b") as f:
+            f.truncate(valid_bytes)
+    return completed
+
+
+def drop_error_records(output_path, ids):
+    """
+    Rewrite the output JSONL without the error records of `ids`, which are
+    about to be retried, so every id keeps a single result line. The file is
+    replaced atomically; returns the number of records removed.
+    """
+    if not ids or not os.path.exists(output_path):
+        return 0
+    removed = 0
+    tmp_path = f"{output_path}.tmp"
+    with open(output_path, "rb") as source, open(tmp_path, "wb") as sink:
+        for raw in source:
+            record = json.loads(raw)
+            if record.get("status") == "error" and record["id"] in ids:
+                removed += 1
+                continue
+            sink.write(raw)
+        sink.flush()
+        os.fsync(sink.fileno())
+    if removed:
+        os.replace(tmp_path, output_path)
+    else:
+        os.remove(tmp_path)
+    return removed
+
+
+class BatchStats:
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.errors = 0
+        self.audio_seconds = 0.0
+        self.started = time.monotonic()
+
+    def summary(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            "processed": self.done,
+            "remaining": self.total - self.done,
+            "errors": self.errors,
+            "error_rate": round(self.errors / self.done, 4) if self.done else 0.0,
+            "elapsed_seconds": round(elapsed, 2),
+            "files_per_second": round(self.done / elapsed, 3),
+            "audio_seconds_per_second": round(self.audio_seconds / elapsed, 3),
+        }
+
+
+def _process(item, provider, timeout, tenant):
+    start = time.time()
+    try:
+        audio_seconds = estimate_duration(item["path"])
+        # The policy is evaluated per batch of finished items in run_batch
+        result = moderate_audio_file(item["path"], provider, timeout=timeout, evaluate_policy=False)
+        return {
+            "id": item["id"],
+            "path": item["path"],
+            "status": "ok",
+            "provider": provider,
+            "tenant": item.get("tenant", tenant),
+            "audio_seconds": round(audio_seconds, 3),
+            "transcription": result["transcription"],
+            "moderation": result["moderation"],
+            "recommendation": None,
+            "elapsed": round(time.time() - start, 3),
+        }
+    except Exception as e:
+        return {
+            "id": item["id"],
+            "path": item["path"],
+            "status": "error",
+            "provider": provider,
+            "error": str(e),
+            "elapsed": round(time.time() - start, 3),
+        }
+
+
+def apply_policy_batch(records, tenant=None):
+    """
+    Fill recommendation and policy_categories of successful records with one
+    vectorized policy pass; `tenant` applies to records without their own.
+    """
+    scored = [record for record in records if record.get("moderation") is not None]
+    if not scored:
+        return records
+    verdicts = moderation_policy.evaluate_payloads([r["moderation"] for r in scored],
+                                                   [r.get("tenant") or tenant for r in scored])
+    for record, (recommendation, categories) in zip(scored, verdicts):
+        record["recommendation"] = recommendation
+        record["policy_categories"] = categories
+    return records
+
+
+def reapply_policy(input_path, output_path, chunk_size=10000, tenant=None):
+    """
+    Re-evaluate the current policy over an existing results JSONL, chunk by
+    chunk, without calling any provider. `tenant` applies to records without
+    their own. Returns the number of records; raises ValueError if the output
+    is the input, which opening it for writing would truncate.
+    """
+    if os.path.realpath(input_path) == os.path.realpath(output_path) or (
+            os.path.exists(output_path) and os.path.samefile(input_path, output_path)):
+        raise ValueError(f"Output {output_path} is the input file; write the rescored results elsewhere")
+    count = 0
+    with open(input_path, "r", encoding="utf-8") as source, open(output_path, "w", encoding="utf-8") as sink:
+        chunk = []
+        for line in source:
+            if line.strip():
+                chunk.append(json.loads(line))
+            if len(chunk) == chunk_size:
+                sink.writelines(json.dumps(r) + "\n" for r in apply_policy_batch(chunk, tenant))
+                count += len(chunk)
+                chunk = []
+        sink.writelines(json.dumps(r) + "\n" for r in apply_policy_batch(chunk, tenant))
+        count += len(chunk)
+    return count
+
+
+def run_batch(items, output_path, provider="openai_whisper", workers=4, timeout=None,
+              retry_errors=False, progress_interval=10.0, tenant=None, out=sys.stderr):
+    """
+    Process items in parallel and append one JSON result per line to
+    output_path, skipping ids already there so an interrupted run resumes.
+    With retry_errors, failed items are processed again and their old error
+    lines are removed from the output first. The moderation policy (for `tenant`, or each item's own "tenant") is
+    applied to each group of finished items at once.
+    """
+    completed = load_completed(output_path, retry_errors=retry_errors)
+    pending = [item for item in items if item["id"] not in completed]
+    if retry_errors:
+        drop_error_records(output_path, {item["id"] for item in pending})
+    stats = BatchStats(len(pending))
+    print(f"{len(items)} items, {len(items) - len(pending)} already done, {len(pending)} to process "
+          f"with {workers} workers ({provider})", file=out)
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    last_report = time.monotonic()
+    queue = iter(pending)
+    in_flight = set()
+
+    with open(output_path, "a", encoding="utf-8") as sink, ThreadPoolExecutor(max_workers=workers) as executor:
+        def submit_next():
+            item = next(queue, None)
+            if item is not None:
+                in_flight.add(executor.submit(_process, item, provider, timeout, tenant))
+
+        # Bound in-flight work so huge manifests don't create millions of futures
+        for _ in range(workers * 2):
+            submit_next()
+
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            in_flight.difference_update(finished)
+            for record in apply_policy_batch([future.result() for future in finished]):
+                sink.write(json.dumps(record) + "\n")
+                stats.done += 1
+                if record["status"] == "error":
+                    stats.errors += 1
+                else:
+                    stats.audio_seconds += record["audio_seconds"]
+                submit_next()
+            sink.flush()
+
+            if time.monotonic() - last_report >= progress_interval:
+                last_report = time.monotonic()
+                print(f"progress: {json.dumps(stats.summary())}", file=out)
+
+        os.fsync(sink.fileno())
+
+    summary = stats.summary()
+    print(f"done: {json.dumps(summary)}", file=out)
+    return summary
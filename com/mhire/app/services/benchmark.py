@@ -0,0 +1,122 @@
+import math
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from com.mhire.app.services.multi_provider_transcribe import call_provider, normalize_provider
+from com.mhire.app.services.transcribe_standin import transcribe_audio_standin
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(pct / 100.0 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def _words(text):
+    return re.findall(r"[a-z0-9']+", (text or "").lower())
+
+
+def word_agreement(a, b):
+    """1 - word error rate between two transcripts, symmetric, in [0, 1]"""
+    left, right = _words(a), _words(b)
+    if not left and not right:
+        return 1.0
+    previous = list(range(len(right) + 1))
+    for i, word in enumerate(left, 1):
+        current = [i]
+        for j, other in enumerate(right, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (word != other)))
+        previous = current
+    return max(1.0 - previous[-1] / max(len(left), len(right)), 0.0)
+
+
+def _run_provider(provider, audio_paths, concurrency, repeats, use_standins):
+    """
+    Run one provider over the corpus; returns per-call samples and wall time.
+    Calls go straight to the provider: cached transcripts and rate limit
+    waits would be timed instead of the provider otherwise.
+    """
+    transcribe = transcribe_audio_standin if use_standins else call_provider
+    samples = []
+
+    def call(path):
+        start = time.perf_counter()
+        try:
+            text = transcribe(path, provider)
+            return path, time.perf_counter() - start, text, None
+        except Exception as e:
+            return path, time.perf_counter() - start, None, str(e)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"bench-{provider}") as executor:
+        futures = [executor.submit(call, path) for _ in range(repeats) for path in audio_paths]
+        for future in as_completed(futures):
+            samples.append(future.result())
+    return samples, time.perf_counter() - started
+
+
+def run_benchmark(audio_paths, providers, concurrency=4, repeats=1, use_standins=False):
+    """
+    Transcribe every file with every provider, all providers concurrently,
+    and report latency distribution, throughput, bytes uploaded, error rate
+    and pairwise transcript agreement.
+    """
+    providers = list(dict.fromkeys(normalize_provider(p) for p in providers))
+    sizes = {path: os.path.getsize(path) for path in audio_paths}
+
+    with ThreadPoolExecutor(max_workers=len(providers)) as executor:
+        futures = {
+            provider: executor.submit(_run_provider, provider, audio_paths, concurrency, repeats, use_standins)
+            for provider in providers
+        }
+        runs = {provider: future.result() for provider, future in futures.items()}
+
+    results = {}
+    transcripts = {}
+    for provider, (samples, wall) in runs.items():
+        latencies = sorted(latency for _, latency, _, error in samples if error is None)
+        errors = [error for _, _, _, error in samples if error is not None]
+        transcripts[provider] = {path: text for path, _, text, error in samples if error is None}
+        results[provider] = {
+            "requests": len(samples),
+            "errors": len(errors),
+            "error_rate": round(len(errors) / len(samples), 4) if samples else 0.0,
+            "latency": {
+                "mean": round(sum(latencies) / len(latencies), 4) if latencies else None,
+                "min": round(latencies[0], 4) if latencies else None,
+                "p50": _round(percentile(latencies, 50)),
+                "p90": _round(percentile(latencies, 90)),
+                "p95": _round(percentile(latencies, 95)),
+                "p99": _round(percentile(latencies, 99)),
+                "max": round(latencies[-1], 4) if latencies else None,
+            },
+            "wall_time": round(wall, 4),
+            "throughput_rps": round(len(latencies) / wall, 4) if wall > 0 else None,
+            "bytes_uploaded": sum(sizes[path] for path, _, _, _ in samples),
+            "sample_errors": errors[:3],
+        }
+
+    agreement = {}
+    for i, left in enumerate(providers):
+        for right in providers[i + 1:]:
+            common = set(transcripts[left]) & set(transcripts[right])
+            if common:
+                score = sum(word_agreement(transcripts[left][p], transcripts[right][p]) for p in common) / len(common)
+                agreement[f"{left}|{right}"] = round(score, 4)
+
+    return {
+        "files": len(audio_paths),
+        "repeats": repeats,
+        "concurrency": concurrency,
+        "standins": use_standins,
+        "providers": results,
+        "agreement": agreement,
+    }
+
+
+def _round(value):
+    return None if value is None else round(value, 4)
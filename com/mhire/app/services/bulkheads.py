@@ -0,0 +1,109 @@
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from com.mhire.app.config.config import BULKHEAD_POOL_SIZES, DEFAULT_BULKHEAD_POOL_SIZE
+from com.mhire.app.services.tracing import current_span
+
+
+class Bulkhead:
+    """
+    Dedicated, sized thread pool for one pipeline stage.
+
+    Blocking work (file IO, provider HTTP calls) is pushed here from async
+    endpoints so each stage saturates only its own workers.
+    """
+
+    def __init__(self, name, max_workers):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"bulkhead-{name}")
+        self._lock = threading.Lock()
+        self._created_at = time.monotonic()
+        self.submitted = 0
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.busy_seconds = 0.0
+        self.queue_wait_seconds = 0.0
+
+    async def run(self, fn, *args, **kwargs):
+        """Run a blocking callable on this pool and await its result"""
+        # Executor threads do not propagate contextvars on their own
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, self._call, fn, time.monotonic(), args, kwargs)
+        with self._lock:
+            self.submitted += 1
+        future = self._executor.submit(call)
+        # A call cancelled while queued (e.g. its deadline fired) never runs
+        future.add_done_callback(self._count_cancelled)
+        return await asyncio.wrap_future(future)
+
+    def _count_cancelled(self, future):
+        if future.cancelled():
+            with self._lock:
+                self.cancelled += 1
+
+    def _call(self, fn, submitted_at, args, kwargs):
+        started_at = time.monotonic()
+        with self._lock:
+            self.active += 1
+            self.queue_wait_seconds += started_at - submitted_at
+        active_span = current_span()
+        if active_span is not None:
+            active_span.set_attribute(f"bulkhead.{self.name}.queue_wait_ms", round((started_at - submitted_at) * 1000, 3))
+        ok = False
+        try:
+            result = fn(*args, **kwargs)
+            ok = True
+            return result
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.busy_seconds += time.monotonic() - started_at
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+
+    def stats(self):
+        with self._lock:
+            elapsed = max(time.monotonic() - self._created_at, 1e-9)
+            finished = self.completed + self.failed
+            return {
+                "max_workers": self.max_workers,
+                "active": self.active,
+                "queued": self.submitted - finished - self.active - self.cancelled,
+                "completed": self.completed,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+                "utilization": round(self.busy_seconds / (elapsed * self.max_workers), 4),
+                "avg_queue_wait": round(self.queue_wait_seconds / finished, 4) if finished else 0.0,
+            }
+
+
+_bulkheads = {}
+_registry_lock = threading.Lock()
+
+
+def get_bulkhead(name):
+    """Return the pool for a stage, creating it on first use from config"""
+    bulkhead = _bulkheads.get(name)
+    if bulkhead is None:
+        with _registry_lock:
+            bulkhead = _bulkheads.get(name)
+            if bulkhead is None:
+                size = BULKHEAD_POOL_SIZES.get(name, DEFAULT_BULKHEAD_POOL_SIZE)
+                bulkhead = _bulkheads[name] = Bulkhead(name, size)
+    return bulkhead
+
+
+def bulkhead_stats():
+    """Utilization metrics for every configured or created pool"""
+    for name in BULKHEAD_POOL_SIZES:
+        get_bulkhead(name)
+    return {name: bulkhead.stats() for name, bulkhead in sorted(_bulkheads.items())}
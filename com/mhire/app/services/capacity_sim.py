@@ -0,0 +1,578 @@
+import heapq
+import itertools
+import math
+import random
+from collections import deque
+
+import numpy as np
+
+from com.mhire.app.config.config import (
+    ADMISSION_LIMITS,
+    ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    BULKHEAD_POOL_SIZES,
+    DEFAULT_BULKHEAD_POOL_SIZE,
+    PRIORITY_CLASS_WEIGHTS,
+    PROVIDER_RATE_LIMITS,
+    RATE_LIMIT_BURST_SECONDS,
+    SAMPLING_ENERGY_WINDOWS,
+    SAMPLING_WINDOW_SECONDS,
+    SCHEDULER_AGING_RATE,
+    SCHEDULER_CAPACITY,
+    SCHEDULER_MAX_WAITING,
+    STANDIN_LATENCY_MODELS,
+    STANDIN_MODERATION_LATENCY_SECONDS,
+    WORKER_COUNT,
+)
+from com.mhire.app.services.audio_probe import DEFAULT_BYTES_PER_SECOND
+
+ROUTING_POLICIES = ("round_robin", "random", "least_conn")
+_MB = 1024 * 1024
+# Outcomes whose recorded stage times are complete, not cut short by a deadline
+_FULL_TRANSCRIPTION = ("ok", "near_duplicate", "moderation_deadline_exceeded")
+_FULL_MODERATION = ("ok",)
+# normalize_provider()'s fallback, for traces of requests shed before the provider was known
+_DEFAULT_PROVIDER = "openai_whisper"
+
+
+def fit_latency_models(traces, min_samples=5):
+    """
+    Per provider (base seconds, seconds per MB) least-squares fit of recorded
+    transcription times against upload size, in the STANDIN_LATENCY_MODELS
+    format. Providers with too few clean samples keep the configured model.
+    """
+    models = dict(STANDIN_LATENCY_MODELS)
+    by_provider = {}
+    for trace in traces:
+        seconds = trace["stages"].get("transcription_time")
+        if seconds is None or trace["outcome"] not in _FULL_TRANSCRIPTION or trace.get("provisional"):
+            continue
+        by_provider.setdefault(trace["provider"], []).append(((trace["audio_bytes"] or 0) / _MB, seconds))
+    for provider, samples in by_provider.items():
+        if len(samples) < min_samples:
+            continue
+        sizes, seconds = np.array(samples, dtype=float).T
+        if np.ptp(sizes) > 0:
+            per_mb, base = np.linalg.lstsq(np.column_stack([sizes, np.ones_like(sizes)]), seconds, rcond=None)[0]
+        else:
+            per_mb, base = 0.0, float(np.median(seconds))
+        models[provider] = (round(max(float(base), 0.0), 4), round(max(float(per_mb), 0.0), 4))
+    return models
+
+
+def _model_seconds(models, provider, audio_bytes):
+    base, per_mb = models.get(provider, (0.5, 0.5))
+    return base + per_mb * (audio_bytes or 0) / _MB
+
+
+class CapacitySettings:
+    """
+    One deployment to simulate. Limits mirror config.py: admission and
+    scheduler limits are totals per replica (host), split across its workers
+    like per_worker() does; bulkhead pool sizes are per worker process.
+    """
+
+    def __init__(self, replicas=1, workers=WORKER_COUNT, routing="round_robin", endpoint="/transcribe-and-moderate",
+                 admission=None, admission_timeout=ADMISSION_QUEUE_TIMEOUT_SECONDS,
+                 scheduler_capacity=SCHEDULER_CAPACITY, scheduler_max_waiting=SCHEDULER_MAX_WAITING,
+                 class_weights=None, aging_rate=SCHEDULER_AGING_RATE, pool_sizes=None, rate_limits=None,
+                 rate_limit_burst_seconds=RATE_LIMIT_BURST_SECONDS, provider_mix=None, rate_scale=1.0, seed=0):
+        if routing not in ROUTING_POLICIES:
+            raise ValueError(f"routing must be one of {', '.join(ROUTING_POLICIES)}")
+        self.replicas = replicas
+        self.workers = workers
+        self.routing = routing
+        self.admission = admission or ADMISSION_LIMITS[endpoint]
+        self.admission_timeout = admission_timeout
+        self.scheduler_capacity = scheduler_capacity
+        self.scheduler_max_waiting = scheduler_max_waiting
+        self.class_weights = dict(class_weights or PRIORITY_CLASS_WEIGHTS)
+        self.aging_rate = aging_rate
+        self.pool_sizes = {**BULKHEAD_POOL_SIZES, **(pool_sizes or {})}
+        self.rate_limits = {**PROVIDER_RATE_LIMITS, **(rate_limits or {})}
+        self.rate_limit_burst_seconds = rate_limit_burst_seconds
+        self.provider_mix = provider_mix
+        self.rate_scale = rate_scale
+        self.seed = seed
+
+    def split(self, total, minimum=1):
+        return max(math.ceil(total / self.workers), minimum)
+
+    def pool_size(self, name):
+        return self.pool_sizes.get(name, DEFAULT_BULKHEAD_POOL_SIZE)
+
+    def describe(self):
+        return {
+            "replicas": self.replicas,
+            "workers": self.workers,
+            "routing": self.routing,
+            "admission": list(self.admission),
+            "scheduler_capacity": self.scheduler_capacity,
+            "pool_sizes": {name: self.pool_sizes[name] for name in sorted(self.pool_sizes) if name != "benchmark"},
+            "provider_mix": self.provider_mix,
+            "rate_scale": self.rate_scale,
+        }
+
+
+class _Request:
+    __slots__ = ("arrival", "provider", "priority", "cost", "deadline", "preprocess", "transcription", "moderation",
+                 "reuse", "process", "admitted", "status", "reason", "finished", "admission_wait", "scheduler_wait",
+                 "pool_wait", "scheduled_at")
+
+    def __init__(self, arrival, provider, priority, cost, deadline, preprocess, transcription, moderation, reuse):
+        self.arrival = arrival
+        self.provider = provider
+        self.priority = priority
+        self.cost = cost
+        self.deadline = deadline
+        self.preprocess = preprocess
+        self.transcription = transcription
+        self.moderation = moderation
+        self.reuse = reuse              # None, "audio_duplicate" or "near_duplicate"
+        self.process = None
+        self.admitted = False
+        self.status = None
+        self.reason = None
+        self.finished = None
+        self.admission_wait = 0.0
+        self.scheduler_wait = 0.0
+        self.pool_wait = 0.0
+        self.scheduled_at = None
+
+
+class _Pool:
+    """Bulkhead thread pool: FIFO, `size` jobs at once"""
+
+    def __init__(self, size):
+        self.size = size
+        self.busy = 0
+        self.queue = deque()
+        self.busy_seconds = 0.0
+
+    def acquire(self, sim, callback):
+        if self.busy < self.size:
+            self.busy += 1
+            callback(0.0)
+        else:
+            self.queue.append((sim.now, callback))
+
+    def release(self, sim, held):
+        self.busy_seconds += held
+        if self.queue:
+            queued_at, callback = self.queue.popleft()
+            callback(sim.now - queued_at)
+        else:
+            self.busy -= 1
+
+
+class _Admission:
+    """EndpointLimiter: `concurrency` requests at once, `queue` waiting, each for at most `timeout`"""
+
+    def __init__(self, concurrency, queue, timeout):
+        self.concurrency = concurrency
+        self.max_queue = queue
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = deque()
+        self.waiting_count = 0
+
+    def acquire(self, sim, request, callback):
+        if self.active < self.concurrency and not self.waiting_count:
+            self.active += 1
+            callback(request, 0.0)
+            return True
+        if self.waiting_count >= self.max_queue:
+            return False
+        entry = [sim.now, request, callback, True]
+        self.waiting.append(entry)
+        self.waiting_count += 1
+        sim.at(sim.now + self.timeout, self._expire, entry)
+        return True
+
+    def _expire(self, sim, entry):
+        if entry[3]:
+            entry[3] = False
+            self.waiting_count -= 1
+            sim.finish(entry[1], "rejected", "admission_timeout")
+
+    def release(self, sim):
+        while self.waiting:
+            entry = self.waiting.popleft()
+            if entry[3]:
+                entry[3] = False
+                self.waiting_count -= 1
+                entry[2](entry[1], sim.now - entry[0])
+                return
+        self.active -= 1
+
+
+class _Scheduler:
+    """PipelineScheduler: stride scheduling over priority classes, aged shortest-job-first within a class"""
+
+    def __init__(self, capacity, max_waiting, class_weights, aging_rate):
+        self.capacity = capacity
+        self.max_waiting = max_waiting
+        self.class_weights = class_weights
+        self.aging_rate = aging_rate
+        self.running = 0
+        self.waiting = {cls: [] for cls in class_weights}
+        self.passes = {cls: 0.0 for cls in class_weights}
+        # Pass of the most recently dispatched class: where idle classes rejoin
+        self.vtime = 0.0
+        self.waiting_count = 0
+        self.slot_seconds = 0.0
+
+    def acquire(self, sim, request, callback):
+        if self.running < self.capacity and not self.waiting_count:
+            self.running += 1
+            callback(request, 0.0)
+            return True
+        if self.waiting_count >= self.max_waiting:
+            return False
+        queue = self.waiting[request.priority]
+        if not queue:
+            self.passes[request.priority] = self.vtime
+        entry = [request.cost, sim.now, request, callback]
+        queue.append(entry)
+        self.waiting_count += 1
+        if request.deadline is not None:
+            sim.at(request.deadline, self._expire, entry)
+        return True
+
+    def _expire(self, sim, entry):
+        queue = self.waiting[entry[2].priority]
+        if entry in queue:
+            queue.remove(entry)
+            self.waiting_count -= 1
+            sim.finish(entry[2], "degraded", "queue_deadline_exceeded")
+
+    def release(self, sim):
+        self.running -= 1
+        while self.running < self.capacity and self.waiting_count:
+            priority = min((cls for cls, entries in self.waiting.items() if entries), key=self.passes.get)
+            queue = self.waiting[priority]
+            entry = min(queue, key=lambda e: e[0] - (sim.now - e[1]) * self.aging_rate)
+            queue.remove(entry)
+            self.waiting_count -= 1
+            self.running += 1
+            self.vtime = self.passes[priority]
+            self.passes[priority] += 1.0 / self.class_weights[priority]
+            entry[3](entry[2], sim.now - entry[1])
+
+
+class _TokenBucket:
+    """Host-wide provider rate limit as a virtual-scheduling token bucket (GCRA)"""
+
+    def __init__(self, rate, burst):
+        self.interval = 1.0 / rate
+        self.tolerance = (burst - 1.0) * self.interval
+        self.tat = 0.0
+
+    def delay(self, now):
+        tat = max(self.tat, now)
+        start = max(now, tat - self.tolerance)
+        self.tat = tat + self.interval
+        return start - now
+
+
+class _Process:
+    def __init__(self, replica, settings):
+        self.replica = replica
+        self.in_flight = 0
+        concurrency, queue = settings.admission
+        self.admission = _Admission(settings.split(concurrency), settings.split(queue, 0), settings.admission_timeout)
+        self.scheduler = _Scheduler(settings.split(settings.scheduler_capacity),
+                                    settings.split(settings.scheduler_max_waiting),
+                                    settings.class_weights, settings.aging_rate)
+        self.pools = {}
+        self.settings = settings
+
+    def pool(self, name):
+        pool = self.pools.get(name)
+        if pool is None:
+            pool = self.pools[name] = _Pool(self.settings.pool_size(name))
+        return pool
+
+
+class CapacitySimulation:
+    """
+    Discrete-event model of the transcribe-and-moderate pipeline fed with
+    recorded request traces.
+
+    Each request is routed to a replica (round robin, random or least
+    connections, like the nginx upstream) and a random worker within it, then
+    goes through that worker's admission limiter, the pipeline scheduler and,
+    holding its slot, the preprocess pool, the provider's transcription pool
+    (waiting there for the provider's shared token bucket) and the moderation
+    pool, taking the stage times recorded in its trace. Requests rerouted to another provider
+    take that provider's fitted latency, scaled by how fast or slow the
+    request was relative to its original provider's model. Deadlines expire
+    queued and in-flight stages as the pipeline does; fingerprint and
+    near-duplicate hits end early as recorded. Requests that were shed by
+    admission control carry only their size, so their duration and stage
+    times come from the size and the fitted models.
+
+    Not modelled: CPU contention between the event loop and worker threads,
+    tenant fairness within a priority class, and upload spooling.
+    """
+
+    def __init__(self, traces, settings, models=None):
+        self.settings = settings
+        self.models = models or fit_latency_models(traces)
+        self.now = 0.0
+        self._events = []
+        self._sequence = itertools.count()
+        self._rng = random.Random(settings.seed)
+        self.processes = [
+            _Process(replica, settings) for replica in range(settings.replicas) for _ in range(settings.workers)
+        ]
+        self._replicas = [self.processes[r * settings.workers:(r + 1) * settings.workers]
+                          for r in range(settings.replicas)]
+        self._next_replica = 0
+        self._buckets = {
+            name: _TokenBucket(rate, max(rate * settings.rate_limit_burst_seconds, 1.0))
+            for name, rate in settings.rate_limits.items() if rate > 0
+        }
+        self.requests = self._build_requests(traces)
+
+    def _build_requests(self, traces):
+        if not traces:
+            return []
+        settings = self.settings
+        start = traces[0]["arrival"]
+        moderation_samples = [t["stages"]["moderation_time"] for t in traces
+                              if t["outcome"] in _FULL_MODERATION and "moderation_time" in t["stages"]]
+        typical_moderation = float(np.median(moderation_samples)) if moderation_samples else STANDIN_MODERATION_LATENCY_SECONDS
+        sampled_seconds = (2 + SAMPLING_ENERGY_WINDOWS) * SAMPLING_WINDOW_SECONDS
+        if settings.provider_mix:
+            providers, weights = zip(*settings.provider_mix.items())
+        requests = []
+        for trace in traces:
+            stages, outcome = trace["stages"], trace["outcome"]
+            recorded = trace["provider"] if trace["provider"] in self.models else _DEFAULT_PROVIDER
+            provider = self._rng.choices(providers, weights)[0] if settings.provider_mix else recorded
+
+            observed = stages.get("transcription_time") if outcome in _FULL_TRANSCRIPTION else None
+            expected = _model_seconds(self.models, recorded, trace["audio_bytes"])
+            residual = observed / expected if observed is not None and expected > 0 else 1.0
+            if provider == recorded and observed is not None:
+                transcription = observed
+            else:
+                transcription = _model_seconds(self.models, provider, trace["audio_bytes"]) * residual
+
+            if outcome in _FULL_MODERATION and "moderation_time" in stages:
+                moderation = stages["moderation_time"]
+            else:
+                moderation = typical_moderation
+            reuse = outcome if outcome in ("audio_duplicate", "near_duplicate") else None
+            arrival = (trace["arrival"] - start) / settings.rate_scale
+            deadline_ms = trace.get("deadline_ms")
+            cost = trace["audio_seconds"] or (trace["audio_bytes"] or 0) / DEFAULT_BYTES_PER_SECOND
+            if trace.get("provisional"):
+                cost = min(cost, sampled_seconds)
+            requests.append(_Request(
+                arrival, provider, trace["priority"] if trace["priority"] in settings.class_weights else "realtime",
+                max(cost, 1.0), None if not deadline_ms else arrival + deadline_ms / 1000.0,
+                stages.get("fingerprint_time", 0.0) + stages.get("sampling_time", 0.0),
+                transcription, moderation, reuse,
+            ))
+        return requests
+
+    # Event loop
+
+    def at(self, time, fn, *args):
+        heapq.heappush(self._events, (time, next(self._sequence), fn, args))
+
+    def run(self):
+        for request in self.requests:
+            self.at(request.arrival, self._arrive, request)
+        while self._events:
+            self.now, _, fn, args = heapq.heappop(self._events)
+            fn(self, *args)
+        return self.summary()
+
+    # Request flow
+
+    def _route(self):
+        settings = self.settings
+        if settings.routing == "round_robin":
+            replica = self._replicas[self._next_replica]
+            self._next_replica = (self._next_replica + 1) % settings.replicas
+        elif settings.routing == "random":
+            replica = self._rng.choice(self._replicas)
+        else:
+            replica = min(self._replicas, key=lambda processes: sum(p.in_flight for p in processes))
+        return self._rng.choice(replica)
+
+    def _arrive(self, sim, request):
+        request.process = process = self._route()
+        process.in_flight += 1
+        if not process.admission.acquire(self, request, self._admitted):
+            self.finish(request, "rejected", "admission_queue_full")
+
+    def _admitted(self, request, waited):
+        request.admitted = True
+        request.admission_wait = waited
+        if not request.process.scheduler.acquire(self, request, self._scheduled):
+            self.finish(request, "rejected", "scheduler_queue_full")
+
+    def _scheduled(self, request, waited):
+        # Fingerprinting and sampling run inside the slot, as in the pipeline
+        request.scheduler_wait = waited
+        request.scheduled_at = self.now
+        pool = request.process.pool("preprocess")
+
+        def run(pool_wait):
+            request.pool_wait += pool_wait
+            self.at(self.now + request.preprocess, self._preprocessed, request, pool)
+
+        pool.acquire(self, run)
+
+    def _preprocessed(self, sim, request, pool):
+        pool.release(self, request.preprocess)
+        if request.reuse == "audio_duplicate":
+            self._release_slot(request)
+            self.finish(request, "ok")
+            return
+        self._provider_stage(request, f"transcription:{request.provider}", request.provider, request.transcription,
+                             "transcription_deadline_exceeded", self._transcribed)
+
+    def _transcribed(self, request):
+        if request.reuse == "near_duplicate":
+            self._release_slot(request)
+            self.finish(request, "ok")
+            return
+        self._provider_stage(request, "moderation", "openai_moderation", request.moderation,
+                             "moderation_deadline_exceeded", self._moderated)
+
+    def _moderated(self, request):
+        self._release_slot(request)
+        self.finish(request, "ok")
+
+    def _provider_stage(self, request, pool_name, rate_limit_name, seconds, deadline_reason, done):
+        """Hold a pool thread while waiting for a provider token and for the call itself"""
+        pool = request.process.pool(pool_name)
+        bucket = self._buckets.get(rate_limit_name)
+
+        def run(pool_wait):
+            request.pool_wait += pool_wait
+            started = self.now
+            end = started + (bucket.delay(started) if bucket else 0.0) + seconds
+            if request.deadline is not None and end > request.deadline:
+                # The provider call is given the remaining budget as its timeout
+                end = max(request.deadline, started)
+                self.at(end, self._stage_timed_out, request, pool, end - started, deadline_reason)
+            else:
+                self.at(end, self._stage_done, request, pool, end - started, done)
+
+        pool.acquire(self, run)
+
+    def _stage_done(self, sim, request, pool, held, done):
+        pool.release(self, held)
+        done(request)
+
+    def _stage_timed_out(self, sim, request, pool, held, reason):
+        # A late moderation falls back to the local lexicon, which is instant
+        pool.release(self, held)
+        self._release_slot(request)
+        self.finish(request, "degraded", reason)
+
+    def _release_slot(self, request):
+        scheduler = request.process.scheduler
+        scheduler.slot_seconds += self.now - request.scheduled_at
+        scheduler.release(self)
+
+    def finish(self, request, status, reason=None):
+        request.status = status
+        request.reason = reason
+        request.finished = self.now
+        request.process.in_flight -= 1
+        if request.admitted:
+            request.process.admission.release(self)
+
+    # Results
+
+    def summary(self):
+        requests = self.requests
+        served = [r for r in requests if r.status in ("ok", "degraded")]
+        makespan = max((r.finished for r in requests), default=0.0)
+        reasons = {}
+        for r in requests:
+            if r.reason:
+                reasons[r.reason] = reasons.get(r.reason, 0) + 1
+
+        pools = {"scheduler": [0.0, 0]}
+        for process in self.processes:
+            pools["scheduler"][0] += process.scheduler.slot_seconds
+            pools["scheduler"][1] += process.scheduler.capacity
+            for name, pool in process.pools.items():
+                totals = pools.setdefault(name, [0.0, 0])
+                totals[0] += pool.busy_seconds
+                totals[1] += pool.size
+        by_class = {}
+        for cls in self.settings.class_weights:
+            values = np.array([r.finished - r.arrival for r in served if r.priority == cls])
+            if values.size:
+                by_class[cls] = {"served": int(values.size), "p50": _pct(values, 50), "p99": _pct(values, 99)}
+
+        return {
+            "settings": self.settings.describe(),
+            "requests": len(requests),
+            "served": len(served),
+            "degraded": sum(r.status == "degraded" for r in requests),
+            "rejected": sum(r.status == "rejected" for r in requests),
+            "reasons": reasons,
+            "duration": round(makespan, 3),
+            "throughput_rps": round(len(served) / makespan, 4) if makespan > 0 else None,
+            "latency": latency_summary([r.finished - r.arrival for r in served]),
+            "queueing": {
+                "admission_p99": _pct(np.array([r.admission_wait for r in served]), 99),
+                "scheduler_mean": _mean([r.scheduler_wait for r in served]),
+                "scheduler_p99": _pct(np.array([r.scheduler_wait for r in served]), 99),
+                "pools_p99": _pct(np.array([r.pool_wait for r in served]), 99),
+            },
+            "classes": by_class,
+            "utilization": {
+                name: round(busy / (size * makespan), 4) if makespan > 0 else 0.0
+                for name, (busy, size) in sorted(pools.items())
+            },
+        }
+
+
+def latency_summary(latencies):
+    """Mean, p50, p95, p99 and max of a list of latencies in seconds"""
+    values = np.array(latencies, dtype=float)
+    return {
+        "mean": round(float(values.mean()), 4) if values.size else None,
+        "p50": _pct(values, 50),
+        "p95": _pct(values, 95),
+        "p99": _pct(values, 99),
+        "max": round(float(values.max()), 4) if values.size else None,
+    }
+
+
+def _pct(values, pct):
+    if not values.size:
+        return None
+    return round(float(np.percentile(values, pct, method="inverted_cdf")), 4)
+
+
+def _mean(values):
+    return round(sum(values) / len(values), 4) if values else None
+
+
+def simulate(traces, models=None, **settings):
+    """Run one simulation of `traces` under the given CapacitySettings arguments"""
+    return CapacitySimulation(traces, CapacitySettings(**settings), models).run()
+
+
+def sweep(traces, grid, **fixed):
+    """
+    Simulate every combination of the CapacitySettings values in `grid`
+    (name -> list of values), with latency models fitted once.
+    """
+    models = fit_latency_models(traces)
+    names = list(grid)
+    return [
+        simulate(traces, models=models, **fixed, **dict(zip(names, values)))
+        for values in itertools.product(*(grid[name] for name in names))
+    ]
@@ -0,0 +1,115 @@
+import time
+
+from com.mhire.app.config.config import (
+    SESSION_DECAY,
+    SESSION_ESCALATION_THRESHOLD,
+    SESSION_IDLE_TTL_SECONDS,
+    SESSION_MAX_SESSIONS,
+    SESSION_MAX_TRANSCRIPT_CHARS,
+    SESSION_SCORE_FLOOR,
+    SESSION_WINDOW_MESSAGES,
+)
+from com.mhire.app.services.shared_cache import ProcessLocalCache, get_shared_cache
+
+_NAMESPACE = "conversation"
+# Sessions past max_sessions are trimmed every this many messages
+_TRIM_EVERY = 100
+
+
+class ConversationSessions:
+    """
+    Per-conversation moderation context.
+
+    Messages are moderated individually, so text is never sent twice. The
+    conversation context is the decayed sum of each category's scores,
+    updated in O(categories) per message:
+
+        rolling = decay * rolling + score   (scores below `floor` count as 0)
+
+    A run of individually borderline messages pushes a category over
+    `threshold`, which escalates the conversation. Sessions also keep a
+    bounded window of recent transcript excerpts for reviewers, expire after
+    `idle_ttl` seconds without messages and are trimmed least recently used
+    past `max_sessions`.
+
+    Sessions live in the shared cache, and every message is folded in one
+    SQLite transaction, so all workers and replicas share a conversation's
+    state and a recycled worker loses nothing. Without a shared cache they
+    are kept per process.
+    """
+
+    def __init__(self, window=SESSION_WINDOW_MESSAGES, max_chars=SESSION_MAX_TRANSCRIPT_CHARS,
+                 decay=SESSION_DECAY, floor=SESSION_SCORE_FLOOR, threshold=SESSION_ESCALATION_THRESHOLD,
+                 idle_ttl=SESSION_IDLE_TTL_SECONDS, max_sessions=SESSION_MAX_SESSIONS, store=None):
+        self.window = window
+        self.max_chars = max_chars
+        self.decay = decay
+        self.floor = floor
+        self.threshold = threshold
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self._store = store
+        self._observed = 0
+        self.evicted = 0
+
+    def _backend(self):
+        if self._store is None:
+            self._store = get_shared_cache() or ProcessLocalCache()
+        return self._store
+
+    def observe(self, conversation_id, transcript, moderation):
+        """
+        Fold one moderated message into its conversation and return the
+        conversation view: message counts, top rolling scores and the
+        categories over the escalation threshold. Blocking (a SQLite write).
+        """
+        scores = moderation.get("category_scores") or {}
+        flagged = bool(moderation.get("flagged"))
+
+        def fold(session):
+            session = session or {"recent": [], "rolling": {}, "messages": 0, "flagged_messages": 0}
+            rolling = session["rolling"]
+            for category in set(rolling) | set(scores):
+                score = scores.get(category) or 0.0
+                value = self.decay * rolling.get(category, 0.0) + (score if score >= self.floor else 0.0)
+                if value < self.floor * 0.1:
+                    rolling.pop(category, None)   # keep the dict sparse
+                else:
+                    rolling[category] = value
+            # (timestamp, transcript excerpt, flagged)
+            session["recent"] = (session["recent"] + [[time.time(), (transcript or "")[:self.max_chars], flagged]])[-self.window:]
+            session["messages"] += 1
+            session["flagged_messages"] += flagged
+            return session
+
+        store = self._backend()
+        session = store.update(_NAMESPACE, conversation_id, fold, self.idle_ttl)
+        self._observed += 1
+        if self._observed % _TRIM_EVERY == 0:
+            self.evicted += store.trim(_NAMESPACE, self.max_sessions)
+
+        rolling = session["rolling"]
+        escalated = sorted(c for c, value in rolling.items() if value >= self.threshold)
+        top = sorted(rolling.items(), key=lambda item: -item[1])[:3]
+        return {
+            "conversation_id": conversation_id,
+            "messages": session["messages"],
+            "flagged_messages": session["flagged_messages"],
+            "rolling_scores": {c: round(value, 4) for c, value in top},
+            "escalated_categories": escalated,
+            "escalated": bool(escalated),
+        }
+
+    def recent(self, conversation_id):
+        """Recent transcript excerpts of a conversation, oldest first"""
+        session = self._backend().get(_NAMESPACE, conversation_id)
+        if session is None:
+            return None
+        return [{"timestamp": ts, "transcript": text, "flagged": flagged} for ts, text, flagged in session["recent"]]
+
+    def stats(self):
+        return {"sessions": self._backend().count(_NAMESPACE), "max_sessions": self.max_sessions,
+                "evicted": self.evicted}
+
+
+conversation_sessions = ConversationSessions()
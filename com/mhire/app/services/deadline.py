@@ -0,0 +1,47 @@
+import time
+
+from com.mhire.app.config.config import DEFAULT_REQUEST_DEADLINE_MS, PROVIDER_TIMEOUT_SECONDS
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a pipeline stage cannot finish inside the request budget"""
+
+
+class Deadline:
+    """
+    Per-request time budget measured on the monotonic clock.
+    A Deadline created with budget_ms=None never expires.
+    """
+
+    def __init__(self, budget_ms=None):
+        self.budget_ms = budget_ms
+        self._expires_at = None if budget_ms is None else time.monotonic() + budget_ms / 1000.0
+
+    @property
+    def expired(self):
+        return self._expires_at is not None and time.monotonic() >= self._expires_at
+
+    def remaining(self):
+        """Seconds left, or None if unbounded"""
+        if self._expires_at is None:
+            return None
+        return max(self._expires_at - time.monotonic(), 0.0)
+
+    def timeout(self, cap=PROVIDER_TIMEOUT_SECONDS):
+        """Timeout to pass to a provider call: the remaining budget, never above `cap`"""
+        remaining = self.remaining()
+        if remaining is None:
+            return cap
+        if remaining <= 0:
+            raise DeadlineExceeded("deadline already expired")
+        return min(remaining, cap)
+
+
+def deadline_from_request(header_ms=None, param_ms=None):
+    """Build a Deadline from the X-Deadline-Ms header or deadline_ms field"""
+    budget_ms = header_ms if header_ms is not None else param_ms
+    if budget_ms is None and DEFAULT_REQUEST_DEADLINE_MS > 0:
+        budget_ms = DEFAULT_REQUEST_DEADLINE_MS
+    if budget_ms is not None and budget_ms <= 0:
+        budget_ms = None
+    return Deadline(budget_ms)
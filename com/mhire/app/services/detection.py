@@ -1,4 +1,39 @@
 from com.mhire.app.client.openai_client import clientModereration
-def moderate_text(transcribed_text):
-    response = clientModereration.moderations.create(input=transcribed_text)
-    return response.results[0]  
\ No newline at end of file
+from com.mhire.app.config.config import ENABLE_STANDIN_PROVIDERS, MODERATION_CACHE_TTL_SECONDS, PROVIDER_TIMEOUT_SECONDS
+from com.mhire.app.services.shared_cache import cache_key, get_shared_cache, rate_limit
+from com.mhire.app.services.tracing import span
+from com.mhire.app.services.transcribe_standin import moderate_text_standin
+
+
+class CachedModerationResult:
+    """Moderation verdict read back from the shared cache"""
+
+    def __init__(self, flagged, categories, category_scores):
+        self.flagged = flagged
+        self.categories = categories
+        self.category_scores = category_scores
+
+
+def moderate_text(transcribed_text, timeout=None):
+    cache = get_shared_cache()
+    if cache is not None:
+        key = cache_key(transcribed_text)
+        cached = cache.get("moderation", key)
+        if cached is not None:
+            return CachedModerationResult(**cached)
+
+    rate_limit("openai_moderation", timeout)
+    if ENABLE_STANDIN_PROVIDERS:
+        # Offline mode: simulate the moderation API locally
+        result = moderate_text_standin(transcribed_text, timeout=timeout)
+    else:
+        with span("provider.call", provider="openai_moderation", attempt=1):
+            response = clientModereration.with_options(timeout=timeout or PROVIDER_TIMEOUT_SECONDS).moderations.create(input=transcribed_text)
+        result = response.results[0]
+    if cache is not None:
+        cache.put("moderation", key, {
+            "flagged": result.flagged,
+            "categories": dict(result.categories),
+            "category_scores": dict(result.category_scores),
+        }, MODERATION_CACHE_TTL_SECONDS)
+    return result
@@ -0,0 +1,122 @@
+import os
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+
+# Leaf frames that mean a thread is parked, not doing work
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+}
+
+
+class StackSampler:
+    """
+    Sampling CPU profiler: a background thread records the stack of every
+    other thread at a fixed interval. Output is the "folded" format read by
+    flamegraph.pl, speedscope and inferno (one `frame;frame;frame count` line
+    per distinct stack).
+    """
+
+    def __init__(self, interval=0.005, include_idle=False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.counts = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                if not self.include_idle and _is_idle(frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self):
+        return "\n".join(f"{stack} {count}" for stack, count in self.counts.most_common())
+
+    def top(self, limit=5):
+        return [{"stack": stack.split(";"), "samples": count} for stack, count in self.counts.most_common(limit)]
+
+
+def _is_idle(frame):
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _IDLE_FRAMES
+
+
+class MemoryTracker:
+    """
+    tracemalloc wrapper keeping the previous snapshot so each call reports
+    both the current top allocators and the growth since the last call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._previous = None
+
+    def snapshot(self, limit=20, frames=10, group_by="lineno"):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ))
+            current, peak = tracemalloc.get_traced_memory()
+            result = {
+                "traced_current_bytes": current,
+                "traced_peak_bytes": peak,
+                "top": [_stat_dict(stat) for stat in snapshot.statistics(group_by)[:limit]],
+                "diff": None,
+            }
+            if self._previous is not None:
+                diff = snapshot.compare_to(self._previous, group_by)
+                result["diff"] = [_stat_dict(stat) for stat in diff[:limit]]
+            self._previous = snapshot
+            return result
+
+    def stop(self):
+        with self._lock:
+            self._previous = None
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+
+def _stat_dict(stat):
+    entry = {
+        "size_bytes": stat.size,
+        "count": stat.count,
+        "traceback": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+    }
+    if hasattr(stat, "size_diff"):
+        entry["size_diff_bytes"] = stat.size_diff
+        entry["count_diff"] = stat.count_diff
+    return entry
+
+
+memory_tracker = MemoryTracker()
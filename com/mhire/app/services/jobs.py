@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import os
+import secrets
+import time
+
+from com.mhire.app.config.config import JOB_DRAIN_SECONDS, JOB_MAX_ENTRIES, JOB_TTL_SECONDS
+from com.mhire.app.services.shared_cache import ProcessLocalCache, get_shared_cache
+
+logger = logging.getLogger(__name__)
+
+_NAMESPACE = "job"
+
+
+class JobStore:
+    """
+    Registry of background pipeline jobs and their results.
+
+    A job runs as a task in the worker process that submitted it, but its
+    record lives in the shared cache, so GET /jobs/{id} answers from any
+    worker or replica. Records are kept for `ttl` seconds after their last
+    update; the oldest are trimmed past `max_entries`. A worker shutting down
+    (e.g. recycled after max_requests) waits up to `drain_timeout` seconds for
+    its jobs and marks the rest failed, so no job is left "running" forever.
+    Without a shared cache the records are kept per process.
+    """
+
+    def __init__(self, ttl=JOB_TTL_SECONDS, max_entries=JOB_MAX_ENTRIES, drain_timeout=JOB_DRAIN_SECONDS,
+                 store=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.drain_timeout = drain_timeout
+        self._store = store
+        self._tasks = {}
+
+    def _backend(self):
+        if self._store is None:
+            self._store = get_shared_cache() or ProcessLocalCache()
+        return self._store
+
+    async def submit(self, kind, coroutine_factory, cleanup=None):
+        """
+        Run `coroutine_factory()` as a background task on the running loop and
+        return the job id. `cleanup` is called when the job ends either way.
+        """
+        job_id = secrets.token_hex(8)
+        job = {"job_id": job_id, "kind": kind, "status": "queued", "worker_pid": os.getpid(),
+               "created_at": time.time(), "finished_at": None, "result": None, "error": None}
+        await asyncio.to_thread(self._save, job, True)
+        task = asyncio.get_running_loop().create_task(self._run(job, coroutine_factory, cleanup))
+        self._tasks[task] = job
+        task.add_done_callback(self._tasks.pop)
+        return job_id
+
+    async def _run(self, job, coroutine_factory, cleanup):
+        try:
+            job["status"] = "running"
+            await asyncio.to_thread(self._save, job)
+            try:
+                job["result"] = await coroutine_factory()
+                job["status"] = "done"
+            except Exception as e:
+                logger.error(f"Background job {job['job_id']} ({job['kind']}) failed: {str(e)}")
+                job["status"] = "failed"
+                job["error"] = str(e)
+            job["finished_at"] = time.time()
+            await asyncio.to_thread(self._save, job)
+        finally:
+            if cleanup is not None:
+                cleanup()
+
+    def _save(self, job, trim=False):
+        store = self._backend()
+        store.put(_NAMESPACE, job["job_id"], job, self.ttl)
+        if trim:
+            store.trim(_NAMESPACE, self.max_entries)
+
+    def get(self, job_id):
+        """Job record from any worker, or None when unknown or expired. Blocking."""
+        return self._backend().get(_NAMESPACE, job_id)
+
+    async def drain(self):
+        """On shutdown: wait for this worker's jobs, then fail the ones still unfinished"""
+        if not self._tasks:
+            return
+        logger.info(f"Waiting up to {self.drain_timeout:.0f}s for {len(self._tasks)} background jobs")
+        _, pending = await asyncio.wait(list(self._tasks), timeout=self.drain_timeout)
+        for task in pending:
+            job = self._tasks.get(task)
+            task.cancel()
+            if job is not None:
+                job.update(status="failed", error="interrupted: worker shut down", finished_at=time.time())
+                self._save(job)
+        if pending:
+            logger.warning(f"Marked {len(pending)} unfinished background jobs failed at shutdown")
+
+    def stats(self):
+        return {"jobs": self._backend().count(_NAMESPACE), "running_in_process": len(self._tasks)}
+
+
+job_store = JobStore()
@@ -0,0 +1,72 @@
+import re
+
+# Small keyword lexicon used only when the moderation provider cannot answer
+# inside the request deadline. Keys follow the provider's category names so
+# the degraded verdict has the same shape as a normal one.
+#
+# Patterns with context (a threat aimed at "you", a first-person statement)
+# score STRONG and flag their category. Bare words score WEAK, just under
+# FLAG_THRESHOLD: "we beat the deadline" or "shoot me an email" should reach
+# a human reviewer at most, never an automatic block.
+FLAG_THRESHOLD = 0.6
+STRONG = 0.6
+WEAK = 0.5
+
+_LEXICON = {
+    "harassment": [
+        (r"\b(stupid|ugly|worthless|pathetic|loser|idiot|moron|bitch|slut|whore)\b", WEAK),
+        (r"\byou('re| are) (so |such an? )?(stupid|ugly|worthless|pathetic|loser|idiot|moron|bitch|slut|whore)\b", STRONG),
+        (r"\bshut up\b", WEAK),
+        (r"\bnobody (likes|wants) you\b", STRONG),
+    ],
+    "harassment_threatening": [
+        (r"\b(i('| wi)ll|gonna|going to) (kill|hurt|find|beat|stab|shoot) you\b", STRONG),
+        (r"\byou('| wi)ll regret\b", STRONG),
+        (r"\bi know where you live\b", STRONG),
+    ],
+    "hate": [
+        (r"\bgo back to your (own )?country\b", STRONG),
+        (r"\b(all|those) (people|immigrants) (are|should)\b", WEAK),
+    ],
+    "sexual": [
+        (r"\b(nudes?|naked|sex|sexy|horny|dick|pussy|boobs)\b", WEAK),
+        (r"\bsend (me )?(nudes|pics)\b", STRONG),
+    ],
+    "self_harm": [
+        (r"\b(kill|hurt|cut) myself\b", STRONG),
+        (r"\b(want|going) to die\b", STRONG),
+        (r"\bsuicid(e|al)\b", WEAK),
+    ],
+    "violence": [
+        (r"\b(kill|murder|stab|shoot|strangle|beat)\b", WEAK),
+        (r"\b(i('| wi)ll|gonna|going to|want to) (kill|murder|stab|shoot|strangle|beat (up|down)?) (him|her|them|someone|everyone|you)\b", STRONG),
+    ],
+}
+
+_PATTERNS = {
+    category: [(re.compile(pattern, re.IGNORECASE), weight) for pattern, weight in patterns]
+    for category, patterns in _LEXICON.items()
+}
+
+
+class LocalModerationResult:
+    """Mirrors the attributes of a provider moderation result"""
+
+    def __init__(self, categories, category_scores):
+        self.categories = categories
+        self.category_scores = category_scores
+        self.flagged = any(categories.values())
+
+
+def local_moderation(text):
+    """
+    Score text against the local lexicon. Each matching pattern adds its
+    weight to its category, capped at 1.0; a category is flagged at
+    FLAG_THRESHOLD, which a single bare word does not reach.
+    """
+    text = text or ""
+    scores = {}
+    for category, patterns in _PATTERNS.items():
+        scores[category] = min(sum(weight for pattern, weight in patterns if pattern.search(text)), 1.0)
+    categories = {category: score >= FLAG_THRESHOLD for category, score in scores.items()}
+    return LocalModerationResult(categories, scores)
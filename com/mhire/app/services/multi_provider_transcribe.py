@@ -1,27 +1,85 @@
+import logging
+
 from com.mhire.app.services.transcribe import transcribe_audio
 from com.mhire.app.services.transcribe_deepgram import transcribe_audio_deepgram
 from com.mhire.app.services.transcribe_groq import transcribe_audio_groq
+from com.mhire.app.services.transcribe_standin import transcribe_audio_standin
+from com.mhire.app.services.audio_fingerprint import audio_fingerprint_index
+from com.mhire.app.services.shared_cache import cache_key, get_shared_cache, rate_limit
+from com.mhire.app.services.uploads import file_sha256
+from com.mhire.app.config.config import ENABLE_STANDIN_PROVIDERS, TRANSCRIPT_CACHE_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+PROVIDERS = ("openai_whisper", "deepgram_nova_2", "groq_whisper_turbo")
 
-def transcribe_with_provider(audio_file_path, provider="openai_whisper"):
+
+def normalize_provider(provider):
+    """
+    Map a user supplied provider name to its canonical id.
+    Unrecognized names fall back to "openai_whisper".
+    """
+    provider = (provider or "").lower().replace(" ", "_").replace("-", "_")
+    return provider if provider in PROVIDERS else "openai_whisper"
+
+
+def transcribe_with_provider(audio_file_path, provider="openai_whisper", timeout=None, fingerprint=None,
+                             audio_hash=None):
     """
     Transcribe audio using the specified provider
     
     Args:
         audio_file_path (str): Path to the audio file
         provider (str): Provider to use ("openai_whisper", "deepgram_nova-2", "groq_whisper_turbo")
+        timeout (float): Seconds allowed for the provider call, None for the default
+        fingerprint: Audio fingerprint of the file; when it matches an earlier
+            recording that transcript is returned without calling the provider
+        audio_hash (str): SHA-256 of the file if already known; computed otherwise
+
+    Identical files are served from the shared transcript cache, and provider
+    calls wait on the provider's host-wide rate limit.
     
     Returns:
         str: Transcribed text
     """
     
-    provider = provider.lower().replace(" ", "_").replace("-", "_")
-    
-    if provider == "openai_whisper":
-        return transcribe_audio(audio_file_path)
+    provider = normalize_provider(provider)
+
+    if fingerprint is not None:
+        match = audio_fingerprint_index.lookup(fingerprint)
+        if match is not None:
+            logger.info(f"Audio matches fingerprint entry {match.entry_id} ({match.score:.2f}), reusing transcript")
+            return match.transcript
+
+    # Exact-content cache shared by all worker processes
+    cache = get_shared_cache()
+    if cache is not None:
+        key = cache_key(provider, audio_hash or file_sha256(audio_file_path))
+        transcript = cache.get("transcript", key)
+        if transcript is not None:
+            return transcript
+
+    rate_limit(provider, timeout)
+    transcript = call_provider(audio_file_path, provider, timeout)
+    if cache is not None:
+        cache.put("transcript", key, transcript, TRANSCRIPT_CACHE_TTL_SECONDS)
+    if fingerprint is not None:
+        audio_fingerprint_index.remember(fingerprint, transcript)
+    return transcript
+
+
+def call_provider(audio_file_path, provider, timeout=None):
+    """
+    The provider call alone: no fingerprint or transcript cache and no rate
+    limit wait. For benchmarks, which must time the provider itself.
+    """
+    if ENABLE_STANDIN_PROVIDERS:
+        # Offline mode: simulate the provider locally
+        return transcribe_audio_standin(audio_file_path, provider, timeout=timeout)
     elif provider == "deepgram_nova_2":
-        return transcribe_audio_deepgram(audio_file_path)
+        return transcribe_audio_deepgram(audio_file_path, timeout=timeout)
     elif provider == "groq_whisper_turbo":
-        return transcribe_audio_groq(audio_file_path)
+        return transcribe_audio_groq(audio_file_path, timeout=timeout)
     else:
         # Default to OpenAI if provider not recognized
-        return transcribe_audio(audio_file_path)
\ No newline at end of file
+        return transcribe_audio(audio_file_path, timeout=timeout)
\ No newline at end of file
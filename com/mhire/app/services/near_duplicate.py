@@ -0,0 +1,279 @@
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from com.mhire.app.config.config import (
+    NEAR_DUP_BANDS,
+    NEAR_DUP_MAX_ENTRIES,
+    NEAR_DUP_NUM_PERM,
+    NEAR_DUP_THRESHOLD,
+    NEAR_DUP_TTL_SECONDS,
+)
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+# Words that ASR inserts or speakers pad with; dropping them makes scripted
+# messages collide regardless of delivery
+_FILLERS = {
+    "um", "umm", "uh", "uhh", "er", "erm", "ah", "oh", "like", "so", "well",
+    "okay", "ok", "yeah", "hey", "hi", "hello", "just", "actually", "basically",
+    "literally", "really", "very", "the", "a", "an",
+}
+_NUMBER_WORDS = {
+    "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+    "eleven", "twelve", "fifteen", "twenty", "thirty", "forty", "fifty", "hundred",
+    "thousand", "million", "k",
+}
+_CONTRACTIONS = [
+    (re.compile(r"n't\b"), " not"), (re.compile(r"'ll\b"), " will"), (re.compile(r"'re\b"), " are"),
+    (re.compile(r"'ve\b"), " have"), (re.compile(r"'m\b"), " am"), (re.compile(r"'d\b"), " would"),
+    (re.compile(r"'s\b"), ""),
+]
+
+
+def normalize_transcript(text):
+    """
+    Lowercase words with contractions expanded, fillers dropped and any run
+    of numbers (digits or number words) collapsed to a single '#'.
+    """
+    text = (text or "").lower().replace("’", "'")
+    for pattern, replacement in _CONTRACTIONS:
+        text = pattern.sub(replacement, text)
+    words = []
+    for word in re.findall(r"[a-z0-9]+", text):
+        if word in _FILLERS:
+            continue
+        if word.isdigit() or word in _NUMBER_WORDS:
+            word = "#"
+            if words and words[-1] == "#":
+                continue
+        words.append(word)
+    return words
+
+
+def shingles(words, size=3):
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """Vectorized MinHash over 32-bit shingle hashes with (a*x + b) mod p permutations"""
+
+    def __init__(self, num_perm=NEAR_DUP_NUM_PERM, seed=1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        # 32-bit coefficients keep a * x below 2**64 for 32-bit x
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingle_set):
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingle_set), dtype=np.uint64,
+                             count=len(shingle_set))
+        permuted = (hashes[:, None] * self._a + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+class NearDuplicateMatch:
+    def __init__(self, cluster_id, similarity, verdict):
+        self.cluster_id = cluster_id
+        self.similarity = similarity
+        self.verdict = verdict
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index of recently flagged transcripts.
+
+    Signatures are split into `bands` bands; transcripts sharing any band are
+    candidates, confirmed when the estimated Jaccard similarity (fraction of
+    equal signature slots) reaches `threshold`.
+
+    Storage is a fixed-size ring of NumPy arrays, so memory is bounded by
+    `max_entries` and the oldest entry is overwritten first; entries older
+    than `ttl` seconds are expired on access. Band keys live in per-band
+    sorted arrays (binary search) plus a small dict of recent inserts that is
+    merged in periodically. Index entries are never deleted individually: a
+    candidate is valid only while its slot is alive and still holds the same
+    band key, and stale entries are dropped when the sorted arrays are rebuilt.
+    """
+
+    def __init__(self, threshold=NEAR_DUP_THRESHOLD, num_perm=NEAR_DUP_NUM_PERM, bands=NEAR_DUP_BANDS,
+                 ttl=NEAR_DUP_TTL_SECONDS, max_entries=NEAR_DUP_MAX_ENTRIES, merge_every=4096):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.ttl = ttl
+        self.capacity = max_entries
+        self.merge_every = merge_every
+        self._hasher = MinHasher(num_perm)
+        self._band_mult = np.random.RandomState(2).randint(1, 1 << 62, size=self.rows, dtype=np.uint64) | np.uint64(1)
+
+        self._signatures = np.zeros((max_entries, num_perm), dtype=np.uint32)
+        self._keys = np.zeros((max_entries, bands), dtype=np.uint64)
+        self._inserted_at = np.zeros(max_entries, dtype=np.float64)
+        self._alive = np.zeros(max_entries, dtype=bool)
+        self._cluster_of = np.zeros(max_entries, dtype=np.int64)
+        self._head = 0    # next slot to write
+        self._tail = 0    # oldest live slot
+        self._size = 0
+
+        self._sorted_keys = [np.zeros(0, dtype=np.uint64) for _ in range(bands)]
+        self._sorted_slots = [np.zeros(0, dtype=np.int64) for _ in range(bands)]
+        self._recent = [dict() for _ in range(bands)]
+        self._recent_count = 0
+        self._stale = 0
+
+        self._next_cluster = 1
+        self._clusters = {}  # cluster number -> [verdict, live members, hits]
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+
+    def _signature(self, text):
+        shingle_set = shingles(normalize_transcript(text))
+        return self._hasher.signature(shingle_set) if shingle_set else None
+
+    def _band_keys(self, signature):
+        bands = signature.reshape(self.bands, self.rows).astype(np.uint64)
+        return (bands * self._band_mult).sum(axis=1, dtype=np.uint64)
+
+    def _candidates(self, keys):
+        slots = []
+        for band in range(self.bands):
+            key = keys[band]
+            sorted_keys = self._sorted_keys[band]
+            lo = np.searchsorted(sorted_keys, key, side="left")
+            hi = np.searchsorted(sorted_keys, key, side="right")
+            if hi > lo:
+                slots.extend(self._sorted_slots[band][lo:hi].tolist())
+            slots.extend(self._recent[band].get(int(key), ()))
+        if not slots:
+            return np.zeros(0, dtype=np.int64)
+        slots = np.unique(np.asarray(slots, dtype=np.int64))
+        # Drop slots that expired or were overwritten by a different transcript
+        valid = self._alive[slots] & (self._keys[slots] == keys).any(axis=1)
+        return slots[valid]
+
+    def _best_match(self, signature, keys):
+        slots = self._candidates(keys)
+        if slots.size == 0:
+            return None, 0.0
+        similarities = (self._signatures[slots] == signature).mean(axis=1)
+        best = int(similarities.argmax())
+        return int(slots[best]), float(similarities[best])
+
+    def lookup(self, text):
+        """Return a NearDuplicateMatch for a flagged cluster, or None"""
+        signature = self._signature(text)
+        if signature is None:
+            return None
+        keys = self._band_keys(signature)
+        with self._lock:
+            self.lookups += 1
+            self._expire()
+            slot, similarity = self._best_match(signature, keys)
+            if slot is None or similarity < self.threshold:
+                return None
+            cluster = int(self._cluster_of[slot])
+            self._clusters[cluster][2] += 1
+            self.hits += 1
+            return NearDuplicateMatch(f"c{cluster}", round(similarity, 4), self._clusters[cluster][0])
+
+    def add(self, text, verdict):
+        """
+        Index a flagged transcript. It joins the cluster of its nearest match
+        (whose stored verdict is refreshed) or starts a new cluster.
+        """
+        signature = self._signature(text)
+        if signature is None:
+            return None
+        keys = self._band_keys(signature)
+        with self._lock:
+            self._expire()
+            slot, similarity = self._best_match(signature, keys)
+            if slot is not None and similarity >= self.threshold:
+                cluster = int(self._cluster_of[slot])
+                self._clusters[cluster][0] = verdict
+            else:
+                cluster = self._next_cluster
+                self._next_cluster += 1
+                self._clusters[cluster] = [verdict, 0, 0]
+
+            if self._size == self.capacity:
+                self._evict_oldest()
+            slot = self._head
+            self._head = (self._head + 1) % self.capacity
+            self._size += 1
+            self._signatures[slot] = signature
+            self._keys[slot] = keys
+            self._inserted_at[slot] = time.monotonic()
+            self._alive[slot] = True
+            self._cluster_of[slot] = cluster
+            self._clusters[cluster][1] += 1
+
+            for band in range(self.bands):
+                self._recent[band].setdefault(int(keys[band]), []).append(slot)
+            self._recent_count += 1
+            if self._recent_count >= self.merge_every:
+                self._merge()
+            return f"c{cluster}"
+
+    def _merge(self):
+        """Fold recent inserts into the sorted arrays; full rebuild when mostly stale"""
+        if self._stale > self._size:
+            alive = np.flatnonzero(self._alive)
+            for band in range(self.bands):
+                keys = self._keys[alive, band]
+                order = np.argsort(keys, kind="stable")
+                self._sorted_keys[band] = keys[order]
+                self._sorted_slots[band] = alive[order]
+            self._stale = 0
+        else:
+            for band in range(self.bands):
+                pairs = [(key, slot) for key, slots in self._recent[band].items() for slot in slots]
+                new_keys = np.fromiter((k for k, _ in pairs), dtype=np.uint64, count=len(pairs))
+                new_slots = np.fromiter((s for _, s in pairs), dtype=np.int64, count=len(pairs))
+                positions = np.searchsorted(self._sorted_keys[band], new_keys)
+                self._sorted_keys[band] = np.insert(self._sorted_keys[band], positions, new_keys)
+                self._sorted_slots[band] = np.insert(self._sorted_slots[band], positions, new_slots)
+        for band in range(self.bands):
+            self._recent[band].clear()
+        self._recent_count = 0
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        while self._size and self._inserted_at[self._tail] < cutoff:
+            self._evict_oldest()
+
+    def _evict_oldest(self):
+        slot = self._tail
+        self._alive[slot] = False
+        cluster = int(self._cluster_of[slot])
+        self._clusters[cluster][1] -= 1
+        if self._clusters[cluster][1] == 0:
+            del self._clusters[cluster]
+        self._tail = (self._tail + 1) % self.capacity
+        self._size -= 1
+        self._stale += 1
+
+    def stats(self):
+        with self._lock:
+            top = sorted(self._clusters.items(), key=lambda kv: -kv[1][2])[:10]
+            return {
+                "entries": self._size,
+                "capacity": self.capacity,
+                "clusters": len(self._clusters),
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "top_clusters": [{"cluster_id": f"c{c}", "members": v[1], "hits": v[2]} for c, v in top],
+            }
+
+
+near_duplicate_index = NearDuplicateIndex()
@@ -0,0 +1,376 @@
+import asyncio
+import logging
+import os
+import time
+
+from com.mhire.app.config.config import (
+    AUDIO_FINGERPRINT_ENABLED,
+    NEAR_DUP_ENABLED,
+    SAMPLING_ENABLED,
+    SAMPLING_ENERGY_WINDOWS,
+    SAMPLING_MIN_AUDIO_SECONDS,
+    SAMPLING_WINDOW_SECONDS,
+)
+from com.mhire.app.middleware.admission import Overloaded
+from com.mhire.app.services.audio_fingerprint import audio_fingerprint_index, fingerprint_audio
+from com.mhire.app.services.audio_probe import estimate_duration
+from com.mhire.app.services.audio_sampling import build_sample_clip
+from com.mhire.app.services.bulkheads import get_bulkhead
+from com.mhire.app.services.conversations import conversation_sessions
+from com.mhire.app.services.deadline import Deadline, DeadlineExceeded
+from com.mhire.app.services.detection import moderate_text
+from com.mhire.app.services.local_signals import local_moderation
+from com.mhire.app.services.multi_provider_transcribe import transcribe_with_provider, normalize_provider
+from com.mhire.app.services.near_duplicate import near_duplicate_index
+from com.mhire.app.services.policy import apply_policy
+from com.mhire.app.services.request_traces import get_request_recorder, request_trace
+from com.mhire.app.services.scheduler import pipeline_scheduler, normalize_priority
+from com.mhire.app.services.jobs import job_store
+from com.mhire.app.services.tracing import span
+from com.mhire.app.services.uploads import remove_quietly
+
+logger = logging.getLogger(__name__)
+
+
+def moderation_payload(moderation_result):
+    """Plain dict view of a provider or local moderation result"""
+    return {
+        "flagged": moderation_result.flagged,
+        "categories": dict(moderation_result.categories),
+        "category_scores": dict(moderation_result.category_scores)
+    }
+
+
+def _fingerprint(audio_file_path, timings):
+    if not AUDIO_FINGERPRINT_ENABLED:
+        return None
+    start = time.time()
+    with span("audio_fingerprint") as fingerprint_span:
+        fingerprint = fingerprint_audio(audio_file_path)
+        fingerprint_span.set_attribute("decoded", fingerprint is not None)
+    timings["fingerprint_time"] = time.time() - start
+    return fingerprint
+
+
+def _audio_duplicate_result(fingerprint, timings):
+    """Transcript and verdict of an earlier recording of the same audio, or None"""
+    match = audio_fingerprint_index.lookup(fingerprint)
+    if match is None or match.verdict is None:
+        return None
+    logger.info(f"Audio matches fingerprint entry {match.entry_id} ({match.score:.2f}), reusing verdict")
+    return {
+        "transcription": match.transcript,
+        "moderation": match.verdict,
+        "degraded": False,
+        "audio_duplicate": {"entry_id": match.entry_id, "score": match.score},
+        "timings": timings,
+    }
+
+
+def _near_duplicate_result(transcript, timings):
+    """Verdict reused from a flagged near-duplicate transcript, or None"""
+    if not NEAR_DUP_ENABLED:
+        return None
+    start = time.time()
+    with span("near_duplicate.lookup") as lookup_span:
+        match = near_duplicate_index.lookup(transcript)
+        lookup_span.set_attribute("hit", match is not None)
+    timings["near_duplicate_time"] = time.time() - start
+    if match is None:
+        return None
+    logger.info(f"Transcript matches flagged cluster {match.cluster_id} ({match.similarity:.2f}), skipping moderation")
+    return {
+        "transcription": transcript,
+        "moderation": match.verdict,
+        "degraded": False,
+        "near_duplicate": {"cluster_id": match.cluster_id, "similarity": match.similarity},
+        "timings": timings,
+    }
+
+
+def _remember_if_flagged(transcript, moderation_result, degraded):
+    # Local fallback verdicts are too coarse to reuse for other requests
+    if NEAR_DUP_ENABLED and moderation_result.flagged and not degraded:
+        near_duplicate_index.add(transcript, moderation_payload(moderation_result))
+
+
+async def _within_deadline(awaitable, deadline):
+    try:
+        return await asyncio.wait_for(awaitable, timeout=deadline.remaining())
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded("stage did not finish before the deadline")
+    except Exception:
+        # Provider timeouts surface as generic exceptions from the HTTP clients
+        if deadline.expired:
+            raise DeadlineExceeded("stage did not finish before the deadline")
+        raise
+
+
+async def transcribe_and_moderate(tmp_path, provider, deadline, priority=None, tenant=None, sampling=None,
+                                  conversation_id=None, audio_hash=None):
+    """
+    Transcribe a spooled audio file and moderate the transcript within `deadline`.
+
+    Audio whose fingerprint matches an earlier, already moderated recording
+    returns that transcript and verdict straight away, without calling a
+    provider. Fingerprinting happens once the job holds a scheduler slot.
+
+    With sampling on (the default from config) audio longer than
+    SAMPLING_MIN_AUDIO_SECONDS is moderated from a clip of its start, end and
+    loudest windows only; the result is marked "provisional" and lists the
+    "sampled_windows". submit_full_pass() can follow up with the whole file.
+
+    The job first waits for a slot from the pipeline scheduler according to
+    its priority class, tenant and estimated audio duration; Overloaded is
+    raised if the scheduler queue is full.
+
+    If the deadline expires while queued or during transcription the result has
+    no transcript and a "review" recommendation; if moderation runs out of time
+    the verdict comes from local keyword signals. These cases set "degraded": True.
+
+    The recommendation (allow, review or block) comes from the moderation
+    policy for `tenant`; "policy_categories" lists the categories over their
+    review threshold.
+
+    With a `conversation_id` the verdict is also folded into that
+    conversation's session; the result carries the "conversation" view and an
+    "allow" becomes "review" when the conversation as a whole is escalated.
+
+    `audio_hash` is the SHA-256 of the file when the caller computed it while
+    spooling, so the transcript cache does not read the file again.
+
+    When request tracing is enabled an anonymized trace of the request (sizes,
+    routing attributes, stage timings, outcome) is recorded for capacity
+    planning, including requests rejected as overloaded.
+    """
+    provider = normalize_provider(provider)
+    priority = normalize_priority(priority)
+    recorder = get_request_recorder()
+    arrival = time.time()
+    audio_seconds = await get_bulkhead("preprocess").run(estimate_duration, tmp_path)
+    audio_bytes = os.path.getsize(tmp_path) if recorder is not None else None
+    try:
+        result = apply_policy(
+            await _transcribe_and_moderate(tmp_path, provider, deadline, priority, tenant, sampling, audio_seconds,
+                                           audio_hash),
+            tenant,
+        )
+    except Exception as e:
+        if recorder is not None:
+            recorder.record(request_trace(arrival, provider, priority, tenant, audio_bytes, audio_seconds,
+                                          deadline.budget_ms, outcome="overloaded" if isinstance(e, Overloaded) else "error"))
+        raise
+    if recorder is not None:
+        recorder.record(request_trace(arrival, provider, priority, tenant, audio_bytes, audio_seconds,
+                                      deadline.budget_ms, result))
+    if conversation_id:
+        await asyncio.to_thread(apply_conversation, result, conversation_id)
+    return result
+
+
+def apply_conversation(result, conversation_id):
+    """Fold a pipeline result into its conversation session, in place"""
+    if result["moderation"] is None:
+        return result
+    conversation = conversation_sessions.observe(conversation_id, result["transcription"], result["moderation"])
+    result["conversation"] = conversation
+    if conversation["escalated"] and result["recommendation"] == "allow":
+        result["recommendation"] = "review"
+    return result
+
+
+async def _transcribe_and_moderate(tmp_path, provider, deadline, priority, tenant, sampling, audio_seconds,
+                                   audio_hash=None):
+    sampling = SAMPLING_ENABLED if sampling is None else sampling
+    sampled = sampling and audio_seconds >= SAMPLING_MIN_AUDIO_SECONDS
+    timings = {}
+
+    queued_at = time.time()
+    # Sampled audio is charged for the clip that will be transcribed
+    cost = min(audio_seconds, SAMPLING_WINDOW_SECONDS * (2 + SAMPLING_ENERGY_WINDOWS)) if sampled else audio_seconds
+    try:
+        with span("scheduler.wait", priority=priority, tenant=tenant or "default", audio_seconds=round(cost, 2)):
+            await pipeline_scheduler.acquire(priority, tenant, cost, timeout=deadline.remaining())
+    except DeadlineExceeded:
+        logger.warning(f"Deadline expired while queued ({priority})")
+        timings["queue_wait"] = time.time() - queued_at
+        return _unavailable("queue_deadline_exceeded", timings)
+    timings["queue_wait"] = time.time() - queued_at
+
+    # Decoding for the fingerprint and the sample runs inside the slot, so
+    # preprocessing is admitted in the scheduler's priority order too
+    sample = None
+    try:
+        preprocess_start = time.time()
+        try:
+            fingerprint = await _within_deadline(get_bulkhead("preprocess").run(_fingerprint, tmp_path, timings),
+                                                 deadline)
+            duplicate = _audio_duplicate_result(fingerprint, timings)
+            if duplicate is not None:
+                return duplicate
+
+            if sampled:
+                sample = await _within_deadline(get_bulkhead("preprocess").run(_sample_clip, tmp_path, timings, deadline),
+                                                deadline)
+        except DeadlineExceeded:
+            logger.warning("Preprocessing exceeded the deadline")
+            timings["preprocess_time"] = time.time() - preprocess_start
+            return _unavailable("preprocess_deadline_exceeded", timings)
+        if sample is not None:
+            stage_path, windows, _ = sample
+            # A sample transcript must not stand in for the whole recording
+            fingerprint = audio_hash = None
+        else:
+            stage_path = tmp_path
+        result = await _run_stages(stage_path, provider, deadline, timings, fingerprint, audio_hash)
+    finally:
+        pipeline_scheduler.release()
+        if sample is not None:
+            remove_quietly(sample[0])
+
+    if sample is not None:
+        result["provisional"] = True
+        result["sampled_windows"] = [[round(start, 1), round(end, 1)] for start, end in windows]
+    return result
+
+
+def _sample_clip(audio_file_path, timings, deadline):
+    start = time.time()
+    with span("sampling.select") as sampling_span:
+        sample = build_sample_clip(audio_file_path)
+        if sample is not None:
+            sampling_span.set_attribute("windows", len(sample[1]))
+            sampling_span.set_attribute("clip_seconds", round(sample[2], 1))
+    timings["sampling_time"] = time.time() - start
+    if sample is not None and deadline.expired:
+        # The request has already given up on this clip; nobody else removes it
+        remove_quietly(sample[0])
+        return None
+    return sample
+
+
+async def submit_full_pass(tmp_path, provider, tenant=None, on_result=None, audio_hash=None):
+    """
+    Queue the full transcribe-and-moderate pass for audio that got a
+    provisional verdict and return its job id. The job takes over `tmp_path`
+    (it is moved aside, so the caller's cleanup leaves it alone) and runs at
+    bulk priority without a deadline; `on_result` gets the final result.
+    """
+    job_path = f"{tmp_path}.full"
+    os.replace(tmp_path, job_path)
+
+    async def full_pass():
+        result = await transcribe_and_moderate(job_path, provider, Deadline(), priority="bulk",
+                                               tenant=tenant, sampling=False, audio_hash=audio_hash)
+        if on_result is not None:
+            on_result(result)
+        return result
+
+    return await job_store.submit("full_pass", full_pass, cleanup=lambda: remove_quietly(job_path))
+
+
+def _unavailable(reason, timings):
+    return {
+        "transcription": None,
+        "moderation": None,
+        "recommendation": "review",
+        "degraded": True,
+        "degraded_reason": reason,
+        "timings": timings,
+    }
+
+
+async def _run_stages(tmp_path, provider, deadline, timings, fingerprint=None, audio_hash=None):
+    start = time.time()
+
+    try:
+        with span("transcription", provider=provider):
+            transcript = await _within_deadline(
+                get_bulkhead(f"transcription:{provider}").run(
+                    transcribe_with_provider, tmp_path, provider, timeout=deadline.timeout(), fingerprint=fingerprint,
+                    audio_hash=audio_hash,
+                ),
+                deadline,
+            )
+    except DeadlineExceeded:
+        logger.warning(f"Transcription with {provider} exceeded the deadline")
+        timings["transcription_time"] = time.time() - start
+        return _unavailable("transcription_deadline_exceeded", timings)
+    timings["transcription_time"] = time.time() - start
+    logger.info(f"Transcription completed in {timings['transcription_time']:.2f}s: {len(transcript)} characters")
+
+    duplicate = _near_duplicate_result(transcript, timings)
+    if duplicate is not None:
+        audio_fingerprint_index.remember(fingerprint, transcript, duplicate["moderation"])
+        return duplicate
+
+    moderation_start = time.time()
+    degraded_reason = None
+    try:
+        with span("moderation", characters=len(transcript)):
+            moderation_result = await _within_deadline(
+                get_bulkhead("moderation").run(moderate_text, transcript, timeout=deadline.timeout()),
+                deadline,
+            )
+    except DeadlineExceeded:
+        logger.warning("Moderation exceeded the deadline, using local signals")
+        moderation_result = local_moderation(transcript)
+        degraded_reason = "moderation_deadline_exceeded"
+    timings["moderation_time"] = time.time() - moderation_start
+    _remember_if_flagged(transcript, moderation_result, degraded_reason is not None)
+    if degraded_reason is None:
+        audio_fingerprint_index.remember(fingerprint, transcript, moderation_payload(moderation_result))
+
+    result = {
+        "transcription": transcript,
+        "moderation": moderation_payload(moderation_result),
+        "degraded": degraded_reason is not None,
+        "timings": timings,
+    }
+    if degraded_reason:
+        result["degraded_reason"] = degraded_reason
+    return result
+
+
+def moderate_audio_file(audio_file_path, provider="openai_whisper", timeout=None, tenant=None, evaluate_policy=True):
+    """
+    Blocking transcribe-then-moderate for offline and batch callers, which
+    bypass the request scheduler and bulkheads. With evaluate_policy=False
+    the result has no recommendation yet, so bulk callers can evaluate the
+    policy over many results at once.
+    """
+    result = _moderate_audio_file(audio_file_path, provider, timeout)
+    return apply_policy(result, tenant) if evaluate_policy else result
+
+
+def _moderate_audio_file(audio_file_path, provider, timeout):
+    provider = normalize_provider(provider)
+    timings = {}
+    fingerprint = _fingerprint(audio_file_path, timings)
+    duplicate = _audio_duplicate_result(fingerprint, timings)
+    if duplicate is not None:
+        return duplicate
+
+    start = time.time()
+    with span("transcription", provider=provider):
+        transcript = transcribe_with_provider(audio_file_path, provider, timeout=timeout, fingerprint=fingerprint)
+    timings["transcription_time"] = time.time() - start
+
+    duplicate = _near_duplicate_result(transcript, timings)
+    if duplicate is not None:
+        audio_fingerprint_index.remember(fingerprint, transcript, duplicate["moderation"])
+        return duplicate
+
+    moderation_start = time.time()
+    with span("moderation", characters=len(transcript)):
+        moderation_result = moderate_text(transcript, timeout=timeout)
+    timings["moderation_time"] = time.time() - moderation_start
+    _remember_if_flagged(transcript, moderation_result, False)
+    audio_fingerprint_index.remember(fingerprint, transcript, moderation_payload(moderation_result))
+
+    return {
+        "transcription": transcript,
+        "moderation": moderation_payload(moderation_result),
+        "degraded": False,
+        "timings": timings,
+    }
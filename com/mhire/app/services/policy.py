@@ -0,0 +1,181 @@
+import json
+import logging
+
+import numpy as np
+
+from com.mhire.app.config.config import POLICY_PATH
+
+logger = logging.getLogger(__name__)
+
+TIERS = ("allow", "review", "block")
+_REVIEW, _BLOCK = 1, 2
+
+# Score thresholds per provider category: at or above "review" the content
+# goes to a human, at or above "block" it is rejected. Categories without an
+# entry use "default"; a provider "flagged" verdict is at least flagged_tier.
+DEFAULT_POLICY = {
+    "flagged_tier": "block",
+    "default": {"review": 0.5, "block": 0.9},
+    "categories": {
+        "harassment": {"review": 0.4, "block": 0.8},
+        "harassment_threatening": {"review": 0.2, "block": 0.5},
+        "hate": {"review": 0.3, "block": 0.7},
+        "hate_threatening": {"review": 0.2, "block": 0.5},
+        "sexual": {"review": 0.5, "block": 0.85},
+        "sexual_minors": {"review": 0.05, "block": 0.2},
+        "self_harm": {"review": 0.3, "block": 0.8},
+        "self_harm_intent": {"review": 0.2, "block": 0.7},
+        "self_harm_instructions": {"review": 0.2, "block": 0.6},
+        "violence": {"review": 0.5, "block": 0.85},
+        "violence_graphic": {"review": 0.4, "block": 0.8},
+        "illicit": {"review": 0.5, "block": 0.85},
+        "illicit_violent": {"review": 0.3, "block": 0.7},
+    },
+    # tenant id -> {"flagged_tier": ..., "categories": {category: {"review": x, "block": y}}}
+    "tenants": {},
+}
+
+
+class CompiledPolicy:
+    """
+    A policy compiled to a threshold tensor of shape (tenants + 1, 2, categories):
+    row 0 is the base policy, one row per tenant with its overrides applied,
+    and the middle axis holds the review and block thresholds. Categories
+    start at the "default" thresholds; a threshold set to null is +inf, so
+    it never triggers.
+
+    evaluate_batch() scores a whole (N, categories) matrix with a handful of
+    NumPy operations; evaluate() wraps it for a single moderation payload.
+    """
+
+    def __init__(self, policy):
+        base = policy.get("default", {})
+        tenants = policy.get("tenants", {})
+        names = set(policy.get("categories", {}))
+        for overrides in tenants.values():
+            names.update(overrides.get("categories", {}))
+        self.categories = sorted(names)
+        self.category_index = {name: i for i, name in enumerate(self.categories)}
+        self.tenant_index = {tenant: i + 1 for i, tenant in enumerate(sorted(tenants))}
+        self.default_thresholds = np.array([base.get("review", np.inf), base.get("block", np.inf)], dtype=np.float32)
+
+        self.thresholds = np.empty((len(self.tenant_index) + 1, 2, len(self.categories)), dtype=np.float32)
+        self.thresholds[:] = self.default_thresholds[:, None]
+        self.flagged_tier = np.zeros(len(self.tenant_index) + 1, dtype=np.int8)
+        self._fill(0, policy)
+        for tenant, row in self.tenant_index.items():
+            self.thresholds[row] = self.thresholds[0]
+            self.flagged_tier[row] = self.flagged_tier[0]
+            self._fill(row, tenants[tenant])
+
+    def _fill(self, row, policy):
+        if "flagged_tier" in policy:
+            self.flagged_tier[row] = TIERS.index(policy["flagged_tier"])
+        for name, limits in policy.get("categories", {}).items():
+            column = self.category_index[name]
+            for tier, key in ((0, "review"), (1, "block")):
+                if key in limits:
+                    self.thresholds[row, tier, column] = np.inf if limits[key] is None else limits[key]
+
+    def score_matrix(self, payloads):
+        """
+        (N, categories) scores from moderation payloads, plus (N,) flagged and,
+        for categories outside the policy, the highest such score per row.
+        """
+        count = len(payloads)
+        score_dicts = [payload.get("category_scores") or {} for payload in payloads]
+        flagged = np.fromiter((bool(payload.get("flagged")) for payload in payloads), dtype=bool, count=count)
+        scores = np.zeros((count, len(self.categories)), dtype=np.float32)
+        other = np.zeros(count, dtype=np.float32)
+        if not count:
+            return scores, flagged, other
+
+        # Results from one provider share a key order: convert them in one go
+        names = list(score_dicts[0])
+        raw = None
+        if all(list(d) == names for d in score_dicts):
+            try:
+                raw = np.array([list(d.values()) for d in score_dicts], dtype=np.float32).reshape(count, len(names))
+            except (TypeError, ValueError):
+                raw = None   # e.g. a None score somewhere
+        if raw is not None:
+            for source, name in enumerate(names):
+                column = self.category_index.get(name)
+                if column is None:
+                    np.maximum(other, raw[:, source], out=other)
+                else:
+                    scores[:, column] = raw[:, source]
+            return scores, flagged, other
+
+        for name, column in self.category_index.items():
+            scores[:, column] = [d.get(name) or 0.0 for d in score_dicts]
+        unknown = set().union(*(d.keys() for d in score_dicts)) - self.category_index.keys()
+        for name in unknown:
+            np.maximum(other, [d.get(name) or 0.0 for d in score_dicts], out=other)
+        return scores, flagged, other
+
+    def tenant_rows(self, tenants):
+        if isinstance(tenants, str) or tenants is None:
+            return np.full(1, self.tenant_index.get(tenants, 0), dtype=np.intp)
+        return np.fromiter((self.tenant_index.get(t, 0) for t in tenants), dtype=np.intp, count=len(tenants))
+
+    def evaluate_batch(self, scores, flagged, other=None, tenant_rows=None):
+        """
+        Tier per row (0 allow, 1 review, 2 block) and the (N, 2, categories)
+        boolean matrix of crossed review/block thresholds.
+        """
+        if tenant_rows is None:
+            tenant_rows = np.zeros(scores.shape[0], dtype=np.intp)
+        crossed = scores[:, None, :] >= self.thresholds[tenant_rows]
+        hits = crossed.any(axis=2)
+        if other is not None:
+            hits |= other[:, None] >= self.default_thresholds
+        tiers = np.where(hits[:, 1], _BLOCK, np.where(hits[:, 0], _REVIEW, 0)).astype(np.int8)
+        tiers = np.maximum(tiers, np.where(flagged, self.flagged_tier[tenant_rows], 0))
+        return tiers, crossed
+
+    def evaluate_payloads(self, payloads, tenants=None):
+        """
+        [(recommendation, categories over their threshold)] for moderation
+        payloads. Categories outside the policy are listed when they cross
+        the default review threshold.
+        """
+        scores, flagged, other = self.score_matrix(payloads)
+        rows = self.tenant_rows(tenants)
+        if rows.size == 1 and len(payloads) != 1:
+            rows = np.repeat(rows, len(payloads))
+        tiers, crossed = self.evaluate_batch(scores, flagged, other, rows)
+        reasons = [[] for _ in payloads]
+        for row, column in zip(*np.nonzero(crossed[:, 0, :])):
+            reasons[row].append(self.categories[column])
+        # Rare: only rows whose out-of-policy maximum crossed are looked up by name
+        review = self.default_thresholds[0]
+        for row in np.nonzero(other >= review)[0].tolist():
+            scores_by_name = payloads[row].get("category_scores") or {}
+            reasons[row].extend(sorted(name for name, score in scores_by_name.items()
+                                       if name not in self.category_index and (score or 0.0) >= review))
+        return [(TIERS[tier], reason) for tier, reason in zip(tiers.tolist(), reasons)]
+
+    def evaluate(self, payload, tenant=None):
+        """(recommendation, categories over their review threshold) for one payload"""
+        return self.evaluate_payloads([payload], tenant)[0]
+
+
+def load_policy(path=POLICY_PATH):
+    """Compile the policy JSON at `path`, or the built-in default when unset"""
+    if not path:
+        return CompiledPolicy(DEFAULT_POLICY)
+    with open(path, "r", encoding="utf-8") as f:
+        policy = json.load(f)
+    logger.info(f"Loaded moderation policy from {path}")
+    return CompiledPolicy(policy)
+
+
+moderation_policy = load_policy()
+
+
+def apply_policy(result, tenant=None):
+    """Set recommendation and policy_categories of a pipeline result from its moderation, in place"""
+    if result.get("moderation") is not None:
+        result["recommendation"], result["policy_categories"] = moderation_policy.evaluate(result["moderation"], tenant)
+    return result
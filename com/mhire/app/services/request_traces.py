@@ -0,0 +1,241 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+
+from com.mhire.app.config.config import (
+    REQUEST_TRACE_MAX_BUFFER,
+    REQUEST_TRACE_PATH,
+    REQUEST_TRACE_SALT,
+    REQUEST_TRACE_SAMPLE_RATE,
+)
+
+logger = logging.getLogger(__name__)
+
+# Endpoints that run the transcribe-and-moderate pipeline
+TRACED_PATHS = ("/transcribe-and-moderate", "/internal/moderate-audio")
+
+
+_salt = None
+
+
+def _load_or_create_salt(path):
+    """
+    Random salt kept in `path`. O_EXCL makes exactly one process create it,
+    so every worker appending to the same trace file hashes identically.
+    """
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        for _ in range(50):
+            with open(path, "r", encoding="utf-8") as f:
+                salt = f.read().strip()
+            if salt:
+                return salt
+            time.sleep(0.01)   # the creating process has not written it yet
+        raise RuntimeError(f"Request trace salt file {path} is empty")
+    salt = secrets.token_hex(16)
+    try:
+        os.write(fd, salt.encode("utf-8"))
+    finally:
+        os.close(fd)
+    logger.info(f"Generated request trace salt in {path}")
+    return salt
+
+
+def trace_salt():
+    """
+    request_trace_salt, or a random salt generated once and kept next to the
+    trace file. Never empty: unsalted hashes of tenant ids are reversible by
+    hashing candidate ids.
+    """
+    global _salt
+    if _salt is None:
+        if REQUEST_TRACE_SALT:
+            _salt = REQUEST_TRACE_SALT
+        elif REQUEST_TRACE_PATH:
+            directory = os.path.dirname(REQUEST_TRACE_PATH)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            _salt = _load_or_create_salt(REQUEST_TRACE_PATH + ".salt")
+        else:
+            # Recording is disabled; keep pseudonyms unlinkable all the same
+            _salt = secrets.token_hex(16)
+    return _salt
+
+
+def pseudonym(value, salt=None):
+    """Stable, non-reversible token for an identifier such as a tenant id"""
+    if value is None:
+        return None
+    return hashlib.sha256(f"{salt or trace_salt()}\x1f{value}".encode("utf-8")).hexdigest()[:16]
+
+
+def request_trace(arrival, provider, priority, tenant, audio_bytes, audio_seconds, deadline_ms, result=None,
+                  outcome=None):
+    """
+    Trace record of one pipeline request. Only sizes, timings and routing
+    attributes are kept: no transcript, scores, audio hash or raw tenant id.
+    `outcome` defaults to what the result says happened (ok, audio_duplicate,
+    near_duplicate or the degraded reason).
+    """
+    result = result or {}
+    if outcome is None:
+        if "audio_duplicate" in result:
+            outcome = "audio_duplicate"
+        elif "near_duplicate" in result:
+            outcome = "near_duplicate"
+        elif result.get("degraded"):
+            outcome = result.get("degraded_reason") or "degraded"
+        else:
+            outcome = "ok"
+    return {
+        "arrival": round(arrival, 6),
+        "provider": provider,
+        "priority": priority,
+        "tenant": pseudonym(tenant),
+        "audio_bytes": audio_bytes,
+        "audio_seconds": round(audio_seconds, 3),
+        "deadline_ms": deadline_ms,
+        "provisional": bool(result.get("provisional")),
+        "stages": {name: round(seconds, 4) for name, seconds in (result.get("timings") or {}).items()},
+        "outcome": outcome,
+        "total": round(time.time() - arrival, 4),
+    }
+
+
+def rejected_request_trace(headers, audio_bytes):
+    """
+    Trace of a request shed by admission control before it was read, from
+    its headers only: audio duration and, for multipart uploads, provider
+    and priority are unknown. Keeps the offered load in the trace complete.
+    """
+    deadline_ms = headers.get("x-deadline-ms", "")
+    return {
+        "arrival": round(time.time(), 6),
+        "provider": headers.get("x-provider"),
+        "priority": headers.get("x-priority"),
+        "tenant": pseudonym(headers.get("x-tenant-id")),
+        "audio_bytes": audio_bytes,
+        "audio_seconds": None,
+        "deadline_ms": int(deadline_ms) if deadline_ms.isdigit() else None,
+        "provisional": False,
+        "stages": {},
+        "outcome": "admission_rejected",
+        "total": 0.0,
+    }
+
+
+class RequestTraceRecorder:
+    """
+    Write-behind recorder of request traces as JSON lines. record() keeps a
+    `sample_rate` fraction of requests and only enqueues; a writer thread
+    appends them to the file in batches. When the buffer is full records are
+    dropped and counted rather than slowing requests down.
+    """
+
+    def __init__(self, path, sample_rate=REQUEST_TRACE_SAMPLE_RATE, max_buffer=REQUEST_TRACE_MAX_BUFFER,
+                 batch_size=200, flush_interval=1.0):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_buffer)
+        self.written = 0
+        self.dropped = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._writer = threading.Thread(target=self._run, name="request-trace-writer", daemon=True)
+        self._writer.start()
+
+    def record(self, trace):
+        """Queue a trace without blocking; returns False if it was sampled out or dropped"""
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return False
+        try:
+            self._queue.put_nowait(trace)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._append("".join(json.dumps(trace) + "\n" for trace in batch).encode("utf-8"))
+                self.written += len(batch)
+            except Exception as e:
+                logger.error(f"Failed to write {len(batch)} request traces: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _append(self, data):
+        # One O_APPEND write per batch keeps lines from several worker
+        # processes sharing the file from interleaving
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    def flush(self):
+        """Block until every queued trace has been written"""
+        self._queue.join()
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "sample_rate": self.sample_rate,
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+        }
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_request_recorder():
+    """Process-wide recorder, created on first use; None when recording is disabled"""
+    global _recorder
+    if _recorder is None and REQUEST_TRACE_PATH:
+        with _recorder_lock:
+            if _recorder is None:
+                trace_salt()   # create or load the salt before the first trace
+                _recorder = RequestTraceRecorder(REQUEST_TRACE_PATH)
+                atexit.register(_recorder.flush)
+    return _recorder
+
+
+def load_traces(path):
+    """Traces from a JSONL file (several workers may append to one), ordered by arrival"""
+    traces = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    traces.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning("Skipping malformed trace line")
+    traces.sort(key=lambda trace: trace["arrival"])
+    return traces
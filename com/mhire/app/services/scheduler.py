@@ -0,0 +1,193 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from com.mhire.app.config.config import (
+    PRIORITY_CLASS_WEIGHTS,
+    SCHEDULER_AGING_RATE,
+    SCHEDULER_CAPACITY,
+    SCHEDULER_MAX_WAITING,
+    TENANT_WEIGHTS,
+)
+from com.mhire.app.middleware.admission import Overloaded, per_worker
+from com.mhire.app.services.deadline import DeadlineExceeded
+
+PRIORITY_CLASSES = tuple(PRIORITY_CLASS_WEIGHTS)
+DEFAULT_PRIORITY = "realtime"
+DEFAULT_TENANT = "default"
+_STRIDE = 1.0
+
+
+def normalize_priority(priority):
+    priority = (priority or DEFAULT_PRIORITY).lower()
+    return priority if priority in PRIORITY_CLASS_WEIGHTS else DEFAULT_PRIORITY
+
+
+class _Entry:
+    __slots__ = ("cost", "enqueued_at", "tenant", "future")
+
+    def __init__(self, cost, tenant, future):
+        self.cost = cost
+        self.enqueued_at = time.monotonic()
+        self.tenant = tenant
+        self.future = future
+
+
+class PipelineScheduler:
+    """
+    Admission order for the transcribe-and-moderate pipeline.
+
+    At most `capacity` jobs run at once. When a slot frees up the next job is
+    chosen in three steps:
+      1. class: stride scheduling over the classes with waiting work, so
+         realtime gets most slots but reported and bulk are never starved;
+      2. tenant: within the class, the tenant with the lowest virtual time
+         (weighted fair queueing, charged by job cost / tenant weight);
+      3. job: within the tenant, shortest estimated audio duration first,
+         with waiting time credited (aging) so long jobs eventually run.
+    """
+
+    def __init__(self, capacity=per_worker(SCHEDULER_CAPACITY), class_weights=PRIORITY_CLASS_WEIGHTS,
+                 tenant_weights=TENANT_WEIGHTS, max_waiting=per_worker(SCHEDULER_MAX_WAITING),
+                 aging_rate=SCHEDULER_AGING_RATE):
+        self.capacity = capacity
+        self.class_weights = dict(class_weights)
+        self.tenant_weights = dict(tenant_weights)
+        self.max_waiting = max_waiting
+        self.aging_rate = aging_rate
+        self.running = 0
+        self._waiting = {cls: {} for cls in self.class_weights}
+        self._class_pass = {cls: 0.0 for cls in self.class_weights}
+        # Pass of the most recently dispatched class: where idle classes rejoin
+        self._vtime = 0.0
+        self._tenant_vtime = {cls: {} for cls in self.class_weights}
+        self._waiting_count = 0
+        self._stats = {cls: {"dispatched": 0, "wait_seconds": 0.0} for cls in self.class_weights}
+
+    @asynccontextmanager
+    async def slot(self, priority, tenant, cost, timeout=None):
+        """Hold a pipeline slot for the block; raises Overloaded or DeadlineExceeded"""
+        wait = await self.acquire(priority, tenant, cost, timeout)
+        try:
+            yield wait
+        finally:
+            self.release()
+
+    async def acquire(self, priority, tenant, cost, timeout=None):
+        """Wait for a slot and return the time spent queued"""
+        priority = normalize_priority(priority)
+        tenant = tenant or DEFAULT_TENANT
+        cost = max(float(cost or 1.0), 1.0)
+
+        if self.running < self.capacity and self._waiting_count == 0:
+            # Uncontended: no fairness accounting, so a class that ran alone
+            # for a while is not behind everyone once contention starts
+            self.running += 1
+            self._record(priority, 0.0)
+            return 0.0
+        if self._waiting_count >= self.max_waiting:
+            raise Overloaded("pipeline scheduler queue full")
+
+        entry = _Entry(cost, tenant, asyncio.get_running_loop().create_future())
+        self._enqueue(priority, entry)
+        try:
+            await asyncio.wait_for(entry.future, timeout)
+        except asyncio.TimeoutError:
+            if entry.future.done() and not entry.future.cancelled():
+                # Dispatched just as the deadline fired: the slot is ours to give back
+                self.release()
+            else:
+                self._remove(priority, entry)
+            raise DeadlineExceeded("deadline expired while queued")
+        except BaseException:
+            if entry.future.done() and not entry.future.cancelled():
+                self.release()
+            else:
+                self._remove(priority, entry)
+            raise
+        return time.monotonic() - entry.enqueued_at
+
+    def release(self):
+        self.running -= 1
+        self._dispatch()
+
+    def _enqueue(self, priority, entry):
+        tenants = self._waiting[priority]
+        if not any(tenants.values()):
+            # An idle class rejoins at the global virtual time: it neither
+            # banks credit nor carries debt from before it went idle
+            self._class_pass[priority] = self._vtime
+        if not tenants.get(entry.tenant):
+            vtimes = self._tenant_vtime[priority]
+            active = [vtimes.get(t, 0.0) for t, queue in tenants.items() if queue]
+            if active:
+                vtimes[entry.tenant] = max(vtimes.get(entry.tenant, 0.0), min(active))
+        tenants.setdefault(entry.tenant, []).append(entry)
+        self._waiting_count += 1
+
+    def _remove(self, priority, entry):
+        queue = self._waiting[priority].get(entry.tenant)
+        if queue and entry in queue:
+            queue.remove(entry)
+            self._waiting_count -= 1
+            self._prune(priority, entry.tenant)
+
+    def _prune(self, priority, tenant):
+        tenants = self._waiting[priority]
+        if not tenants.get(tenant):
+            tenants.pop(tenant, None)
+        if not tenants:
+            # No backlog left in the class: fairness history no longer matters
+            self._tenant_vtime[priority].clear()
+
+    def _dispatch(self):
+        while self.running < self.capacity and self._waiting_count:
+            candidates = [c for c, tenants in self._waiting.items() if any(tenants.values())]
+            priority = min(candidates, key=lambda c: self._class_pass[c])
+            tenants = self._waiting[priority]
+            vtimes = self._tenant_vtime[priority]
+            tenant = min((t for t, queue in tenants.items() if queue), key=lambda t: vtimes.get(t, 0.0))
+            queue = tenants[tenant]
+
+            now = time.monotonic()
+            entry = min(queue, key=lambda e: e.cost - (now - e.enqueued_at) * self.aging_rate)
+            queue.remove(entry)
+            self._waiting_count -= 1
+            if entry.future.cancelled():
+                self._prune(priority, tenant)
+                continue
+            self.running += 1
+            self._vtime = self._class_pass[priority]
+            self._charge(priority, tenant, entry.cost)
+            self._record(priority, now - entry.enqueued_at)
+            self._prune(priority, tenant)
+            entry.future.set_result(None)
+
+    def _charge(self, priority, tenant, cost):
+        self._class_pass[priority] += _STRIDE / self.class_weights[priority]
+        vtimes = self._tenant_vtime[priority]
+        vtimes[tenant] = vtimes.get(tenant, 0.0) + cost / self.tenant_weights.get(tenant, 1.0)
+
+    def _record(self, priority, waited):
+        stats = self._stats[priority]
+        stats["dispatched"] += 1
+        stats["wait_seconds"] += waited
+
+    def stats(self):
+        return {
+            "capacity": self.capacity,
+            "running": self.running,
+            "waiting": self._waiting_count,
+            "classes": {
+                cls: {
+                    "weight": self.class_weights[cls],
+                    "waiting": sum(len(q) for q in self._waiting[cls].values()),
+                    "dispatched": stats["dispatched"],
+                    "avg_wait": round(stats["wait_seconds"] / stats["dispatched"], 4) if stats["dispatched"] else 0.0,
+                }
+                for cls, stats in self._stats.items()
+            },
+        }
+
+
+pipeline_scheduler = PipelineScheduler()
@@ -0,0 +1,237 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from com.mhire.app.config.config import (
+    ENABLE_STANDIN_PROVIDERS,
+    PROVIDER_RATE_LIMITS,
+    RATE_LIMIT_BURST_SECONDS,
+    SHARED_CACHE_PATH,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS token_bucket (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class RateLimited(Exception):
+    """Raised when a provider token bucket cannot supply a token in time"""
+
+
+class SharedCache:
+    """
+    Key/value cache in a SQLite file opened in WAL mode, so every worker
+    process (and every replica mounting the same volume) reads and writes
+    the same entries. Values are JSON; expired rows are ignored on read and
+    purged now and then on write. Each thread keeps its own connection.
+    """
+
+    def __init__(self, path, purge_every=1000):
+        self.path = path
+        self.purge_every = purge_every
+        self._local = threading.local()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace, key):
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, key, time.time()),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, namespace, key, value, ttl):
+        conn = self._conn()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value), now + ttl),
+        )
+        self._writes += 1
+        if self._writes % self.purge_every == 0:
+            conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+
+    def update(self, namespace, key, fn, ttl):
+        """
+        Replace a value with `fn(current value or None)` in one transaction,
+        so concurrent read-modify-writes from other processes are not lost.
+        Returns the new value.
+        """
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?", (namespace, key, now)
+            ).fetchone()
+            value = fn(None if row is None else json.loads(row[0]))
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), now + ttl),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return value
+
+    def trim(self, namespace, max_entries):
+        """Delete a namespace's entries closest to expiry past `max_entries`; returns how many went"""
+        conn = self._conn()
+        cursor = conn.execute(
+            "DELETE FROM cache WHERE namespace = ? AND key IN (SELECT key FROM cache WHERE namespace = ?"
+            " ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (namespace, namespace, max_entries),
+        )
+        return cursor.rowcount
+
+    def count(self, namespace):
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM cache WHERE namespace = ? AND expires_at > ?", (namespace, time.time())
+        ).fetchone()[0]
+
+    def take_token(self, name, rate, burst, timeout=None):
+        """
+        Take one token from the named bucket shared by all processes, waiting
+        for a refill if needed. Returns the seconds waited; raises RateLimited
+        if no token can be had within `timeout` seconds.
+        """
+        waited = 0.0
+        while True:
+            conn = self._conn()
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT tokens, updated_at FROM token_bucket WHERE name = ?", (name,)).fetchone()
+                tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+                if tokens >= 1.0:
+                    conn.execute("INSERT OR REPLACE INTO token_bucket (name, tokens, updated_at) VALUES (?, ?, ?)",
+                                 (name, tokens - 1.0, now))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            if tokens >= 1.0:
+                return waited
+            delay = (1.0 - tokens) / rate
+            if timeout is not None and waited + delay > timeout:
+                raise RateLimited(f"{name} rate limit: no token within {timeout:.2f}s")
+            time.sleep(delay)
+            waited += delay
+
+    def stats(self):
+        conn = self._conn()
+        rows = conn.execute(
+            "SELECT namespace, COUNT(*) FROM cache WHERE expires_at > ? GROUP BY namespace", (time.time(),)
+        ).fetchall()
+        return {"path": self.path, "entries": dict(rows), "hits": self.hits, "misses": self.misses}
+
+
+class ProcessLocalCache:
+    """
+    SharedCache stand-in kept in process memory, for state that falls back
+    to one process when shared_cache_path is empty.
+    """
+
+    def __init__(self):
+        self._values = OrderedDict()   # (namespace, key) -> (value, expires_at), least recently written first
+        self._lock = threading.Lock()
+
+    def get(self, namespace, key):
+        with self._lock:
+            value, expires_at = self._values.get((namespace, key), (None, 0.0))
+            return value if expires_at > time.time() else None
+
+    def put(self, namespace, key, value, ttl):
+        with self._lock:
+            self._values.pop((namespace, key), None)
+            self._values[(namespace, key)] = (value, time.time() + ttl)
+
+    def update(self, namespace, key, fn, ttl):
+        with self._lock:
+            current, expires_at = self._values.pop((namespace, key), (None, 0.0))
+            value = fn(current if expires_at > time.time() else None)
+            self._values[(namespace, key)] = (value, time.time() + ttl)
+            return value
+
+    def trim(self, namespace, max_entries):
+        with self._lock:
+            now = time.time()
+            keys = [key for key in self._values if key[0] == namespace]
+            live = [key for key in keys if self._values[key][1] > now]
+            doomed = [key for key in keys if self._values[key][1] <= now] + live[:max(len(live) - max_entries, 0)]
+            for key in doomed:
+                del self._values[key]
+            return len(doomed)
+
+    def count(self, namespace):
+        with self._lock:
+            now = time.time()
+            return sum(1 for (ns, _), (_, expires_at) in self._values.items() if ns == namespace and expires_at > now)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_shared_cache():
+    """Process-wide cache handle, created on first use; None when disabled"""
+    global _cache
+    if _cache is None and SHARED_CACHE_PATH:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SharedCache(SHARED_CACHE_PATH)
+    return _cache
+
+
+def cache_key(*parts):
+    """
+    Key of a cached provider result. Workers running stand-in providers use
+    keys of their own, so their fake transcripts and verdicts never answer
+    real requests sharing the cache file.
+    """
+    if ENABLE_STANDIN_PROVIDERS:
+        parts = ("standin",) + parts
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def rate_limit(provider, timeout=None):
+    """Wait for a token from the provider's host-wide bucket, if it has a limit"""
+    rate = PROVIDER_RATE_LIMITS.get(provider, 0.0)
+    cache = get_shared_cache()
+    if rate <= 0 or cache is None:
+        return 0.0
+    return cache.take_token(f"provider:{provider}", rate, max(rate * RATE_LIMIT_BURST_SECONDS, 1.0), timeout)
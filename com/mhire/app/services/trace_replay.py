@@ -0,0 +1,130 @@
+import io
+import random
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from com.mhire.app.services.audio_probe import DEFAULT_BYTES_PER_SECOND
+from com.mhire.app.services.capacity_sim import latency_summary
+
+
+def synthetic_wav(audio_seconds, audio_bytes, seed):
+    """
+    Low-level noise as WAV bytes with the recorded duration and roughly the
+    recorded size (the sample rate is chosen to match both), unique per seed
+    so fingerprint and cache lookups miss as they would for new audio.
+    Traces without a duration (requests shed before they were read) get the
+    duration their size implies, as in the capacity simulation.
+    """
+    if audio_seconds is None:
+        audio_seconds = (audio_bytes or DEFAULT_BYTES_PER_SECOND) / DEFAULT_BYTES_PER_SECOND
+    audio_seconds = max(audio_seconds, 0.1)
+    sample_rate = int(min(max((audio_bytes or 32000 * audio_seconds) / audio_seconds / 2, 4000), 48000))
+    samples = np.random.default_rng(seed).normal(0, 300, int(sample_rate * audio_seconds)).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def _send(session, url, trace, provider, seed, scheduled, internal_token=None):
+    """
+    POST one trace. Latency runs from `scheduled`, the perf_counter time the
+    request was due, so client-side backlog counts against the service as it
+    would for a real caller; the send delay is reported separately.
+    """
+    body = synthetic_wav(trace["audio_seconds"], trace["audio_bytes"], seed)
+    headers = {
+        "Content-Type": "audio/wav",
+        "X-Provider": provider,
+        "X-Priority": trace["priority"],
+        "X-Full-Pass": "false",
+    }
+    if internal_token:
+        headers["X-Internal-Token"] = internal_token
+    if trace.get("tenant"):
+        headers["X-Tenant-Id"] = trace["tenant"]
+    if trace.get("deadline_ms"):
+        headers["X-Deadline-Ms"] = str(trace["deadline_ms"])
+    send_delay = time.perf_counter() - scheduled
+    try:
+        response = session.post(url, data=body, headers=headers, timeout=300)
+        latency = time.perf_counter() - scheduled
+        degraded = response.status_code == 200 and bool(response.json().get("degraded"))
+        return response.status_code, latency, degraded, send_delay
+    except Exception:
+        return None, time.perf_counter() - scheduled, False, send_delay
+
+
+def replay_traces(traces, base_url, rate_scale=1.0, provider_mix=None, max_in_flight=256, seed=0,
+                  internal_token=None):
+    """
+    Open-loop replay of recorded traces against a running service through
+    /internal/moderate-audio: each request is sent at its recorded arrival
+    offset (divided by `rate_scale`) with synthetic audio of its size and
+    duration and its recorded provider, priority, tenant and deadline.
+
+    `internal_token` is the service's internal_api_token. Run the service
+    with enable_standin_providers=true (and the fitted
+    standin_latency_models) to exercise the real admission control,
+    scheduler, bulkheads and worker processes without calling providers.
+    Audio and transcript duplicates are not reproduced: every replayed
+    request is new audio.
+    """
+    rng = random.Random(seed)
+    url = base_url.rstrip("/") + "/internal/moderate-audio"
+    if provider_mix:
+        providers, weights = zip(*provider_mix.items())
+    local = threading.local()
+
+    def send(trace, provider, request_seed, scheduled):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        return _send(session, url, trace, provider, request_seed, scheduled, internal_token)
+
+    if not traces:
+        return {"requests": 0}
+    first = traces[0]["arrival"]
+    futures = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="replay") as executor:
+        for i, trace in enumerate(traces):
+            scheduled = started + (trace["arrival"] - first) / rate_scale
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            provider = rng.choices(providers, weights)[0] if provider_mix else trace["provider"]
+            futures.append(executor.submit(send, trace, provider, seed * 1000003 + i, scheduled))
+        outcomes = [future.result() for future in futures]
+    wall = time.perf_counter() - started
+
+    served = [latency for status, latency, _, _ in outcomes if status == 200]
+    send_delays = [send_delay for _, _, _, send_delay in outcomes]
+    statuses = {}
+    for status, _, _, _ in outcomes:
+        key = str(status) if status is not None else "connection_error"
+        statuses[key] = statuses.get(key, 0) + 1
+    return {
+        "requests": len(outcomes),
+        "served": len(served),
+        "degraded": sum(degraded for _, _, degraded, _ in outcomes),
+        "rejected": statuses.get("503", 0),
+        "statuses": statuses,
+        "duration": round(wall, 3),
+        "throughput_rps": round(len(served) / wall, 4) if wall > 0 else None,
+        "latency": latency_summary(served),
+        # Client backlog: how long requests waited for a free sender thread
+        # (or behind synthesis) after they were due. A large backlog means
+        # the replay, not the service, limited the offered load.
+        "send_delay": latency_summary(send_delays),
+        "late_sends": sum(1 for seconds in send_delays if seconds > 0.05),
+    }
+
@@ -0,0 +1,287 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+from com.mhire.app.config.config import TRACE_EXPORT_PATH, TRACE_OTLP_ENDPOINT
+
+logger = logging.getLogger(__name__)
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    A timed unit of work. Field names and ids follow the OpenTelemetry data
+    model (16-byte trace id, 8-byte span id, unix-nano timestamps) so exported
+    spans load into any OTLP-compatible backend.
+    """
+
+    def __init__(self, name, trace_id=None, parent_span_id=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status = "OK"
+        self.events = []
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def add_event(self, name, **attributes):
+        self.events.append({"name": name, "timeUnixNano": time.time_ns(), "attributes": attributes})
+
+    def record_exception(self, exc):
+        self.status = "ERROR"
+        self.add_event("exception", type=type(exc).__name__, message=str(exc))
+
+    @property
+    def duration_ms(self):
+        end_ns = self.end_ns or time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def to_otlp(self):
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id or "",
+            "name": self.name,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "events": [
+                {
+                    "name": event["name"],
+                    "timeUnixNano": str(event["timeUnixNano"]),
+                    "attributes": [_otlp_attribute(k, v) for k, v in event["attributes"].items()],
+                }
+                for event in self.events
+            ],
+            "status": {"code": 2 if self.status == "ERROR" else 1},
+        }
+
+
+def _otlp_attribute(key, value):
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class FileSpanExporter:
+    """
+    Appends finished spans as OTLP-JSON lines to a local file. export() only
+    enqueues; a writer thread serializes spans and appends them in batches,
+    one O_APPEND write per batch so several worker processes can share the
+    file. Spans are dropped and counted when the queue is full.
+    """
+
+    def __init__(self, path, batch_size=200, flush_interval=1.0, max_queue=10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        threading.Thread(target=self._worker, name="span-file-exporter", daemon=True).start()
+
+    def export(self, span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _worker(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._append("".join(json.dumps(s.to_otlp()) + "\n" for s in batch).encode("utf-8"))
+            except Exception as e:
+                logger.error(f"Failed to write {len(batch)} spans: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _append(self, data):
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    def flush(self):
+        """Block until every queued span has been written"""
+        self._queue.join()
+
+
+class OTLPHttpExporter:
+    """
+    Batches spans and posts them to an OTLP/HTTP JSON collector endpoint
+    (e.g. http://localhost:4318/v1/traces) from a background thread.
+    """
+
+    def __init__(self, endpoint, service_name, batch_size=64, flush_interval=2.0, max_queue=10000):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        threading.Thread(target=self._worker, name="otlp-exporter", daemon=True).start()
+
+    def export(self, span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _worker(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._post(batch)
+
+    def _post(self, batch):
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+                "scopeSpans": [{"scope": {"name": "voice-moderation"}, "spans": [s.to_otlp() for s in batch]}],
+            }]
+        }
+        try:
+            requests.post(self.endpoint, json=payload, timeout=5)
+        except Exception as e:
+            logger.debug(f"Dropping {len(batch)} spans, collector unavailable: {str(e)}")
+
+
+_exporters = []
+
+
+def configure_tracing(service_name):
+    """Set up exporters from config; tracing is a no-op export when none are set"""
+    _exporters.clear()
+    if TRACE_EXPORT_PATH:
+        exporter = FileSpanExporter(TRACE_EXPORT_PATH)
+        atexit.register(exporter.flush)
+        _exporters.append(exporter)
+    if TRACE_OTLP_ENDPOINT:
+        _exporters.append(OTLPHttpExporter(TRACE_OTLP_ENDPOINT, service_name))
+
+
+def add_exporter(exporter):
+    _exporters.append(exporter)
+
+
+def current_span():
+    return _current_span.get()
+
+
+@contextmanager
+def span(name, trace_id=None, parent_span_id=None, **attributes):
+    """Open a child span of the current span (or a new trace) for the block"""
+    parent = _current_span.get()
+    if parent is not None and trace_id is None:
+        trace_id, parent_span_id = parent.trace_id, parent.span_id
+    current = Span(name, trace_id=trace_id, parent_span_id=parent_span_id, attributes=attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.record_exception(e)
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+        for exporter in _exporters:
+            try:
+                exporter.export(current)
+            except Exception as e:
+                logger.debug(f"Span export failed: {str(e)}")
+
+
+def _parse_traceparent(value):
+    """W3C traceparent: version-traceid-spanid-flags"""
+    parts = value.split("-")
+    if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16:
+        return parts[1], parts[2]
+    return None, None
+
+
+class TracingMiddleware:
+    """Opens a root span per HTTP request and returns its id in X-Trace-Id"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers", []))
+        trace_id, parent_span_id = _parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+
+        with span(f"{scope['method']} {scope['path']}", trace_id=trace_id, parent_span_id=parent_span_id,
+                  **{"http.method": scope["method"], "http.route": scope["path"]}) as root:
+
+            async def traced_send(message):
+                if message["type"] == "http.response.start":
+                    root.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        root.status = "ERROR"
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"x-trace-id", root.trace_id.encode())]
+                await send(message)
+
+            await self.app(scope, receive, traced_send)
+
+
+class TraceContextFilter(logging.Filter):
+    """Adds trace_id and span_id of the active span to every log record"""
+
+    def filter(self, record):
+        active = _current_span.get()
+        record.trace_id = active.trace_id if active else "-"
+        record.span_id = active.span_id if active else "-"
+        return True
+
+
+def install_log_correlation():
+    """Attach trace ids to root log handlers and include them in the format"""
+    formatter = logging.Formatter("%(levelname)s:%(name)s:[trace=%(trace_id)s span=%(span_id)s] %(message)s")
+    for handler in logging.getLogger().handlers:
+        handler.addFilter(TraceContextFilter())
+        handler.setFormatter(formatter)
@@ -4,9 +4,11 @@
 # client = openai.OpenAI(api_key = OPENAI_API_KEY) 
 
 from com.mhire.app.client.openai_client import client
-def transcribe_audio(audio_file_path):
-    with open(audio_file_path, "rb") as audio_file:
-        transcript = client.audio.transcriptions.create(
+from com.mhire.app.config.config import PROVIDER_TIMEOUT_SECONDS
+from com.mhire.app.services.tracing import span
+def transcribe_audio(audio_file_path, timeout=None):
+    with open(audio_file_path, "rb") as audio_file, span("provider.call", provider="openai_whisper", attempt=1):
+        transcript = client.with_options(timeout=timeout or PROVIDER_TIMEOUT_SECONDS).audio.transcriptions.create(
             model="whisper-1", 
             file=audio_file
          )
@@ -1,8 +1,9 @@
 import requests
 import os
-from com.mhire.app.config.config import DEEPGRAM_API_KEY
+from com.mhire.app.config.config import DEEPGRAM_API_KEY, PROVIDER_TIMEOUT_SECONDS
+from com.mhire.app.services.tracing import span
 
-def transcribe_audio_deepgram(audio_file_path):
+def transcribe_audio_deepgram(audio_file_path, timeout=None):
     """
     Transcribe audio using Deepgram Nova-2 API
     """
@@ -22,18 +23,23 @@ def transcribe_audio_deepgram(audio_file_path):
     }
     
     try:
-        with open(audio_file_path, "rb") as audio_file:
+        with open(audio_file_path, "rb") as audio_file, \
+                span("provider.http", provider="deepgram_nova_2", attempt=1,
+                     bytes_uploaded=os.path.getsize(audio_file_path)) as http_span:
             response = requests.post(
                 url,
                 headers=headers,
                 params=params,
-                data=audio_file
+                data=audio_file,
+                timeout=timeout or PROVIDER_TIMEOUT_SECONDS
             )
+            http_span.set_attribute("http.status_code", response.status_code)
         
         if response.status_code == 200:
-            result = response.json()
-            # Extract transcript from Deepgram response
-            transcript = result["results"]["channels"][0]["alternatives"][0]["transcript"]
+            with span("provider.parse", provider="deepgram_nova_2"):
+                result = response.json()
+                # Extract transcript from Deepgram response
+                transcript = result["results"]["channels"][0]["alternatives"][0]["transcript"]
             return transcript
         else:
             raise Exception(f"Deepgram API error: {response.status_code} - {response.text}")
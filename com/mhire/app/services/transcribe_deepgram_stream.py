@@ -0,0 +1,190 @@
+import json
+import os
+import re
+import threading
+import time
+
+from com.mhire.app.config.config import (
+    DEEPGRAM_API_KEY,
+    DEEPGRAM_STREAM_CHUNK_BYTES,
+    DEEPGRAM_STREAM_URL,
+    PROVIDER_TIMEOUT_SECONDS,
+    STREAM_MIN_NEW_WORDS,
+)
+from com.mhire.app.services.policy import moderation_policy
+from com.mhire.app.services.tracing import span
+
+
+def _result_event(message):
+    """Normalize a Deepgram live "Results" message"""
+    alternatives = message.get("channel", {}).get("alternatives") or [{}]
+    return {
+        "transcript": alternatives[0].get("transcript", ""),
+        "is_final": bool(message.get("is_final")),
+        "start": message.get("start", 0.0),
+        "duration": message.get("duration", 0.0),
+    }
+
+
+def stream_deepgram(audio_file_path, timeout=None):
+    """
+    Stream a file to Deepgram's live endpoint with interim results enabled and
+    yield normalized result events as they arrive.
+    """
+    from websockets.exceptions import ConnectionClosed
+    from websockets.sync.client import connect
+
+    params = "model=nova-2&smart_format=true&punctuate=true&language=en&interim_results=true"
+    url = f"{DEEPGRAM_STREAM_URL}?{params}"
+    timeout = timeout or PROVIDER_TIMEOUT_SECONDS
+
+    with span("provider.stream", provider="deepgram_nova_2", bytes_uploaded=os.path.getsize(audio_file_path)), \
+            connect(url, additional_headers={"Authorization": f"Token {DEEPGRAM_API_KEY}"},
+                    open_timeout=timeout) as websocket:
+
+        def send_audio():
+            with open(audio_file_path, "rb") as audio_file:
+                while True:
+                    chunk = audio_file.read(DEEPGRAM_STREAM_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    websocket.send(chunk)
+            websocket.send(json.dumps({"type": "CloseStream"}))
+
+        sender = threading.Thread(target=send_audio, name="deepgram-stream-sender", daemon=True)
+        sender.start()
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise Exception("Deepgram stream timed out")
+                try:
+                    raw = websocket.recv(timeout=remaining)
+                except TimeoutError:
+                    raise Exception("Deepgram stream timed out")
+                except ConnectionClosed:
+                    # Server closes the socket after the final result
+                    break
+                message = json.loads(raw)
+                if message.get("type") == "Results":
+                    yield _result_event(message)
+        finally:
+            sender.join(timeout=1)
+
+
+def stream_standin(audio_file_path, transcript=None, words_per_interim=2, delay=0.05):
+    """
+    Local stand-in for the Deepgram live stream. Replays a transcript (given,
+    or read from a sidecar .txt file) sentence by sentence, emitting growing
+    interim results followed by a final result per sentence.
+    """
+    if transcript is None:
+        sidecar = os.path.splitext(audio_file_path)[0] + ".txt"
+        if os.path.exists(sidecar):
+            with open(sidecar, "r", encoding="utf-8") as f:
+                transcript = f.read()
+        else:
+            transcript = ""
+
+    position = 0.0
+    for sentence in [s.strip() for s in re.split(r"(?<=[.!?])\s+", transcript) if s.strip()]:
+        words = sentence.split()
+        for end in range(words_per_interim, len(words), words_per_interim):
+            time.sleep(delay)
+            yield {"transcript": " ".join(words[:end]), "is_final": False, "start": position, "duration": end * 0.3}
+        time.sleep(delay)
+        yield {"transcript": sentence, "is_final": True, "start": position, "duration": len(words) * 0.3}
+        position += len(words) * 0.3
+
+
+def _normalize(text):
+    return " ".join(re.findall(r"[a-z0-9']+", (text or "").lower()))
+
+
+class StreamingModerator:
+    """
+    Moderates a stream of interim/final transcript events.
+
+    Each segment (one utterance, until its final result) is moderated as it
+    grows, but only once at least `min_new_words` new words have arrived since
+    its last check; identical text is never sent twice, and a final result
+    equal to the last moderated interim reuses that verdict.
+    """
+
+    def __init__(self, moderate_fn, min_new_words=STREAM_MIN_NEW_WORDS, tenant=None):
+        self.moderate_fn = moderate_fn
+        self.min_new_words = min_new_words
+        self.tenant = tenant
+        self.segments = []
+        self.moderation_calls = 0
+        self.first_flag_at = None
+        self._verdicts = {}
+        self._last_checked_words = 0
+        self._segment_flagged = False
+        self._started = time.monotonic()
+
+    def _moderate(self, text):
+        key = _normalize(text)
+        if key not in self._verdicts:
+            self._verdicts[key] = self.moderate_fn(text)
+            self.moderation_calls += 1
+        return self._verdicts[key]
+
+    def process(self, event):
+        """Consume one result event; returns a verdict event dict or None"""
+        text = event["transcript"].strip()
+        if not text:
+            return None
+        word_count = len(_normalize(text).split())
+
+        if event["is_final"]:
+            verdict = self._moderate(text)
+            self.segments.append((text, verdict))
+            self._last_checked_words = 0
+            self._segment_flagged = False
+            kind = "final_segment"
+        elif not self._segment_flagged and word_count - self._last_checked_words >= self.min_new_words:
+            # Once a segment is flagged, wait for its final result
+            verdict = self._moderate(text)
+            self._last_checked_words = word_count
+            self._segment_flagged = verdict.flagged
+            kind = "interim"
+        else:
+            return None
+
+        elapsed = round(time.monotonic() - self._started, 3)
+        if verdict.flagged and self.first_flag_at is None:
+            self.first_flag_at = elapsed
+        return {
+            "event": kind,
+            "text": text,
+            "flagged": verdict.flagged,
+            "audio_offset": round(event.get("start", 0.0) + event.get("duration", 0.0), 3),
+            "elapsed": elapsed,
+        }
+
+    def final(self):
+        """
+        Verdict over all confirmed segments: flagged if any segment is, max
+        score per category, recommendation from the moderation policy
+        """
+        categories, scores = {}, {}
+        for _, verdict in self.segments:
+            for category, value in dict(verdict.categories).items():
+                categories[category] = bool(categories.get(category)) or bool(value)
+            for category, value in dict(verdict.category_scores).items():
+                scores[category] = max(scores.get(category, 0.0), value or 0.0)
+        flagged = any(verdict.flagged for _, verdict in self.segments)
+        moderation = {"flagged": flagged, "categories": categories, "category_scores": scores}
+        recommendation, policy_categories = moderation_policy.evaluate(moderation, self.tenant)
+        return {
+            "event": "final",
+            "transcription": " ".join(text for text, _ in self.segments),
+            "moderation": moderation,
+            "recommendation": recommendation,
+            "policy_categories": policy_categories,
+            "first_flag_at": self.first_flag_at,
+            "moderation_calls": self.moderation_calls,
+            "elapsed": round(time.monotonic() - self._started, 3),
+        }
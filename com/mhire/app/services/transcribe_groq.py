@@ -1,8 +1,9 @@
 import requests
 import os
-from com.mhire.app.config.config import GROQ_API_KEY
+from com.mhire.app.config.config import GROQ_API_KEY, PROVIDER_TIMEOUT_SECONDS
+from com.mhire.app.services.tracing import span
 
-def transcribe_audio_groq(audio_file_path):
+def transcribe_audio_groq(audio_file_path, timeout=None):
     """
     Transcribe audio using Groq Whisper Turbo API
     """
@@ -21,10 +22,14 @@ def transcribe_audio_groq(audio_file_path):
                 "language": (None, "en")
             }
             
-            response = requests.post(url, headers=headers, files=files)
+            with span("provider.http", provider="groq_whisper_turbo", attempt=1,
+                      bytes_uploaded=os.path.getsize(audio_file_path)) as http_span:
+                response = requests.post(url, headers=headers, files=files, timeout=timeout or PROVIDER_TIMEOUT_SECONDS)
+                http_span.set_attribute("http.status_code", response.status_code)
         
         if response.status_code == 200:
-            result = response.json()
+            with span("provider.parse", provider="groq_whisper_turbo"):
+                result = response.json()
             return result["text"]
         else:
             raise Exception(f"Groq API error: {response.status_code} - {response.text}")
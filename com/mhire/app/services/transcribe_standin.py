@@ -0,0 +1,40 @@
+import os
+import time
+
+from com.mhire.app.config.config import STANDIN_LATENCY_MODELS, STANDIN_MODERATION_LATENCY_SECONDS
+from com.mhire.app.services.local_signals import local_moderation
+
+
+def standin_latency(audio_file_path, provider):
+    """Simulated provider latency in seconds for a file of this size"""
+    base, per_mb = STANDIN_LATENCY_MODELS.get(provider, (0.5, 0.5))
+    return base + per_mb * os.path.getsize(audio_file_path) / (1024 * 1024)
+
+
+def transcribe_audio_standin(audio_file_path, provider="openai_whisper", timeout=None, latency=None):
+    """
+    Local stand-in for a transcription provider. Sleeps for the simulated
+    (or given) latency and returns the transcript from a sidecar .txt file
+    next to the audio, if there is one.
+    """
+    if latency is None:
+        latency = standin_latency(audio_file_path, provider)
+    if timeout is not None and latency > timeout:
+        time.sleep(timeout)
+        raise Exception(f"Stand-in {provider} timed out after {timeout:.2f}s")
+    time.sleep(latency)
+
+    sidecar = os.path.splitext(audio_file_path)[0] + ".txt"
+    if os.path.exists(sidecar):
+        with open(sidecar, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    return f"[{provider} stand-in transcript of {os.path.basename(audio_file_path)}]"
+
+
+def moderate_text_standin(text, timeout=None, latency=STANDIN_MODERATION_LATENCY_SECONDS):
+    """Local stand-in for the moderation API: the local lexicon after a simulated delay"""
+    if timeout is not None and latency > timeout:
+        time.sleep(timeout)
+        raise Exception(f"Stand-in moderation timed out after {timeout:.2f}s")
+    time.sleep(latency)
+    return local_moderation(text)
@@ -0,0 +1,81 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+
+
+def spool_upload(upload_file, suffix=""):
+    """
+    Copy an UploadFile to a named temp file and return its path.
+    Blocking; run it on the "upload" bulkhead from async endpoints.
+    """
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        shutil.copyfileobj(upload_file.file, tmp)
+        return tmp.name
+
+
+def spool_upload_hashed(upload_file, suffix="", chunk_size=1024 * 1024):
+    """
+    Like spool_upload, but also returns the SHA-256 hex digest of the
+    content, computed during the copy.
+    """
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        while True:
+            chunk = upload_file.file.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            tmp.write(chunk)
+        return tmp.name, digest.hexdigest()
+
+
+async def spool_stream(chunks, suffix="", flush_bytes=1024 * 1024):
+    """
+    Write an async iterable of body chunks (e.g. request.stream()) to a named
+    temp file without buffering the whole body; returns (path, SHA-256 hex).
+    Chunks are gathered up to `flush_bytes` and hashed and written on a
+    worker thread, so the event loop never blocks on disk.
+    """
+    digest = hashlib.sha256()
+
+    def write(tmp, data):
+        digest.update(data)
+        tmp.write(data)
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        try:
+            pending, size = [], 0
+            async for chunk in chunks:
+                pending.append(chunk)
+                size += len(chunk)
+                if size >= flush_bytes:
+                    await asyncio.to_thread(write, tmp, b"".join(pending))
+                    pending, size = [], 0
+            if pending:
+                await asyncio.to_thread(write, tmp, b"".join(pending))
+        except BaseException:
+            tmp.close()
+            remove_quietly(tmp.name)
+            raise
+        return tmp.name, digest.hexdigest()
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """SHA-256 hex digest of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def remove_quietly(path):
+    """Delete a temp file, ignoring errors if it is already gone"""
+    if not path:
+        return
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
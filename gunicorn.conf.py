@@ -0,0 +1,24 @@
+import multiprocessing
+import os
+
+# One uvicorn event loop per process; WEB_CONCURRENCY overrides the default of one per core
+bind = os.getenv("bind", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn_worker.UvicornWorker"
+timeout = int(os.getenv("worker_timeout", "120"))
+graceful_timeout = 30
+keepalive = 5
+# Shared by all workers and replicas through the SQLite files in var/: the
+# transcript and verdict cache, provider token buckets, conversation sessions,
+# background job status and the audit log.
+# Per process: the audio fingerprint and near-duplicate indexes (best-effort
+# caches that start empty in a new worker), admission and scheduler queues,
+# bulkheads, and the tasks of running background jobs, which a stopping
+# worker waits on for up to job_drain_seconds before failing them.
+#
+# Recycle workers now and then so per-process indexes and heaps cannot grow forever
+max_requests = int(os.getenv("max_requests", "10000"))
+max_requests_jitter = 1000
+
+# Workers read this at import to split host-wide admission and scheduler limits
+os.environ["worker_count"] = str(workers)
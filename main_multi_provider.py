@@ -1,17 +1,43 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Header
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from com.mhire.app.services.multi_provider_transcribe import transcribe_with_provider
+from com.mhire.app.services.multi_provider_transcribe import transcribe_with_provider, normalize_provider
 from com.mhire.app.services.detection import moderate_text
-import shutil
-import tempfile
-import os
+from com.mhire.app.middleware.admission import AdmissionControlMiddleware, build_limiters, Overloaded
+from com.mhire.app.config.config import ADMISSION_RETRY_AFTER_SECONDS
+from com.mhire.app.services.near_duplicate import near_duplicate_index
+from com.mhire.app.services.audio_fingerprint import audio_fingerprint_index
+from com.mhire.app.services.scheduler import pipeline_scheduler
+from com.mhire.app.services.bulkheads import get_bulkhead, bulkhead_stats
+from com.mhire.app.services.uploads import spool_upload, spool_upload_hashed, remove_quietly
+from com.mhire.app.services.deadline import deadline_from_request
+from com.mhire.app.services.jobs import job_store
+from com.mhire.app.services.pipeline import transcribe_and_moderate, submit_full_pass, moderation_payload
+from com.mhire.app.services.conversations import conversation_sessions
+from com.mhire.app.services.shared_cache import get_shared_cache
+from com.mhire.app.services.request_traces import get_request_recorder
+from com.mhire.app.services.tracing import TracingMiddleware, configure_tracing, install_log_correlation, span
+from com.mhire.app.middleware.profiling import RequestProfilerMiddleware
+from com.mhire.app.routers.diagnostics import router as diagnostics_router
+from com.mhire.app.routers.audit import router as audit_router
+from com.mhire.app.routers.jobs import router as jobs_router
+from com.mhire.app.routers.internal import router as internal_router
+from com.mhire.app.routers.conversations import router as conversations_router
+from com.mhire.app.services.audit import audit_decision, get_audit_sink
+from com.mhire.app.services.benchmark import run_benchmark
+from com.mhire.app.services.transcribe_deepgram_stream import stream_deepgram, stream_standin, StreamingModerator
+from com.mhire.app.config.config import ENABLE_STANDIN_PROVIDERS
+import asyncio
+import json
+from typing import List, Optional
 import logging
 import time
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
+install_log_correlation()
 logger = logging.getLogger(__name__)
+configure_tracing("voice-moderation-multi-provider")
 
 app = FastAPI(
     title="Voice Content Moderation API - Multi Provider",
@@ -19,6 +45,11 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Shed load with fast 503s instead of queueing behind the threadpool. Added
+# before CORS so CORS wraps it: browsers can read the 413/503 and Retry-After
+admission_limiters = build_limiters()
+app.add_middleware(AdmissionControlMiddleware, limiters=admission_limiters)
+
 # Add CORS middleware for frontend integration
 app.add_middleware(
     CORSMiddleware,
@@ -26,117 +57,330 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
+# Background profiling of a sampled fraction of requests (off by default)
+app.add_middleware(RequestProfilerMiddleware)
+
+# Outermost: one root span per request, trace id returned in X-Trace-Id
+app.add_middleware(TracingMiddleware)
+
+# Guarded /admin profiling and memory diagnostics
+app.include_router(diagnostics_router)
+app.include_router(audit_router)
+app.include_router(jobs_router)
+app.include_router(internal_router)
+app.include_router(conversations_router)
+
+@app.on_event("startup")
+async def open_audit_sink():
+    # Creates the audit schema before the first request, off the event loop
+    await asyncio.to_thread(get_audit_sink)
+
+@app.on_event("shutdown")
+async def drain_background_jobs():
+    # Recycled or stopped workers finish (or fail) their jobs before exiting
+    await job_store.drain()
+
 @app.post("/transcribe")
-def transcribe_endpoint(file: UploadFile = File(...), provider: str = Form("openai_whisper")):
+async def transcribe_endpoint(file: UploadFile = File(...), provider: str = Form("openai_whisper")):
     """
     Transcribe audio using the specified provider
     """
     try:
         logger.info(f"Transcribing with provider: {provider}")
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f"_{file.filename}") as tmp:
-            shutil.copyfileobj(file.file, tmp)
-            tmp_path = tmp.name
+        tmp_path = await get_bulkhead("upload").run(spool_upload, file, f"_{file.filename}")
         
-        transcript = transcribe_with_provider(tmp_path, provider)
+        transcript = await get_bulkhead(f"transcription:{normalize_provider(provider)}").run(
+            transcribe_with_provider, tmp_path, provider
+        )
         
         # Clean up temporary file
-        os.unlink(tmp_path)
+        remove_quietly(tmp_path)
         
         return {"transcription": transcript, "provider_used": provider}
     except Exception as e:
         logger.error(f"Error transcribing with {provider}: {str(e)}")
         if 'tmp_path' in locals():
-            try:
-                os.unlink(tmp_path)
-            except:
-                pass
+            remove_quietly(tmp_path)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/moderate")
-def moderate_endpoint(text: str):
+async def moderate_endpoint(text: str, conversation_id: Optional[str] = None):
     """
-    Moderate text content
+    Moderate text content, optionally as the next message of a conversation
     """
     try:
-        result = moderate_text(text)
-        return JSONResponse(content={
-            "flagged": result.flagged,
-            "categories": dict(result.categories),
-            "category_scores": dict(result.category_scores)
-        })
+        result = await get_bulkhead("moderation").run(moderate_text, text)
+        content = moderation_payload(result)
+        if conversation_id:
+            content["conversation"] = await asyncio.to_thread(conversation_sessions.observe, conversation_id, text, content)
+        return JSONResponse(content=content)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/transcribe-and-moderate")
-def transcribe_and_moderate_endpoint(file: UploadFile = File(...), provider: str = Form("openai_whisper")):
+async def transcribe_and_moderate_endpoint(
+    file: UploadFile = File(...),
+    provider: str = Form("openai_whisper"),
+    deadline_ms: Optional[int] = Form(None),
+    x_deadline_ms: Optional[int] = Header(None),
+    priority: Optional[str] = Form(None),
+    x_priority: Optional[str] = Header(None),
+    tenant_id: Optional[str] = Form(None),
+    x_tenant_id: Optional[str] = Header(None),
+    sampling: Optional[bool] = Form(None),
+    full_pass: bool = Form(True),
+    conversation_id: Optional[str] = Form(None),
+    x_conversation_id: Optional[str] = Header(None),
+):
     """
     Main endpoint for voice dating app content moderation with provider selection.
     Returns transcription and moderation results for backend decision making.
+    A deadline (X-Deadline-Ms header or deadline_ms field) bounds the whole call;
+    past it the response carries a degraded verdict instead of hanging.
+    Priority class (realtime, reported, bulk) and tenant come from the
+    X-Priority / X-Tenant-Id headers or the priority / tenant_id fields.
+    Long audio gets a provisional verdict from sampled windows (sampling=false
+    disables this); unless full_pass=false the whole file is then moderated in
+    the background, pollable at /jobs/{job_id}.
+    With a conversation id (X-Conversation-Id or conversation_id) the verdict
+    also accounts for the recent messages of that conversation.
     """
     try:
+        deadline = deadline_from_request(x_deadline_ms, deadline_ms)
         logger.info(f"Processing audio file: {file.filename} with provider: {provider}")
         start_time = time.time()
         
         # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f"_{file.filename}") as tmp:
-            shutil.copyfileobj(file.file, tmp)
-            tmp_path = tmp.name
+        with span("upload.spool", filename=file.filename) as upload_span:
+            tmp_path, audio_hash = await get_bulkhead("upload").run(spool_upload_hashed, file, f"_{file.filename}")
+        upload_time = time.time() - start_time
         
-        # Transcribe audio with selected provider
-        transcript = transcribe_with_provider(tmp_path, provider)
-        transcription_time = time.time() - start_time
-        logger.info(f"Transcription completed in {transcription_time:.2f}s: {len(transcript)} characters")
+        # Transcribe with selected provider and moderate within the request deadline
+        result = await transcribe_and_moderate(
+            tmp_path, provider, deadline,
+            priority=x_priority or priority, tenant=x_tenant_id or tenant_id, sampling=sampling,
+            conversation_id=x_conversation_id or conversation_id, audio_hash=audio_hash
+        )
         
-        # Moderate content
-        moderation_start = time.time()
-        moderation_result = moderate_text(transcript)
-        moderation_time = time.time() - moderation_start
+        # Moderate the whole file in the background after a provisional verdict
+        full_pass_job = None
+        if result.get("provisional") and full_pass:
+            full_pass_job = await submit_full_pass(
+                tmp_path, provider, tenant=x_tenant_id or tenant_id,
+                on_result=lambda full: audit_decision(full, audio_hash, normalize_provider(provider), trace_id=upload_span.trace_id),
+                audio_hash=audio_hash,
+            )
         
         # Clean up temporary file
-        os.unlink(tmp_path)
+        remove_quietly(tmp_path)
         
         total_time = time.time() - start_time
+        timings = result["timings"]
+        
+        # Record the decision off the request path
+        audit_decision(result, audio_hash, normalize_provider(provider), trace_id=upload_span.trace_id)
         
         # Structure response for backend decision making
         response = {
-            "transcription": transcript,
-            "moderation": {
-                "flagged": moderation_result.flagged,
-                "categories": dict(moderation_result.categories),
-                "category_scores": dict(moderation_result.category_scores)
-            },
-            "recommendation": "block" if moderation_result.flagged else "allow",
+            "transcription": result["transcription"],
+            "moderation": result["moderation"],
+            "recommendation": result["recommendation"],
+            "degraded": result["degraded"],
             "provider_used": provider,
             "performance": {
                 "total_time": round(total_time, 2),
-                "transcription_time": round(transcription_time, 2),
-                "moderation_time": round(moderation_time, 2)
+                "upload_time": round(upload_time, 2),
+                "queue_wait": round(timings.get("queue_wait", 0.0), 2),
+                "transcription_time": round(timings.get("transcription_time", 0.0), 2),
+                "moderation_time": round(timings.get("moderation_time", 0.0), 2)
             }
         }
+        if result["degraded"]:
+            response["degraded_reason"] = result["degraded_reason"]
+        for key in ("policy_categories", "provisional", "sampled_windows", "near_duplicate", "audio_duplicate",
+                    "conversation"):
+            if key in result:
+                response[key] = result[key]
+        if full_pass_job:
+            response["full_pass_job"] = {"job_id": full_pass_job, "status_url": f"/jobs/{full_pass_job}"}
         
-        logger.info(f"Processing completed in {total_time:.2f}s - Result: {'FLAGGED' if moderation_result.flagged else 'CLEAN'}")
-        return response
+        logger.info(f"Processing completed in {total_time:.2f}s - Result: {response['recommendation'].upper()}{' (degraded)' if result['degraded'] else ''}")
+        with span("response.serialize"):
+            return JSONResponse(content=response)
         
+    except Overloaded as e:
+        logger.warning(f"Rejecting audio, pipeline saturated: {str(e)}")
+        if 'tmp_path' in locals():
+            remove_quietly(tmp_path)
+        raise HTTPException(status_code=503, detail="Service overloaded, retry later",
+                            headers={"Retry-After": str(ADMISSION_RETRY_AFTER_SECONDS)})
     except Exception as e:
         logger.error(f"Error processing audio with {provider}: {str(e)}")
         # Clean up temp file if it exists
         if 'tmp_path' in locals():
-            try:
-                os.unlink(tmp_path)
-            except:
-                pass
+            remove_quietly(tmp_path)
         raise HTTPException(status_code=500, detail=str(e))
 
+# Running stream tasks, referenced until done so they are not garbage collected
+_stream_tasks = set()
+
+@app.post("/transcribe-and-moderate/stream")
+async def transcribe_and_moderate_stream_endpoint(
+    file: UploadFile = File(...),
+    use_standin: bool = Form(False),
+    standin_transcript: Optional[str] = Form(None),
+    tenant_id: Optional[str] = Form(None),
+    x_tenant_id: Optional[str] = Header(None),
+):
+    """
+    Stream audio to Deepgram Nova-2 and moderate interim transcripts as they
+    arrive. Responds with NDJSON events: "interim" and "final_segment"
+    verdicts while audio is processed, then one "final" verdict.
+    With use_standin, a local replay of `standin_transcript` replaces Deepgram.
+    """
+    tmp_path = await get_bulkhead("upload").run(spool_upload, file, f"_{file.filename}")
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    
+    def run_stream():
+        try:
+            moderator = StreamingModerator(moderate_text, tenant=x_tenant_id or tenant_id)
+            if use_standin or ENABLE_STANDIN_PROVIDERS:
+                results = stream_standin(tmp_path, transcript=standin_transcript)
+            else:
+                results = stream_deepgram(tmp_path)
+            for result in results:
+                verdict = moderator.process(result)
+                if verdict is not None:
+                    loop.call_soon_threadsafe(events.put_nowait, verdict)
+            loop.call_soon_threadsafe(events.put_nowait, moderator.final())
+        except Exception as e:
+            logger.error(f"Streaming moderation failed: {str(e)}")
+            loop.call_soon_threadsafe(events.put_nowait, {"event": "error", "detail": str(e)})
+        finally:
+            remove_quietly(tmp_path)
+            loop.call_soon_threadsafe(events.put_nowait, None)
+    
+    def stream_done(task):
+        _stream_tasks.discard(task)
+        if task.cancelled() or task.exception() is None:
+            return
+        # run_stream never started (e.g. the bulkhead rejected it), so end
+        # the response here instead of leaving the client waiting
+        logger.error(f"Streaming moderation could not run: {str(task.exception())}")
+        remove_quietly(tmp_path)
+        events.put_nowait({"event": "error", "detail": str(task.exception())})
+        events.put_nowait(None)
+    
+    stream_task = loop.create_task(get_bulkhead("transcription:deepgram_nova_2").run(run_stream))
+    _stream_tasks.add(stream_task)
+    stream_task.add_done_callback(stream_done)
+    
+    async def ndjson():
+        while True:
+            event = await events.get()
+            if event is None:
+                break
+            yield json.dumps(event) + "\n"
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@app.post("/benchmark")
+async def benchmark_endpoint(
+    files: List[UploadFile] = File(...),
+    providers: Optional[str] = Form(None),
+    concurrency: int = Form(4),
+    repeats: int = Form(1),
+    use_standins: bool = Form(False),
+):
+    """
+    Run a corpus of audio files concurrently against every provider (or a
+    comma separated subset) and return comparative latency, throughput,
+    bytes uploaded, error rate and transcript agreement.
+    """
+    tmp_paths = []
+    try:
+        if providers:
+            selected = [p.strip() for p in providers.split(",") if p.strip()]
+        else:
+            selected = [p["id"] for p in (await list_providers())["providers"]]
+        concurrency = min(max(concurrency, 1), 32)
+        repeats = min(max(repeats, 1), 20)
+        
+        for file in files:
+            tmp_paths.append(await get_bulkhead("upload").run(spool_upload, file, f"_{file.filename}"))
+        
+        logger.info(f"Benchmarking {len(tmp_paths)} files x{repeats} against {selected} (standins={use_standins})")
+        with span("benchmark", providers=",".join(selected), files=len(tmp_paths)):
+            return await get_bulkhead("benchmark").run(
+                run_benchmark, tmp_paths, selected, concurrency, repeats, use_standins
+            )
+    except Exception as e:
+        logger.error(f"Benchmark failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        for tmp_path in tmp_paths:
+            remove_quietly(tmp_path)
+
 @app.get("/health")
-def health_check():
+async def health_check():
     """Health check endpoint for monitoring"""
     return {"status": "healthy", "service": "voice-moderation-multi-provider"}
 
+@app.get("/metrics/admission")
+async def admission_metrics():
+    """Per-endpoint admission counters (active, waiting, rejected)"""
+    return {path: limiter.stats() for path, limiter in admission_limiters.items()}
+
+@app.get("/metrics/scheduler")
+async def scheduler_metrics():
+    """Pipeline scheduler occupancy and per-class waits"""
+    return pipeline_scheduler.stats()
+
+
+@app.get("/metrics/near-duplicates")
+async def near_duplicate_metrics():
+    """Size of the flagged-transcript index and its most matched clusters"""
+    return near_duplicate_index.stats()
+
+
+@app.get("/metrics/audio-fingerprints")
+async def audio_fingerprint_metrics():
+    """Size and hit rate of the audio fingerprint index"""
+    return audio_fingerprint_index.stats()
+
+@app.get("/metrics/conversations")
+async def conversation_metrics():
+    """Live conversation sessions and evictions"""
+    return conversation_sessions.stats()
+
+@app.get("/metrics/shared-cache")
+async def shared_cache_metrics():
+    """Entries in the cross-worker cache and this worker's hit counts"""
+    cache = get_shared_cache()
+    if cache is None:
+        raise HTTPException(status_code=404, detail="Shared cache is disabled")
+    return await asyncio.to_thread(cache.stats)
+
+@app.get("/metrics/request-traces")
+async def request_trace_metrics():
+    """Request traces recorded for capacity planning by this worker"""
+    recorder = get_request_recorder()
+    if recorder is None:
+        raise HTTPException(status_code=404, detail="Request tracing is disabled")
+    return recorder.stats()
+
+@app.get("/metrics/pools")
+async def pool_metrics():
+    """Per-stage executor utilization"""
+    return bulkhead_stats()
+
 @app.get("/providers")
-def list_providers():
+async def list_providers():
     """List available transcription providers"""
     return {
         "providers": [
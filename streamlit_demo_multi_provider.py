@@ -1,4 +1,5 @@
 import streamlit as st
+import pandas as pd
 import requests
 import json
 import time
@@ -327,8 +328,93 @@ if uploaded_file is not None or demo_option != "None":
             except Exception as e:
                 st.error(f"Error: {str(e)}")
 
+# Benchmark mode section
+st.markdown("## 🏁 Provider Benchmark (measured)")
+st.markdown("Run a corpus of audio files concurrently against every provider and compare measured numbers.")
+
+bench_files = st.file_uploader(
+    "Benchmark corpus (multiple audio files)",
+    type=['mp3', 'wav', 'm4a', 'ogg', 'flac'],
+    accept_multiple_files=True,
+    key="benchmark_files"
+)
+
+bench_col1, bench_col2, bench_col3 = st.columns(3)
+with bench_col1:
+    provider_ids = {
+        "OpenAI Whisper": "openai_whisper",
+        "Deepgram Nova-2": "deepgram_nova_2",
+        "Groq Whisper Turbo": "groq_whisper_turbo"
+    }
+    bench_providers = st.multiselect("Providers", list(provider_ids.keys()), default=list(provider_ids.keys()))
+with bench_col2:
+    bench_concurrency = st.slider("Concurrency per provider", 1, 16, 4)
+    bench_repeats = st.slider("Repeats per file", 1, 5, 1)
+with bench_col3:
+    bench_standins = st.checkbox("Use local stand-ins (no API cost)", value=False)
+
+if bench_files and bench_providers and st.button("🏁 Run Benchmark"):
+    with st.spinner(f"Benchmarking {len(bench_files)} files against {len(bench_providers)} providers..."):
+        try:
+            files = [("files", (f.name, f.getvalue(), f.type)) for f in bench_files]
+            data = {
+                "providers": ",".join(provider_ids[p] for p in bench_providers),
+                "concurrency": bench_concurrency,
+                "repeats": bench_repeats,
+                "use_standins": str(bench_standins).lower()
+            }
+            response = requests.post(f"{API_BASE_URL}/benchmark", files=files, data=data)
+            
+            if response.status_code == 200:
+                bench = response.json()
+                rows = []
+                for provider_id, stats in bench["providers"].items():
+                    latency = stats["latency"]
+                    rows.append({
+                        "Provider": provider_id,
+                        "Requests": stats["requests"],
+                        "Error Rate": stats["error_rate"],
+                        "Mean (s)": latency["mean"],
+                        "p50 (s)": latency["p50"],
+                        "p95 (s)": latency["p95"],
+                        "p99 (s)": latency["p99"],
+                        "Throughput (req/s)": stats["throughput_rps"],
+                        "MB Uploaded": round(stats["bytes_uploaded"] / (1024 * 1024), 2)
+                    })
+                bench_df = pd.DataFrame(rows).set_index("Provider")
+                
+                st.markdown("### 📋 Measured Results")
+                st.dataframe(bench_df)
+                
+                chart_col1, chart_col2 = st.columns(2)
+                with chart_col1:
+                    st.markdown("#### Latency percentiles (s)")
+                    st.bar_chart(bench_df[["p50 (s)", "p95 (s)", "p99 (s)"]])
+                with chart_col2:
+                    st.markdown("#### Throughput (req/s)")
+                    st.bar_chart(bench_df[["Throughput (req/s)"]])
+                
+                if bench["agreement"]:
+                    st.markdown("#### 🤝 Transcript agreement (1 - WER between providers)")
+                    agreement_df = pd.DataFrame(
+                        [{"Pair": pair.replace("|", " vs "), "Agreement": score} for pair, score in bench["agreement"].items()]
+                    ).set_index("Pair")
+                    st.bar_chart(agreement_df)
+                
+                with st.expander("🔧 Raw Benchmark Response"):
+                    st.json(bench)
+            elif response.status_code == 503:
+                st.warning("A benchmark is already running, try again shortly.")
+            else:
+                st.error(f"API Error: {response.status_code} - {response.text}")
+        except requests.exceptions.ConnectionError:
+            st.error("❌ Cannot connect to API. Make sure your FastAPI server is running!")
+        except Exception as e:
+            st.error(f"Error: {str(e)}")
+
 # Performance comparison section
 st.markdown("## 📈 Performance Comparison")
+st.caption("Vendor-published figures. Use the benchmark above for numbers measured against this deployment.")
 
 comparison_data = {
     "Provider": ["OpenAI Whisper", "Deepgram Nova-2", "Groq Whisper Turbo"],
@@ -0,0 +1,73 @@
+import asyncio
+
+from com.mhire.app.services.deadline import DeadlineExceeded
+from com.mhire.app.services.scheduler import PipelineScheduler
+
+
+def _scheduler():
+    return PipelineScheduler(capacity=1, class_weights={"realtime": 8.0, "reported": 4.0, "bulk": 1.0},
+                             tenant_weights={}, max_waiting=1000, aging_rate=0.0)
+
+
+async def _contended_order(scheduler, jobs):
+    """Queue `jobs` (priorities) behind a held slot and return the order they are served in"""
+    order = []
+
+    async def job(priority):
+        await scheduler.acquire(priority, "tenant", 1.0)
+        order.append(priority)
+        await asyncio.sleep(0)
+        scheduler.release()
+
+    await scheduler.acquire("realtime", "tenant", 1.0)
+    tasks = []
+    for priority in jobs:
+        tasks.append(asyncio.create_task(job(priority)))
+        await asyncio.sleep(0)
+    scheduler.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_class_idle_while_another_ran_uncontended_is_not_starved():
+    async def scenario():
+        scheduler = _scheduler()
+        for _ in range(400):
+            await scheduler.acquire("realtime", "tenant", 1.0)
+            scheduler.release()
+        return await _contended_order(scheduler, ["bulk"] * 30 + ["realtime"] * 5)
+
+    order = asyncio.run(scenario())
+    assert len(order) == 35
+    # Realtime has 8x bulk's weight: its 5 jobs go out among the first few
+    last_realtime = max(i for i, priority in enumerate(order) if priority == "realtime")
+    assert last_realtime < 8
+
+
+def test_contended_classes_share_slots_by_weight():
+    async def scenario():
+        return await _contended_order(_scheduler(), ["bulk"] * 20 + ["realtime"] * 20)
+
+    order = asyncio.run(scenario())
+    assert order[:18].count("realtime") >= 15
+    assert "bulk" in order[:18]
+
+
+def test_slot_dispatched_as_the_deadline_fires_is_released(monkeypatch):
+    scheduler = _scheduler()
+
+    async def dispatched_then_timed_out(future, timeout):
+        scheduler.release()   # the holder leaves and the slot goes to the waiter
+        assert future.done()
+        raise asyncio.TimeoutError
+
+    async def scenario():
+        await scheduler.acquire("realtime", "tenant", 1.0)
+        monkeypatch.setattr(asyncio, "wait_for", dispatched_then_timed_out)
+        try:
+            await scheduler.acquire("bulk", "tenant", 1.0, timeout=0.01)
+        except DeadlineExceeded:
+            return scheduler.running
+        raise AssertionError("acquire should have raised DeadlineExceeded")
+
+    assert asyncio.run(scenario()) == 0